@@ -0,0 +1,198 @@
+"""Banc de performance d'un rerun du simulateur, étape par étape.
+
+    python -m benchmarks.bench                  # compare à benchmarks/reference.json
+    python -m benchmarks.bench --enregistrer    # remplace la référence
+
+Chaque étape d'un rerun (moteur à froid, moteur quand seule la fiscalité change,
+indicateurs, graphiques, Styler, export CSV) est chronométrée séparément sur un corpus fixe de scénarios, puis mesurée une seconde
+fois sous ``tracemalloc`` pour le pic mémoire (les deux passes sont séparées pour
+que le traçage ne fausse pas les durées). Le code de sortie vaut 1 si une étape
+régresse au-delà du seuil par rapport à la référence.
+
+Les durées de la référence sont absolues, donc propres à la machine qui les a
+mesurées : sur une autre machine, enregistrez d'abord sa propre référence
+(``--enregistrer``) avant de comparer. Un avertissement signale une référence
+mesurée dans un autre environnement.
+"""
+import argparse
+import itertools
+import json
+import logging
+import os
+import platform
+import resource
+import statistics
+import sys
+import time
+import tracemalloc
+
+RACINE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+REFERENCE = os.path.join(RACINE, "benchmarks", "reference.json")
+REPETITIONS = 5
+SEUIL = 0.25
+SEUIL_MEMOIRE = 0.25
+# En dessous, un écart de durée est du bruit de mesure
+PLANCHER_MS = 1.0
+
+
+def corpus():
+    """Scénarios nommés : 3 types de différé × 0/12/360 mois × 0/100 % étranger × frais inclus ou non."""
+    from scpi.lot import TYPES_DIFFERE
+    from scpi.moteur import PARAMS_REFERENCE
+
+    scenarios = {}
+    for type_differe, duree_pret, pourcentage_etranger, frais_inclus in itertools.product(TYPES_DIFFERE, (0, 12, 360), (0, 100), (False, True)):
+        nom = f"{type_differe} | {duree_pret} mois | {pourcentage_etranger}% étranger | frais {'inclus' if frais_inclus else 'exclus'}"
+        scenarios[nom] = {
+            **PARAMS_REFERENCE,
+            "type_differe": type_differe,
+            "duree_differe": 0 if type_differe == "Sans différé" else 6,
+            "duree_pret": duree_pret,
+            "pourcentage_etranger": pourcentage_etranger,
+            "investissement_etranger": pourcentage_etranger > 0,
+            "frais_inclus": frais_inclus,
+        }
+    return scenarios
+
+
+def etapes():
+    """Étapes d'un rerun, dans l'ordre de ``main`` ; chacune reçoit les paramètres et les tableaux du moteur."""
+    # Hors serveur Streamlit, les appels st.* journalisent des avertissements
+    logging.disable(logging.WARNING)
+
+    import simulateur_scpi as app
+    from scpi.cache import cache_simulation
+    from scpi.export import exporter
+    from scpi.moteur import indicateurs, simulation
+
+    def graphiques(params, df_amortissement, df_investissement):
+        app.plot_amortissement(df_amortissement, df_investissement, int(params["duree_pret"]), params["apport"])
+        app.graphique_loyers_francais_vs_etrangers(df_investissement)
+
+    # Valeurs toujours nouvelles : le rerun incrémental ne tombe jamais sur un résultat complet en cache
+    variantes = itertools.count(1)
+
+    def moteur(params, *_):
+        cache_simulation.vider()
+        return simulation(params)
+
+    return {
+        "moteur": moteur,
+        "moteur_fiscalite": lambda params, *_: simulation({**params, "taux_imposition": params["taux_imposition"] + next(variantes) * 1e-12}),
+        "indicateurs": lambda params, _, df_investissement: indicateurs(params, df_investissement),
+        "graphiques": graphiques,
+        "styler": lambda _, __, df_investissement: app.style_investissement(df_investissement.set_index("Année")).to_html(),
+        "export_csv": lambda _, df_amortissement, df_investissement: (exporter(df_amortissement, "csv"), exporter(df_investissement, "csv")),
+    }
+
+
+def mesurer(repetitions=REPETITIONS, noms_etapes=None):
+    """Durée médiane (ms) et pic mémoire (Kio) par étape et par scénario."""
+    from scpi.moteur import simulation
+
+    fonctions = etapes()
+    noms_etapes = noms_etapes or list(fonctions)
+    resultats = {etape: {"duree_ms": {}, "memoire_pic_kio": {}} for etape in noms_etapes}
+
+    for nom, params in corpus().items():
+        df_amortissement, _, df_investissement = simulation(params)
+        for etape in noms_etapes:
+            fonction = fonctions[etape]
+            fonction(params, df_amortissement, df_investissement)  # Préchauffage : imports et caches de module
+
+            durees = []
+            for _ in range(repetitions):
+                debut = time.perf_counter()
+                fonction(params, df_amortissement, df_investissement)
+                durees.append((time.perf_counter() - debut) * 1000)
+
+            tracemalloc.start()
+            fonction(params, df_amortissement, df_investissement)
+            pic = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+
+            resultats[etape]["duree_ms"][nom] = statistics.median(durees)
+            resultats[etape]["memoire_pic_kio"][nom] = pic / 1024
+
+    return {
+        "environnement": {
+            "python": platform.python_version(),
+            "plateforme": platform.platform(),
+            "processeur": platform.processor() or platform.machine(),
+        },
+        "repetitions": repetitions,
+        "etapes": {
+            etape: {
+                "duree_ms": sum(mesures["duree_ms"].values()),
+                "memoire_pic_kio": max(mesures["memoire_pic_kio"].values()),
+                "par_scenario": mesures,
+            }
+            for etape, mesures in resultats.items()
+        },
+        # ru_maxrss est en Kio sous Linux, en octets sous macOS
+        "rss_max_mio": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / (1024 ** 2 if sys.platform == "darwin" else 1024),
+    }
+
+
+def comparer(resultats, reference, seuil=SEUIL, seuil_memoire=SEUIL_MEMOIRE):
+    """Liste des régressions (messages) des étapes présentes dans les deux mesures."""
+    regressions = []
+    for etape, mesure in resultats["etapes"].items():
+        if etape not in reference["etapes"]:
+            continue
+        ancienne = reference["etapes"][etape]
+        if mesure["duree_ms"] > ancienne["duree_ms"] * (1 + seuil) and mesure["duree_ms"] - ancienne["duree_ms"] > PLANCHER_MS:
+            regressions.append(f"{etape} : {ancienne['duree_ms']:.1f} ms -> {mesure['duree_ms']:.1f} ms")
+        if mesure["memoire_pic_kio"] > ancienne["memoire_pic_kio"] * (1 + seuil_memoire):
+            regressions.append(f"{etape} : pic mémoire {ancienne['memoire_pic_kio']:.0f} Kio -> {mesure['memoire_pic_kio']:.0f} Kio")
+    return regressions
+
+
+def afficher(resultats, reference=None, sortie=sys.stdout):
+    print(f"{'étape':<12} {'durée (ms)':>12} {'référence':>12} {'pic (Kio)':>12} {'référence':>12}", file=sortie)
+    for etape, mesure in resultats["etapes"].items():
+        ancienne = (reference or {}).get("etapes", {}).get(etape)
+        print(f"{etape:<12} {mesure['duree_ms']:>12.1f} {ancienne['duree_ms'] if ancienne else float('nan'):>12.1f} "
+              f"{mesure['memoire_pic_kio']:>12.0f} {ancienne['memoire_pic_kio'] if ancienne else float('nan'):>12.0f}", file=sortie)
+    print(f"RSS max : {resultats['rss_max_mio']:.0f} Mio", file=sortie)
+
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(description="Banc de performance du simulateur SCPI.")
+    parser.add_argument("--reference", default=REFERENCE, help="fichier JSON de référence")
+    parser.add_argument("--enregistrer", action="store_true", help="écrit les mesures comme nouvelle référence au lieu de comparer")
+    parser.add_argument("--sortie", help="écrit aussi les mesures dans ce fichier JSON")
+    parser.add_argument("--repetitions", type=int, default=REPETITIONS, help="mesures par étape et par scénario (médiane)")
+    parser.add_argument("--seuil", type=float, default=SEUIL, help="hausse de durée tolérée, en fraction de la référence")
+    parser.add_argument("--seuil-memoire", type=float, default=SEUIL_MEMOIRE, help="hausse de pic mémoire tolérée, en fraction")
+    parser.add_argument("--etapes", help="étapes à mesurer, séparées par des virgules (défaut : toutes)")
+    args = parser.parse_args(arguments)
+
+    # Les modules de l'application (simulateur_scpi, assets/) sont relatifs à la racine du dépôt
+    sys.path.insert(0, RACINE)
+    resultats = mesurer(args.repetitions, args.etapes.split(",") if args.etapes else None)
+
+    for chemin in filter(None, (args.sortie, args.reference if args.enregistrer else None)):
+        with open(chemin, "w") as f:
+            json.dump(resultats, f, indent=2, ensure_ascii=False)
+            f.write("\n")
+
+    reference = None
+    if not args.enregistrer and os.path.exists(args.reference):
+        with open(args.reference) as f:
+            reference = json.load(f)
+    afficher(resultats, reference)
+    if reference is not None and reference.get("environnement") != resultats["environnement"]:
+        print("Attention : référence mesurée dans un autre environnement, relancez avec --enregistrer sur cette machine", file=sys.stderr)
+
+    if reference is not None:
+        regressions = comparer(resultats, reference, args.seuil, args.seuil_memoire)
+        for regression in regressions:
+            print(f"RÉGRESSION {regression}", file=sys.stderr)
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
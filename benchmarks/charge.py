@@ -0,0 +1,227 @@
+"""Test de charge : N sessions simultanées rejouant des réglages de la barre latérale.
+
+    python -m benchmarks.charge                          # paliers 1, 5, 10, 25 sessions
+    python -m benchmarks.charge --paliers 10,50 --reruns 20 --objectif-ms 500
+
+Chaque session est une ``AppTest`` de Streamlit, exécutée dans le processus comme par
+le serveur : les sessions partagent donc les caches de processus (``cache_simulation``,
+``st.cache_resource``). Une session part des valeurs par défaut puis rejoue une suite
+de réglages tirés au hasard (durée, apport, taux, TMI, onglet affiché...), séparés
+par un temps de réflexion ; chaque réglage déclenche un rerun.
+
+Pendant un run, ``AppTest`` remplace des objets globaux de Streamlit (runtime,
+configuration) : deux runs ne peuvent pas se chevaucher dans un même processus. Les
+sessions tournent donc dans des threads mais leurs reruns passent un à un, comme le
+code Python d'un serveur mono-processus sous le GIL. La latence d'un rerun compte
+l'attente derrière les autres sessions ; la durée d'exécution seule est donnée à part.
+Les sessions sont ouvertes une à une avant la mesure (l'ouverture d'une ``AppTest``
+coûte surtout au banc lui-même) ; le plafond de concurrence est le plus grand palier
+dont le p95 de latence des reruns reste sous ``--objectif-ms``.
+
+La mémoire par session est mesurée à part, sous ``tracemalloc``, sur des sessions
+rejouées l'une après l'autre : c'est ce que libère leur fermeture. Ce qu'elles ont
+ajouté aux caches partagés, qui survit aux sessions, est compté séparément.
+"""
+import argparse
+import concurrent.futures
+import gc
+import json
+import logging
+import os
+import random
+import statistics
+import sys
+import threading
+import time
+import tracemalloc
+
+RACINE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APPLICATION = os.path.join(RACINE, "simulateur_scpi.py")
+PALIERS = (1, 5, 10, 25)
+RERUNS = 10
+# Temps de réflexion moyen entre deux réglages d'une même session
+REFLEXION_MS = 2000.0
+OBJECTIF_MS = 1000.0
+DELAI_MAX = 120
+SESSIONS_MEMOIRE = 5
+PERCENTILES = (50, 90, 95, 99)
+
+# Réglages rejoués : (type de widget, libellé, valeurs plausibles)
+REGLAGES = (
+    ("number_input", "💰 Montant investissement (€)", range(50000, 300001, 10000)),
+    ("number_input", "💶 Apport (€)", range(0, 30001, 1000)),
+    ("slider", "🕒 Durée prêt (mois)", range(120, 301, 12)),
+    ("number_input", "📈 Taux intérêt (%)", [taux / 100 for taux in range(300, 551, 5)]),
+    ("slider", "📈 Rendement locatif (%)", [rendement / 10 for rendement in range(40, 71)]),
+    ("slider", "📊 Taux de revalorisation (%)", [taux / 10 for taux in range(0, 21)]),
+    ("slider", "🕒 Délai de jouissance (mois)", range(3, 7)),
+    ("select_slider", "🚥 Taux d'imposition (TMI)", (11, 30, 41)),
+    ("selectbox", "⏳ Modalité du différé", ("Sans différé", "Différé partiel", "Différé total")),
+    # Changement d'onglet (clé ``onglet`` de ``st.tabs``)
+    ("onglet", "onglet", ("Vue d'ensemble", "Tableau d'amortissement", "Tableau d'investissement", "Sensibilité")),
+)
+
+_verrou_run = threading.Lock()
+
+
+def sequence(graine, nb_reruns, reflexion_ms=REFLEXION_MS):
+    """Suite de réglages ``(type, libellé, valeur, pause en s)`` d'une session, reproductible."""
+    alea = random.Random(graine)
+    return [(type_widget, libelle, alea.choice(valeurs), alea.expovariate(1000 / reflexion_ms) if reflexion_ms > 0 else 0.0)
+            for type_widget, libelle, valeurs in alea.choices(REGLAGES, k=nb_reruns)]
+
+
+def _widget(application, type_widget, libelle):
+    for widget in getattr(application, type_widget):
+        if widget.label == libelle:
+            return widget
+    raise LookupError(f"{type_widget} {libelle!r} absent de la page")
+
+
+class Session:
+    """Une session simulée : une ``AppTest``, la latence et la durée d'exécution de ses reruns (ms)."""
+
+    def __init__(self, graine, nb_reruns, reflexion_ms=REFLEXION_MS):
+        from streamlit.testing.v1 import AppTest
+
+        self.application = AppTest.from_file(APPLICATION, default_timeout=DELAI_MAX)
+        self.reglages = sequence(graine, nb_reruns, reflexion_ms)
+        # Premiers réglages étalés sur un temps de réflexion, plutôt que tous au même instant
+        self.arrivee = random.Random(-1 - graine).uniform(0, reflexion_ms / 1000)
+        self.ouverte = False
+        self.latences_ms = []
+        self.executions_ms = []
+
+    def _rerun(self, action=None):
+        debut = time.perf_counter()
+        with _verrou_run:
+            debut_execution = time.perf_counter()
+            if action is None:
+                self.application.run()
+            else:
+                action.run()
+        fin = time.perf_counter()
+        self.latences_ms.append((fin - debut) * 1000)
+        self.executions_ms.append((fin - debut_execution) * 1000)
+        if self.application.exception:
+            raise RuntimeError(f"Exception dans l'application : {self.application.exception[0].message}")
+
+    def ouvrir(self):
+        """Premier affichage ; sa durée compte aussi la mise en place de l'``AppTest`` elle-même."""
+        debut = time.perf_counter()
+        self._rerun()
+        self.latences_ms.clear()
+        self.executions_ms.clear()
+        self.ouverte = True
+        return (time.perf_counter() - debut) * 1000
+
+    def jouer(self, depart=None):
+        # Un rerun par réglage ; ``depart`` synchronise les sessions d'un palier
+        if not self.ouverte:
+            self.ouvrir()
+        if depart is not None:
+            depart.wait()
+            time.sleep(self.arrivee)
+        for type_widget, libelle, valeur, pause in self.reglages:
+            time.sleep(pause)
+            if type_widget == "onglet":
+                self.application.session_state[libelle] = valeur
+                self._rerun()
+            else:
+                self._rerun(_widget(self.application, type_widget, libelle).set_value(valeur))
+        return self
+
+
+def percentiles(valeurs):
+    valeurs = sorted(valeurs)
+    quantiles = statistics.quantiles(valeurs, n=100, method="inclusive") if len(valeurs) > 1 else valeurs * 99
+    return {f"p{p}": quantiles[p - 1] for p in PERCENTILES} | {"max": valeurs[-1]}
+
+
+def palier(nb_sessions, nb_reruns, reflexion_ms=REFLEXION_MS, graine=0):
+    """Latences et durées d'exécution (ms) de ``nb_sessions`` sessions jouées en parallèle."""
+    sessions = [Session(graine + i, nb_reruns, reflexion_ms) for i in range(nb_sessions)]
+    # Sessions ouvertes une à une avant la mesure : l'ouverture d'une AppTest coûte bien plus qu'un rerun
+    ouvertures = [session.ouvrir() for session in sessions]
+    depart = threading.Barrier(nb_sessions)
+    debut = time.perf_counter()
+    with concurrent.futures.ThreadPoolExecutor(nb_sessions) as executeur:
+        list(executeur.map(lambda session: session.jouer(depart), sessions))
+    duree = time.perf_counter() - debut
+
+    latences = [latence for session in sessions for latence in session.latences_ms]
+    executions = [execution for session in sessions for execution in session.executions_ms]
+    return {
+        "sessions": nb_sessions,
+        "reruns": len(latences),
+        "reruns_par_seconde": len(latences) / duree,
+        # Part du temps passée à exécuter des reruns : proche de 1, le processus est saturé
+        "occupation": sum(executions) / 1000 / duree,
+        "latence_ms": percentiles(latences),
+        "execution_ms": percentiles(executions),
+        "ouverture_ms": percentiles(ouvertures),
+    }
+
+
+def memoire_par_session(nb_sessions=SESSIONS_MEMOIRE, nb_reruns=RERUNS, graine=0):
+    """Mémoire (Kio) libérée à la fermeture d'une session, et mémoire restée dans les caches partagés."""
+    # Une session de préchauffage : imports, caches de module et de ressources
+    Session(graine, nb_reruns, reflexion_ms=0).jouer()
+    gc.collect()
+    tracemalloc.start()
+    avant = tracemalloc.get_traced_memory()[0]
+    sessions = [Session(graine + i, nb_reruns, reflexion_ms=0).jouer() for i in range(nb_sessions)]
+    gc.collect()
+    ouvertes = tracemalloc.get_traced_memory()[0]
+    del sessions
+    gc.collect()
+    fermees = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return {"par_session_kio": (ouvertes - fermees) / nb_sessions / 1024, "caches_partages_kio": (fermees - avant) / 1024}
+
+
+def mesurer(paliers=PALIERS, nb_reruns=RERUNS, reflexion_ms=REFLEXION_MS, objectif_ms=OBJECTIF_MS, graine=0):
+    resultats = {"reflexion_ms": reflexion_ms, "paliers": [palier(nb_sessions, nb_reruns, reflexion_ms, graine) for nb_sessions in paliers]}
+    tenus = [mesure["sessions"] for mesure in resultats["paliers"] if mesure["latence_ms"]["p95"] <= objectif_ms]
+    resultats["objectif_p95_ms"] = objectif_ms
+    resultats["plafond_sessions"] = max(tenus, default=0)
+    resultats["memoire"] = memoire_par_session(nb_reruns=nb_reruns, graine=graine)
+    return resultats
+
+
+def afficher(resultats, sortie=sys.stdout):
+    noms = [f"p{p}" for p in PERCENTILES] + ["max"]
+    print(f"{'sessions':>8} {'reruns/s':>9} {'occup.':>7} " + " ".join(f"{nom:>7}" for nom in noms) + f" {'exec p50':>9} {'exec p95':>9}", file=sortie)
+    for mesure in resultats["paliers"]:
+        print(f"{mesure['sessions']:>8} {mesure['reruns_par_seconde']:>9.1f} {mesure['occupation']:>7.0%} "
+              + " ".join(f"{valeur:>7.0f}" for valeur in mesure["latence_ms"].values())
+              + f" {mesure['execution_ms']['p50']:>9.0f} {mesure['execution_ms']['p95']:>9.0f}", file=sortie)
+    print(f"Latences en ms, réflexion moyenne {resultats['reflexion_ms']:.0f} ms entre deux réglages", file=sortie)
+    print(f"Plafond (p95 <= {resultats['objectif_p95_ms']:.0f} ms) : {resultats['plafond_sessions']} sessions", file=sortie)
+    memoire = resultats["memoire"]
+    print(f"Mémoire par session : {memoire['par_session_kio']:.0f} Kio, ajoutée aux caches partagés : {memoire['caches_partages_kio']:.0f} Kio", file=sortie)
+
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(description="Test de charge multi-sessions du simulateur SCPI.")
+    parser.add_argument("--paliers", default=",".join(map(str, PALIERS)), help="nombres de sessions simultanées, séparés par des virgules")
+    parser.add_argument("--reruns", type=int, default=RERUNS, help="réglages rejoués par session")
+    parser.add_argument("--reflexion-ms", type=float, default=REFLEXION_MS, help="temps de réflexion moyen entre deux réglages (0 : sans pause)")
+    parser.add_argument("--objectif-ms", type=float, default=OBJECTIF_MS, help="p95 de latence visé pour le plafond de concurrence")
+    parser.add_argument("--graine", type=int, default=0, help="graine des suites de réglages")
+    parser.add_argument("--sortie", help="écrit aussi les mesures dans ce fichier JSON")
+    args = parser.parse_args(arguments)
+
+    # Hors serveur Streamlit, les appels st.* journalisent des avertissements
+    logging.disable(logging.WARNING)
+    sys.path.insert(0, RACINE)
+    resultats = mesurer([int(nb) for nb in args.paliers.split(",")], args.reruns, args.reflexion_ms, args.objectif_ms, args.graine)
+    if args.sortie:
+        with open(args.sortie, "w") as f:
+            json.dump(resultats, f, indent=2, ensure_ascii=False)
+            f.write("\n")
+    afficher(resultats)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+"""Cœur de calcul du simulateur SCPI, utilisable sans Streamlit.
+
+Les fonctions publiques sont réexportées paresseusement : ``import scpi`` ne charge
+ni numpy ni pandas, seul le premier accès à une fonction importe son module.
+"""
+import importlib
+
+_EXPORTS = {
+    "tab_amortissement": "scpi.moteur",
+    "tab_amortissement_reference": "scpi.moteur",
+    "tab_investissement": "scpi.moteur",
+    "simulation": "scpi.moteur",
+    "indicateurs": "scpi.moteur",
+    "simuler_lot": "scpi.lot",
+    "resume_lot": "scpi.lot",
+    "monte_carlo": "scpi.monte_carlo",
+    "simulation_taux_variable": "scpi.taux_variable",
+    "trajectoires_taux": "scpi.taux_variable",
+    "cache_simulation": "scpi.cache",
+    "chercher_parametre": "scpi.solveur",
+    "grille_sensibilite": "scpi.sensibilite",
+    "optimiser_financement": "scpi.optimiseur",
+    "simulation_portefeuille": "scpi.portefeuille",
+    "projections_portefeuille": "scpi.portefeuille",
+    "exporter": "scpi.export",
+    "exporter_lot": "scpi.export",
+    "valider_lot": "scpi.validation",
+    "Resultats": "scpi.resultats",
+    "resultats_lot": "scpi.resultats",
+    "Entrepot": "scpi.entrepot",
+    "IndexSortie": "scpi.sortie",
+    "sorties_lot": "scpi.sortie",
+    "tri_lot": "scpi.rentabilite",
+    "flux_tresorerie": "scpi.rentabilite",
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(nom):
+    if nom not in _EXPORTS:
+        raise AttributeError(f"module 'scpi' has no attribute {nom!r}")
+    valeur = getattr(importlib.import_module(_EXPORTS[nom]), nom)
+    globals()[nom] = valeur
+    return valeur
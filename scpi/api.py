@@ -0,0 +1,359 @@
+"""Service HTTP/JSON de simulation, pour les appels programmatiques (CRM, scripts).
+
+    python -m scpi.api --port 8765 --travailleurs 4
+
+    POST /simulation   {"params": {...} | [{...}, ...], "details": false}
+    GET  /sante        état du service, file d'attente et cache
+
+Chaque jeu de paramètres reprend les clés de ``input_simulateur``. La réponse donne,
+par jeu, les indicateurs de ``resume_lot`` (et avec ``"details": true`` l'échéancier
+et le tableau d'investissement), ou ``{"erreur": ...}`` si la validation échoue.
+
+Le front asyncio ne calcule rien : les scénarios absents du cache partagé sont
+regroupés par lots (au plus ``taille_lot`` scénarios, ``delai_lot`` secondes d'attente)
+et simulés d'un bloc par le moteur vectorisé dans un pool de processus. Un scénario
+déjà en cours de calcul n'est pas soumis deux fois. Au-delà de ``attente_max``
+scénarios en attente, le service répond 503 avec ``Retry-After`` au lieu d'empiler.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import math
+import os
+import sys
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+from scpi.cache import cache_simulation, cle_params
+
+TAILLE_LOT = 512
+DELAI_LOT = 0.002
+ATTENTE_MAX = 20_000
+TAILLE_CORPS_MAX = 8 * 1024 ** 2
+STATUTS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed", 413: "Payload Too Large", 500: "Internal Server Error", 503: "Service Unavailable"}
+
+journal = logging.getLogger(__name__)
+
+
+class ErreurRequete(Exception):
+    def __init__(self, statut, message):
+        super().__init__(message)
+        self.statut = statut
+
+
+def _nombre(valeur):
+    # JSON n'a pas de NaN ni d'infini
+    return valeur if math.isfinite(valeur) else None
+
+
+def _colonnes(df):
+    return {colonne: [_nombre(valeur) for valeur in df[colonne].tolist()] for colonne in df}
+
+
+def _resumer(liste_params):
+    """Indicateurs de chaque scénario, en une passe du moteur par lot (exécuté dans un processus du pool)."""
+    import pandas as pd
+
+    from scpi.lot import resume_lot
+
+    indicateurs = resume_lot(pd.DataFrame(liste_params))
+    return [{colonne: _nombre(valeur) for colonne, valeur in ligne.items()} for ligne in indicateurs.to_dict("records")]
+
+
+def _detailler(liste_params):
+    """Indicateurs, échéancier et tableau d'investissement de chaque scénario."""
+    from scpi.moteur import simulation
+
+    resultats = []
+    for params, indicateurs in zip(liste_params, _resumer(liste_params)):
+        df_amortissement, _, df_investissement = simulation(params)
+        resultats.append({"indicateurs": indicateurs, "amortissement": _colonnes(df_amortissement), "investissement": _colonnes(df_investissement)})
+    return resultats
+
+
+class Regroupeur:
+    """File de scénarios vidée par lots vers ``fonction(liste_params)`` dans l'exécuteur."""
+
+    def __init__(self, fonction, executeur, taille_lot, delai_lot, lots_paralleles):
+        self.fonction = fonction
+        self.executeur = executeur
+        self.taille_lot = taille_lot
+        self.delai_lot = delai_lot
+        self.file = asyncio.Queue()
+        self.lots = 0
+        self._places = asyncio.Semaphore(lots_paralleles)
+        self._tache = asyncio.create_task(self._boucle())
+
+    def soumettre(self, params):
+        futur = asyncio.get_running_loop().create_future()
+        self.file.put_nowait((params, futur))
+        return futur
+
+    async def arreter(self):
+        self._tache.cancel()
+        try:
+            await self._tache
+        except asyncio.CancelledError:
+            pass
+
+    async def _boucle(self):
+        while True:
+            # Tant que tous les processus sont occupés, la file s'allonge et le lot suivant grossit
+            await self._places.acquire()
+            lot = [await self.file.get()]
+            if self.file.qsize() < self.taille_lot - 1:
+                await asyncio.sleep(self.delai_lot)
+            while len(lot) < self.taille_lot and not self.file.empty():
+                lot.append(self.file.get_nowait())
+            self.lots += 1
+            asyncio.create_task(self._executer(lot))
+
+    async def _executer(self, lot):
+        try:
+            resultats = await asyncio.get_running_loop().run_in_executor(self.executeur, self.fonction, [params for params, _ in lot])
+        except Exception as exc:
+            for _, futur in lot:
+                if not futur.done():
+                    futur.set_exception(exc)
+        else:
+            for (_, futur), resultat in zip(lot, resultats):
+                if not futur.done():
+                    futur.set_result(resultat)
+        finally:
+            self._places.release()
+
+
+class Service:
+    """Routage, validation, cache et regroupement ; ``servir`` l'expose en HTTP, ``traiter`` en direct."""
+
+    def __init__(self, travailleurs=None, processus=True, taille_lot=TAILLE_LOT, delai_lot=DELAI_LOT, attente_max=ATTENTE_MAX, cache=cache_simulation):
+        self.travailleurs = travailleurs or os.cpu_count() or 1
+        self.processus = processus
+        self.taille_lot = taille_lot
+        self.delai_lot = delai_lot
+        self.attente_max = attente_max
+        self.cache = cache
+        self.en_attente = 0
+        self.requetes = 0
+        self.rejets = 0
+        self._en_cours = {}
+        self._executeur = None
+        self._regroupeurs = {}
+
+    async def demarrer(self):
+        self._executeur = (ProcessPoolExecutor if self.processus else ThreadPoolExecutor)(max_workers=self.travailleurs)
+        # Deux lots par processus au plus : l'un calcule pendant que l'autre transite
+        self._regroupeurs = {
+            details: Regroupeur(_detailler if details else _resumer, self._executeur, self.taille_lot, self.delai_lot, 2 * self.travailleurs)
+            for details in (False, True)
+        }
+
+    async def arreter(self):
+        for regroupeur in self._regroupeurs.values():
+            await regroupeur.arreter()
+        self._executeur.shutdown(wait=False, cancel_futures=True)
+
+    async def simuler(self, liste_params, details=False):
+        """Résultat (ou erreur de validation) de chaque jeu de paramètres, dans l'ordre."""
+        from scpi.validation import valider_lot
+
+        # Seuls les scénarios valides entrent dans le cache : un succès dispense de la validation
+        espace = "api:details" if details else "api:resume"
+        cles = [cle_params(params, espace) for params in liste_params]
+        resultats = [self.cache.consulter(cle) for cle in cles]
+        a_valider = [indice for indice, resultat in enumerate(resultats) if resultat is None]
+        if not a_valider:
+            return resultats
+
+        # Colonnes communes à tous les jeux, une clé absente d'un seul jeu est signalée comme manquante
+        communes = set.intersection(*(set(liste_params[indice]) for indice in a_valider))
+        try:
+            erreurs = valider_lot({cle: [liste_params[indice][cle] for indice in a_valider] for cle in communes})
+        except ValueError as exc:
+            raise ErreurRequete(400, str(exc))
+
+        manquants = []
+        for indice, erreur in zip(a_valider, erreurs):
+            if erreur:
+                resultats[indice] = {"erreur": erreur}
+            else:
+                manquants.append((indice, cles[indice], liste_params[indice]))
+
+        if self.en_attente + len(manquants) > self.attente_max:
+            self.rejets += 1
+            raise ErreurRequete(503, f"{self.en_attente} scénarios déjà en attente, réessayez plus tard")
+
+        attentes = []
+        for indice, cle, params in manquants:
+            if cle not in self._en_cours:
+                self._en_cours[cle] = self._regroupeurs[details].soumettre(params)
+                self._en_cours[cle].add_done_callback(lambda futur, cle=cle: self._terminer(cle, futur))
+            attentes.append((indice, self._en_cours[cle]))
+        self.en_attente += len(attentes)
+        try:
+            for (indice, _), resultat in zip(attentes, await asyncio.gather(*(asyncio.shield(futur) for _, futur in attentes))):
+                resultats[indice] = resultat
+        finally:
+            self.en_attente -= len(attentes)
+        return resultats
+
+    def _terminer(self, cle, futur):
+        del self._en_cours[cle]
+        if not futur.cancelled() and futur.exception() is None:
+            self.cache.deposer(cle, futur.result())
+
+    def sante(self):
+        return {
+            "statut": "ok",
+            "travailleurs": self.travailleurs,
+            "en_attente": self.en_attente,
+            "requetes": self.requetes,
+            "rejets": self.rejets,
+            "lots": {("details" if details else "resume"): regroupeur.lots for details, regroupeur in self._regroupeurs.items()},
+            "cache": self.cache.statistiques(),
+        }
+
+    async def traiter(self, methode, cible, corps=b""):
+        """Statut HTTP et objet JSON de la réponse à une requête."""
+        self.requetes += 1
+        chemin = urlsplit(cible).path.rstrip("/") or "/"
+        try:
+            if chemin == "/sante":
+                if methode != "GET":
+                    raise ErreurRequete(405, "GET attendu")
+                return 200, self.sante()
+            if chemin != "/simulation":
+                raise ErreurRequete(404, f"Chemin inconnu : {chemin}")
+            if methode != "POST":
+                raise ErreurRequete(405, "POST attendu")
+
+            try:
+                requete = json.loads(corps)
+            except ValueError:
+                raise ErreurRequete(400, "Corps JSON invalide")
+            if not isinstance(requete, dict) or "params" not in requete:
+                raise ErreurRequete(400, 'Objet {"params": ...} attendu')
+            params = requete["params"]
+            unique = isinstance(params, dict)
+            liste_params = [params] if unique else params
+            if not isinstance(liste_params, list) or not liste_params or not all(isinstance(p, dict) for p in liste_params):
+                raise ErreurRequete(400, "params doit être un objet ou une liste non vide d'objets")
+
+            resultats = await self.simuler(liste_params, bool(requete.get("details", False)))
+            return 200, resultats[0] if unique else {"resultats": resultats}
+        except ErreurRequete as exc:
+            return exc.statut, {"erreur": str(exc)}
+        except Exception as exc:
+            # Moteur ou processus du pool en échec : le client reçoit tout de même une réponse
+            journal.exception("Échec de %s %s", methode, chemin)
+            return 500, {"erreur": f"Erreur interne ({type(exc).__name__})"}
+
+    async def _connexion(self, lecteur, ecrivain):
+        # HTTP/1.1 minimal : corps par Content-Length, connexions persistantes
+        try:
+            while True:
+                ligne = await lecteur.readline()
+                if not ligne:
+                    break
+                methode, cible, version = ligne.decode("latin-1").split()
+                entetes = {}
+                while (ligne := await lecteur.readline()) not in (b"\r\n", b"\n", b""):
+                    nom, _, valeur = ligne.decode("latin-1").partition(":")
+                    entetes[nom.strip().lower()] = valeur.strip()
+
+                longueur = int(entetes.get("content-length", 0))
+                garder = version == "HTTP/1.1" and entetes.get("connection", "").lower() != "close"
+                if longueur > TAILLE_CORPS_MAX:
+                    statut, reponse, garder = 413, {"erreur": f"Corps limité à {TAILLE_CORPS_MAX} octets"}, False
+                else:
+                    statut, reponse = await self.traiter(methode, cible, await lecteur.readexactly(longueur))
+
+                donnees = json.dumps(reponse, ensure_ascii=False).encode()
+                lignes = [
+                    f"HTTP/1.1 {statut} {STATUTS[statut]}",
+                    "Content-Type: application/json; charset=utf-8",
+                    f"Content-Length: {len(donnees)}",
+                    f"Connection: {'keep-alive' if garder else 'close'}",
+                ]
+                if statut == 503:
+                    lignes.append("Retry-After: 1")
+                ecrivain.write(("\r\n".join(lignes) + "\r\n\r\n").encode("latin-1") + donnees)
+                await ecrivain.drain()
+                if not garder:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        finally:
+            ecrivain.close()
+
+    async def servir(self, hote="127.0.0.1", port=8765):
+        await self.demarrer()
+        serveur = await asyncio.start_server(self._connexion, hote, port, backlog=1024)
+        try:
+            async with serveur:
+                await serveur.serve_forever()
+        finally:
+            await self.arreter()
+
+
+class ClientLocal:
+    """Client synchrone d'un ``Service`` du même processus, sans socket ni serveur externe.
+
+        with ClientLocal(processus=False) as client:
+            statut, reponse = client.post("/simulation", {"params": params})
+
+    Le service tourne dans sa propre boucle asyncio, sur un thread dédié ; les options
+    sont celles de ``Service``.
+    """
+
+    def __init__(self, **options):
+        self.service = Service(**options)
+        self._boucle = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._boucle.run_forever, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        self._executer(self.service.demarrer())
+        return self
+
+    def __exit__(self, *exc):
+        self._executer(self.service.arreter())
+        self._boucle.call_soon_threadsafe(self._boucle.stop)
+        self._thread.join()
+        self._boucle.close()
+
+    def _executer(self, coroutine):
+        return asyncio.run_coroutine_threadsafe(coroutine, self._boucle).result()
+
+    def requete(self, methode, chemin, corps=None):
+        return self._executer(self.service.traiter(methode, chemin, b"" if corps is None else json.dumps(corps).encode()))
+
+    def get(self, chemin):
+        return self.requete("GET", chemin)
+
+    def post(self, chemin, corps):
+        return self.requete("POST", chemin, corps)
+
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(description="Service HTTP/JSON du simulateur SCPI.")
+    parser.add_argument("--hote", default="127.0.0.1", help="adresse d'écoute")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--travailleurs", type=int, default=None, help="nombre de processus de calcul (défaut : nombre de cœurs)")
+    parser.add_argument("--taille-lot", type=int, default=TAILLE_LOT, help="scénarios au plus par lot envoyé au pool")
+    parser.add_argument("--delai-lot-ms", type=float, default=DELAI_LOT * 1000, help="attente maximale pour compléter un lot")
+    parser.add_argument("--attente-max", type=int, default=ATTENTE_MAX, help="scénarios en attente au-delà desquels le service répond 503")
+    args = parser.parse_args(arguments)
+
+    service = Service(args.travailleurs, taille_lot=args.taille_lot, delai_lot=args.delai_lot_ms / 1000, attente_max=args.attente_max)
+    print(f"Service SCPI sur http://{args.hote}:{args.port} ({service.travailleurs} processus)", file=sys.stderr)
+    try:
+        asyncio.run(service.servir(args.hote, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
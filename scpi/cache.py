@@ -0,0 +1,133 @@
+"""Cache de résultats partagé par toutes les sessions d'un même processus.
+
+Les entrées sont indexées par une empreinte canonique du dictionnaire ``params``
+et évincées par ancienneté (LRU, ou TTL si une durée de vie est fixée) dès que
+la mémoire occupée dépasse le plafond configuré.
+"""
+import hashlib
+import json
+import os
+import sys
+import threading
+
+import cachetools
+import numpy as np
+
+from scpi.trace import compter
+
+MEMOIRE_MAX = int(os.environ.get("SCPI_CACHE_MEMOIRE_MO", 256)) * 1024 ** 2
+
+
+def _valeur_canonique(valeur):
+    # Cas courants (valeurs des widgets) testés par type exact, avant les isinstance
+    type_valeur = type(valeur)
+    if type_valeur is float or type_valeur is str or type_valeur is bool:
+        return valeur
+    if type_valeur is int:
+        return float(valeur)
+    if isinstance(valeur, (bool, np.bool_)):
+        return bool(valeur)
+    if isinstance(valeur, (int, float, np.integer, np.floating)):
+        return float(valeur)
+    if isinstance(valeur, np.ndarray):
+        return [_valeur_canonique(v) for v in valeur.tolist()]
+    if isinstance(valeur, (list, tuple)):
+        return [_valeur_canonique(v) for v in valeur]
+    if isinstance(valeur, dict):
+        return {str(cle): _valeur_canonique(v) for cle, v in valeur.items()}
+    return valeur
+
+
+def cle_params(params, espace=""):
+    """Empreinte stable d'un jeu de paramètres : indépendante de l'ordre des clés et de int/float."""
+    texte = json.dumps([espace, _valeur_canonique(dict(params))], sort_keys=True, ensure_ascii=False)
+    return hashlib.blake2b(texte.encode(), digest_size=16).hexdigest()
+
+
+def taille_memoire(valeur):
+    """Estimation en octets d'un résultat (DataFrame, Series, tableau, figure ou tuple de ceux-ci)."""
+    if isinstance(valeur, (tuple, list)):
+        return sum(taille_memoire(v) for v in valeur)
+    if isinstance(valeur, dict):
+        return sum(taille_memoire(v) for v in valeur.values())
+    if hasattr(valeur, "memory_usage"):
+        # Types numériques : taille déduite des dtypes, sans parcourir les colonnes
+        types = valeur.dtypes if hasattr(valeur, "columns") else [valeur.dtype]
+        if all(type.kind in "biufcmM" for type in types):
+            return len(valeur) * sum(type.itemsize for type in types) + valeur.index.nbytes
+        usage = valeur.memory_usage(deep=True)
+        return int(usage.sum() if hasattr(usage, "sum") else usage)
+    if isinstance(valeur, np.ndarray):
+        return valeur.nbytes
+    if hasattr(valeur, "to_plotly_json"):
+        # Figure plotly : la taille de son JSON, déjà mesurée si la figure passe par controler_taille
+        return getattr(valeur, "_taille_json", None) or len(valeur.to_json())
+    return sys.getsizeof(valeur)
+
+
+class CacheSimulation:
+    """Mémoïsation thread-safe avec plafond mémoire et compteurs de succès/échecs."""
+
+    def __init__(self, memoire_max=MEMOIRE_MAX, duree_vie=None):
+        self.configurer(memoire_max, duree_vie)
+
+    def configurer(self, memoire_max=MEMOIRE_MAX, duree_vie=None):
+        self._verrou = threading.Lock()
+        if duree_vie is None:
+            self._cache = cachetools.LRUCache(maxsize=memoire_max, getsizeof=taille_memoire)
+        else:
+            self._cache = cachetools.TTLCache(maxsize=memoire_max, ttl=duree_vie, getsizeof=taille_memoire)
+        self.succes = 0
+        self.echecs = 0
+
+    def obtenir(self, params, calcul, espace="simulation"):
+        """Renvoie le résultat en cache pour ``params``, sinon ``calcul(params)`` mis en cache."""
+        cle = cle_params(params, espace)
+        resultat = self.consulter(cle)
+        if resultat is not None:
+            return resultat
+
+        # Calcul hors verrou : deux sessions peuvent calculer la même clé, sans incohérence
+        resultat = calcul(params)
+        self.deposer(cle, resultat)
+        return resultat
+
+    def consulter(self, cle):
+        """Résultat en cache pour l'empreinte ``cle`` (voir ``cle_params``), ou None ; compte le succès ou l'échec."""
+        with self._verrou:
+            resultat = self._cache.get(cle)
+            if resultat is not None:
+                self.succes += 1
+            else:
+                self.echecs += 1
+        compter("cache_succes" if resultat is not None else "cache_echecs")
+        return resultat
+
+    def deposer(self, cle, resultat):
+        with self._verrou:
+            try:
+                self._cache[cle] = resultat
+            except ValueError:
+                pass  # Résultat plus gros que le plafond : non conservé
+
+    def vider(self):
+        with self._verrou:
+            self._cache.clear()
+            self.succes = 0
+            self.echecs = 0
+
+    def statistiques(self):
+        with self._verrou:
+            total = self.succes + self.echecs
+            return {
+                "succes": self.succes,
+                "echecs": self.echecs,
+                "taux_succes": self.succes / total if total else 0.0,
+                "entrees": len(self._cache),
+                "memoire": self._cache.currsize,
+                "memoire_max": self._cache.maxsize,
+            }
+
+
+# Instance unique du processus, partagée par toutes les sessions Streamlit
+cache_simulation = CacheSimulation()
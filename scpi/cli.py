@@ -0,0 +1,150 @@
+"""Simulation par lot en ligne de commande sur un fichier de profils clients.
+
+    python -m scpi.cli profils.csv resultats.csv --travailleurs 8
+
+L'entrée (CSV ou JSONL, une ligne par jeu de paramètres de ``input_simulateur``)
+est lue par blocs ; chaque bloc est validé puis simulé par un processus du pool.
+Les résultats sont écrits dans l'ordre de l'entrée, en CSV (un fichier) ou en
+Parquet (un répertoire de fichiers ``part-*.parquet``), et un point de reprise
+est enregistré après chaque bloc : relancer la même commande reprend au premier
+bloc non écrit.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+TAILLE_BLOC = 5000
+SUFFIXE_REPRISE = ".reprise.json"
+
+
+def lire_blocs(chemin, taille_bloc):
+    if chemin.endswith((".jsonl", ".ndjson")):
+        return pd.read_json(chemin, lines=True, chunksize=taille_bloc)
+    return pd.read_csv(chemin, chunksize=taille_bloc)
+
+
+def simuler_bloc(bloc, premiere_ligne):
+    """Valide et simule un bloc ; une ligne de résultat par ligne d'entrée."""
+    from scpi.lot import INDICATEURS, resume_lot
+    from scpi.validation import valider_lot
+
+    erreurs = valider_lot(bloc)
+    valides = erreurs == ""
+    resultats = pd.DataFrame({"ligne": range(premiere_ligne, premiere_ligne + len(bloc))})
+    if "id" in bloc:
+        resultats["id"] = bloc["id"].to_numpy()
+
+    # Mêmes colonnes pour tous les blocs, même sans aucune ligne valide : l'en-tête CSV vient du premier
+    indicateurs = resume_lot(bloc[valides].reset_index(drop=True)) if valides.any() else None
+    for colonne in INDICATEURS:
+        resultats[colonne] = float("nan")
+        if indicateurs is not None:
+            resultats.loc[valides, colonne] = indicateurs[colonne].to_numpy()
+    resultats["erreur"] = erreurs
+    return resultats
+
+
+class Sortie:
+    """Écriture ordonnée et reprenable des blocs de résultats."""
+
+    def __init__(self, chemin, entree, taille_bloc, reprise):
+        self.chemin = chemin
+        self.parquet = chemin.endswith(".parquet")
+        self.chemin_reprise = chemin.rstrip("/") + SUFFIXE_REPRISE
+        self.etat = {"entree": os.path.abspath(entree), "taille_bloc": taille_bloc, "blocs": 0, "lignes": 0, "octets": 0}
+
+        if reprise and os.path.exists(self.chemin_reprise):
+            with open(self.chemin_reprise) as f:
+                etat = json.load(f)
+            if (etat["entree"], etat["taille_bloc"]) != (self.etat["entree"], taille_bloc):
+                raise ValueError(f"Le point de reprise {self.chemin_reprise} concerne une autre entrée ou taille de bloc")
+            self.etat = etat
+        if self.parquet:
+            os.makedirs(chemin, exist_ok=True)
+            # Supprime les parties postérieures au dernier point de reprise
+            for partie in os.listdir(chemin):
+                if partie.startswith("part-") and int(partie[5:11]) >= self.etat["blocs"]:
+                    os.remove(os.path.join(chemin, partie))
+        else:
+            # Tronque ce qui a pu être écrit après le dernier point de reprise
+            with open(chemin, "ab") as f:
+                f.truncate(self.etat["octets"])
+
+    def ecrire(self, resultats):
+        if self.parquet:
+            from scpi.export import exporter
+
+            partie = os.path.join(self.chemin, f"part-{self.etat['blocs']:06d}.parquet")
+            with open(partie + ".tmp", "wb") as f:
+                f.write(exporter(resultats, "parquet"))
+            os.replace(partie + ".tmp", partie)
+        else:
+            with open(self.chemin, "ab") as f:
+                f.write(resultats.to_csv(index=False, header=self.etat["octets"] == 0).encode("utf-8"))
+                f.flush()
+                os.fsync(f.fileno())
+                self.etat["octets"] = f.tell()
+
+        self.etat["blocs"] += 1
+        self.etat["lignes"] += len(resultats)
+        with open(self.chemin_reprise + ".tmp", "w") as f:
+            json.dump(self.etat, f)
+        os.replace(self.chemin_reprise + ".tmp", self.chemin_reprise)
+
+    def terminer(self):
+        os.remove(self.chemin_reprise)
+
+
+def executer(entree, sortie, travailleurs=None, taille_bloc=TAILLE_BLOC, reprise=True, progression=sys.stderr):
+    """Simule tout le fichier ``entree`` et renvoie le nombre de lignes écrites dans ``sortie``."""
+    ecrivain = Sortie(sortie, entree, taille_bloc, reprise)
+    deja_ecrits = ecrivain.etat["blocs"]
+    travailleurs = travailleurs or os.cpu_count() or 1
+    debut = time.perf_counter()
+    en_cours = []
+
+    def ecrire_premier():
+        resultats = en_cours.pop(0).result()
+        ecrivain.ecrire(resultats)
+        if progression is not None:
+            duree = time.perf_counter() - debut
+            print(f"bloc {ecrivain.etat['blocs']} : {ecrivain.etat['lignes']} lignes, "
+                  f"{(resultats['erreur'] != '').sum()} rejetées, {ecrivain.etat['lignes'] / max(duree, 1e-9):,.0f} lignes/s",
+                  file=progression, flush=True)
+
+    with ProcessPoolExecutor(max_workers=travailleurs) as pool:
+        for numero, bloc in enumerate(lire_blocs(entree, taille_bloc)):
+            if numero < deja_ecrits:
+                continue
+            en_cours.append(pool.submit(simuler_bloc, bloc, numero * taille_bloc))
+            # Au plus deux blocs par processus en attente : mémoire bornée
+            while len(en_cours) >= 2 * travailleurs:
+                ecrire_premier()
+        while en_cours:
+            ecrire_premier()
+
+    lignes = ecrivain.etat["lignes"]
+    ecrivain.terminer()
+    return lignes
+
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(description="Simulation SCPI par lot sur un fichier de profils (CSV ou JSONL).")
+    parser.add_argument("entree", help="fichier CSV ou JSONL, une colonne par paramètre de input_simulateur")
+    parser.add_argument("sortie", help="fichier .csv, ou répertoire .parquet")
+    parser.add_argument("--travailleurs", type=int, default=None, help="nombre de processus (défaut : nombre de cœurs)")
+    parser.add_argument("--taille-bloc", type=int, default=TAILLE_BLOC, help="lignes par bloc")
+    parser.add_argument("--sans-reprise", action="store_true", help="ignore un point de reprise existant et recommence")
+    args = parser.parse_args(arguments)
+
+    lignes = executer(args.entree, args.sortie, args.travailleurs, args.taille_bloc, reprise=not args.sans_reprise)
+    print(f"{lignes} lignes écrites dans {args.sortie}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,304 @@
+"""Entrepôt sur disque des résultats d'un balayage de paramètres, projeté en mémoire.
+
+Un répertoire contient, par bloc de ``taille_bloc`` scénarios, trois fichiers ``.npy`` :
+séries annuelles (colonnes × scénarios × années, cf. ``scpi.resultats``), paramètres
+et indicateurs. ``meta.json`` décrit les blocs avec, pour chaque paramètre, ses bornes
+dans le bloc : une requête n'ouvre que les blocs dont les bornes la recoupent (un
+balayage produit dans l'ordre de ``itertools.product`` regroupe bien les premiers
+paramètres). ``index.npy`` associe l'empreinte des paramètres d'un scénario, triée,
+à son numéro de ligne : la recherche est dichotomique, sans dictionnaire en mémoire.
+
+Les fichiers sont ouverts avec ``np.load(mmap_mode="r")`` : charger un scénario ou
+une sélection ne lit que les pages concernées, et un scénario isolé est servi sans copie.
+
+    python -m scpi.entrepot balayage.csv entrepot/ --float32
+"""
+import argparse
+import hashlib
+import json
+import os
+import sys
+
+import numpy as np
+
+from scpi.lot import COLONNES_NUMERIQUES, NB_ANNEES, TYPES_DIFFERE
+from scpi.resultats import COLONNES, Resultats
+
+CHEMIN = os.environ.get("SCPI_ENTREPOT")
+TAILLE_BLOC = 16384
+# Paramètres stockés par scénario, en float64 : type de différé par son code, frais_inclus en 0/1
+COLONNES_PARAMS = (*COLONNES_NUMERIQUES, "code_differe", "frais_inclus")
+# Arrondi des paramètres dans l'empreinte : 4.96 / 100 et 0.0496 désignent le même scénario
+DECIMALES_CLE = 9
+TYPE_CLE = "S16"
+META = "meta.json"
+INDEX = "index.npy"
+
+
+def valeurs_params(lot):
+    """Matrice (N × paramètres) d'un lot normalisé, dans l'ordre de ``COLONNES_PARAMS``."""
+    return np.column_stack([np.asarray(lot[colonne], dtype=float) for colonne in COLONNES_PARAMS])
+
+
+def empreintes(valeurs):
+    """Empreinte (N,) de chaque ligne de paramètres, indépendante des écarts d'arrondi."""
+    # + 0.0 ramène -0.0 à 0.0, dont les octets diffèrent
+    lignes = np.ascontiguousarray(np.round(valeurs, DECIMALES_CLE) + 0.0)
+    return np.array([hashlib.blake2b(ligne.tobytes(), digest_size=16).digest() for ligne in lignes], dtype=TYPE_CLE)
+
+
+def _condition(valeurs, condition):
+    # Égalité pour une valeur, [min, max) pour un couple dont une borne peut valoir None
+    if isinstance(condition, tuple):
+        minimum, maximum = condition
+        masque = np.ones(len(valeurs), dtype=bool)
+        if minimum is not None:
+            masque &= valeurs >= minimum
+        if maximum is not None:
+            masque &= valeurs < maximum
+        return masque
+    return np.isclose(valeurs, condition, rtol=0, atol=10.0 ** -DECIMALES_CLE)
+
+
+def _normaliser_conditions(conditions):
+    inconnues = set(conditions) - set(COLONNES_PARAMS) - {"type_differe"}
+    if inconnues:
+        raise ValueError(f"Paramètres inconnus : {sorted(inconnues)}, valeurs possibles : {COLONNES_PARAMS}")
+    conditions = dict(conditions)
+    if "type_differe" in conditions:
+        conditions["code_differe"] = TYPES_DIFFERE.index(conditions.pop("type_differe"))
+    if "frais_inclus" in conditions:
+        conditions["frais_inclus"] = float(conditions["frais_inclus"])
+    return conditions
+
+
+class Entrepot:
+    """Lecture et écriture d'un entrepôt ; ``ajouter`` complète les blocs et l'index existants."""
+
+    def __init__(self, chemin, dtype=np.float64, taille_bloc=TAILLE_BLOC):
+        self.chemin = chemin
+        if os.path.exists(os.path.join(chemin, META)):
+            with open(os.path.join(chemin, META)) as f:
+                self.meta = json.load(f)
+            if self.meta["colonnes"] != list(COLONNES) or self.meta["params"] != list(COLONNES_PARAMS):
+                raise ValueError(f"L'entrepôt {chemin} a été écrit avec d'autres colonnes")
+        else:
+            self.meta = {"colonnes": list(COLONNES), "params": list(COLONNES_PARAMS), "dtype": np.dtype(dtype).name, "taille_bloc": taille_bloc, "nb_annees": NB_ANNEES, "blocs": []}
+        self.dtype = np.dtype(self.meta["dtype"])
+        self._index = None
+        self._fichiers = {}
+
+    def __len__(self):
+        return sum(bloc["lignes"] for bloc in self.meta["blocs"])
+
+    def _fichier(self, numero, nature):
+        return os.path.join(self.chemin, f"bloc-{numero:06d}.{nature}.npy")
+
+    def _charger(self, numero, nature):
+        # Projection ouverte une fois par fichier ; les blocs écrits ne changent plus
+        if (numero, nature) not in self._fichiers:
+            self._fichiers[numero, nature] = np.load(self._fichier(numero, nature), mmap_mode="r")
+        return self._fichiers[numero, nature]
+
+    def _ecrire_meta(self):
+        with open(os.path.join(self.chemin, META + ".tmp"), "w") as f:
+            json.dump(self.meta, f, ensure_ascii=False, indent=1)
+        os.replace(os.path.join(self.chemin, META + ".tmp"), os.path.join(self.chemin, META))
+
+    def ajouter(self, params):
+        """Simule les scénarios de ``params`` (colonnes, comme ``resume_lot``) et les ajoute en nouveaux blocs."""
+        from scpi.lot import extraire_lot, normaliser_lot, taille_lot
+        from scpi.resultats import resultats_depuis_lot
+
+        os.makedirs(self.chemin, exist_ok=True)
+        lot = normaliser_lot(params)
+        nouvelles = []
+        for debut in range(0, taille_lot(lot), self.meta["taille_bloc"]):
+            bloc = extraire_lot(lot, slice(debut, debut + self.meta["taille_bloc"]))
+            resultats = resultats_depuis_lot(bloc, self.dtype)
+            valeurs = valeurs_params(bloc)
+            numero = len(self.meta["blocs"])
+
+            np.save(self._fichier(numero, "series"), resultats.donnees)
+            np.save(self._fichier(numero, "params"), valeurs)
+            noms_indicateurs = list(resultats.scenarios)
+            np.save(self._fichier(numero, "indicateurs"), np.column_stack([resultats.scenarios[nom] for nom in noms_indicateurs]))
+            nouvelles.append(empreintes(valeurs))
+
+            self.meta["indicateurs"] = noms_indicateurs
+            self.meta["blocs"].append({
+                "premiere_ligne": len(self),
+                "lignes": len(valeurs),
+                "min": dict(zip(COLONNES_PARAMS, valeurs.min(axis=0).tolist())),
+                "max": dict(zip(COLONNES_PARAMS, valeurs.max(axis=0).tolist())),
+            })
+            # meta.json écrit après les fichiers du bloc : un bloc interrompu n'est jamais référencé
+            self._ecrire_meta()
+
+        self._indexer(nouvelles)
+        return len(self)
+
+    def _indexer(self, nouvelles):
+        # Fusionne les nouvelles empreintes dans l'index trié ; à empreinte égale, la première ligne écrite l'emporte
+        if not nouvelles:
+            return
+        ancien = np.load(os.path.join(self.chemin, INDEX)) if os.path.exists(os.path.join(self.chemin, INDEX)) else np.zeros(0, dtype=[("cle", TYPE_CLE), ("ligne", np.int64)])
+        cles = np.concatenate(nouvelles)
+        index = np.empty(len(ancien) + len(cles), dtype=ancien.dtype)
+        index[:len(ancien)] = ancien
+        index["cle"][len(ancien):] = cles
+        index["ligne"][len(ancien):] = np.arange(len(self) - len(cles), len(self))
+        index = index[np.argsort(index["cle"], kind="stable")]
+
+        np.save(os.path.join(self.chemin, INDEX + ".tmp.npy"), index)
+        os.replace(os.path.join(self.chemin, INDEX + ".tmp.npy"), os.path.join(self.chemin, INDEX))
+        self._index = None
+
+    @property
+    def index(self):
+        if self._index is None:
+            self._index = np.load(os.path.join(self.chemin, INDEX), mmap_mode="r")
+        return self._index
+
+    def _bloc_de(self, ligne):
+        premieres = [bloc["premiere_ligne"] for bloc in self.meta["blocs"]]
+        numero = int(np.searchsorted(premieres, ligne, side="right")) - 1
+        return numero, ligne - premieres[numero]
+
+    def ligne(self, params):
+        """Numéro de ligne du scénario ``params`` (un jeu de ``input_simulateur``), ou None s'il n'est pas stocké."""
+        from scpi.lot import normaliser_lot
+
+        if not self.meta["blocs"]:
+            return None
+        cle = empreintes(valeurs_params(normaliser_lot(params)))[0]
+        position = int(np.searchsorted(self.index["cle"], cle))
+        if position == len(self.index) or self.index["cle"][position] != cle:
+            return None
+        return int(self.index["ligne"][position])
+
+    def bloc(self, numero):
+        """Bloc ``numero`` en ``Resultats`` : séries projetées en mémoire, paramètres et indicateurs par scénario."""
+        params = self._charger(numero, "params")
+        indicateurs = self._charger(numero, "indicateurs")
+        scenarios = {
+            **{colonne: params[:, i] for i, colonne in enumerate(COLONNES_PARAMS)},
+            **{nom: indicateurs[:, i] for i, nom in enumerate(self.meta["indicateurs"])},
+        }
+        return Resultats(self._charger(numero, "series"), scenarios)
+
+    def charger(self, params):
+        """Scénario stocké (``Resultats`` d'une ligne, vues sur les fichiers), ou None."""
+        ligne = self.ligne(params)
+        if ligne is None:
+            return None
+        numero, position = self._bloc_de(ligne)
+        return self.bloc(numero).selection(slice(position, position + 1))
+
+    def simulation(self, params):
+        """Comme ``scpi.moteur.simulation`` quand le scénario est stocké, sinon None.
+
+        Seul l'échéancier mensuel, qui n'est pas stocké, est recalculé (étape mise en cache).
+        """
+        from scpi.graphe import calculer
+
+        resultats = self.charger(params)
+        if resultats is None:
+            return None
+        df_amortissement, capital_restant_annuel = calculer(params, "tab_amortissement")
+        return df_amortissement, capital_restant_annuel, resultats.dataframe(0)
+
+    def blocs_candidats(self, **conditions):
+        """Numéros des blocs dont les bornes recoupent ``conditions`` (voir ``selectionner``)."""
+        conditions = _normaliser_conditions(conditions)
+        candidats = []
+        for numero, bloc in enumerate(self.meta["blocs"]):
+            bornes = {colonne: np.array([bloc["min"][colonne], bloc["max"][colonne]]) for colonne in conditions}
+            if all(self._recoupe(bornes[colonne], condition) for colonne, condition in conditions.items()):
+                candidats.append(numero)
+        return candidats
+
+    @staticmethod
+    def _recoupe(bornes, condition):
+        minimum, maximum = bornes
+        if isinstance(condition, tuple):
+            bas, haut = condition
+            return (bas is None or maximum >= bas) and (haut is None or minimum < haut)
+        return minimum - 10.0 ** -DECIMALES_CLE <= condition <= maximum + 10.0 ** -DECIMALES_CLE
+
+    def selectionner(self, **conditions):
+        """Scénarios vérifiant toutes les ``conditions``, copiés dans un ``Resultats``.
+
+        Une condition est une valeur (égalité ; libellé pour ``type_differe``) ou un couple
+        ``(min, max)`` pour l'intervalle [min, max), une borne pouvant valoir None :
+        ``selectionner(duree_pret=300, taux_interet=(None, 0.04))``. La colonne ``ligne``
+        donne le numéro de chaque scénario dans l'entrepôt.
+        """
+        normalisees = _normaliser_conditions(conditions)
+        morceaux = []
+        for numero in self.blocs_candidats(**conditions):
+            params = self._charger(numero, "params")
+            masque = np.ones(len(params), dtype=bool)
+            for colonne, condition in normalisees.items():
+                masque &= _condition(params[:, COLONNES_PARAMS.index(colonne)], condition)
+            if masque.any():
+                selection = self.bloc(numero).selection(np.flatnonzero(masque))
+                selection.scenarios["ligne"] = self.meta["blocs"][numero]["premiere_ligne"] + np.flatnonzero(masque)
+                morceaux.append(selection)
+
+        if not morceaux:
+            return Resultats(np.zeros((len(COLONNES), 0, self.meta["nb_annees"]), dtype=self.dtype), {})
+        return Resultats(
+            np.concatenate([morceau.donnees for morceau in morceaux], axis=1),
+            {nom: np.concatenate([morceau.scenarios[nom] for morceau in morceaux]) for nom in morceaux[0].scenarios},
+        )
+
+
+_ENTREPOTS = {}
+
+
+def _signature(chemin):
+    # Date et taille de meta.json et de l'index, réécrits à chaque ajout
+    signature = []
+    for nom in (META, INDEX):
+        try:
+            etat = os.stat(os.path.join(chemin, nom))
+        except FileNotFoundError:
+            signature.append(None)
+        else:
+            signature.append((etat.st_mtime_ns, etat.st_size))
+    return tuple(signature)
+
+
+def entrepot_partage(chemin):
+    """Entrepôt partagé par les sessions du processus, rouvert quand un ajout (la CLI par exemple) l'a modifié."""
+    signature = _signature(chemin)
+    ouvert = _ENTREPOTS.get(chemin)
+    if ouvert is None or ouvert[0] != signature:
+        ouvert = _ENTREPOTS[chemin] = (signature, Entrepot(chemin))
+    return ouvert[1]
+
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(description="Ajoute les scénarios d'un fichier de paramètres (CSV ou JSONL) à un entrepôt de résultats.")
+    parser.add_argument("entree", help="fichier CSV ou JSONL, une colonne par paramètre de input_simulateur")
+    parser.add_argument("entrepot", help="répertoire de l'entrepôt (créé s'il n'existe pas)")
+    parser.add_argument("--float32", action="store_true", help="séries en float32 (à la création de l'entrepôt)")
+    parser.add_argument("--taille-bloc", type=int, default=TAILLE_BLOC, help="scénarios par bloc (à la création de l'entrepôt)")
+    args = parser.parse_args(arguments)
+
+    from scpi.cli import lire_blocs
+    from scpi.validation import valider_lot
+
+    entrepot = Entrepot(args.entrepot, np.float32 if args.float32 else np.float64, args.taille_bloc)
+    rejetees = 0
+    for bloc in lire_blocs(args.entree, entrepot.meta["taille_bloc"]):
+        valides = valider_lot(bloc) == ""
+        rejetees += int((~valides).sum())
+        if valides.any():
+            entrepot.ajouter(bloc[valides].reset_index(drop=True))
+    print(f"{len(entrepot)} scénarios dans {args.entrepot} ({rejetees} lignes rejetées)", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""Exports des tableaux de simulation : CSV, Parquet et Arrow (IPC).
+
+Parquet et Arrow nécessitent ``pyarrow`` (dépendance optionnelle, importée à la
+demande). ``EcrivainResultats`` écrit plusieurs simulations dans un même fichier
+bloc par bloc, sans jamais concaténer les tableaux en mémoire.
+"""
+import importlib.util
+import io
+import os
+
+import numpy as np
+import pandas as pd
+
+FORMATS = {
+    "csv": ("text/csv", ".csv"),
+    "parquet": ("application/vnd.apache.parquet", ".parquet"),
+    "arrow": ("application/vnd.apache.arrow.file", ".arrow"),
+}
+COLONNES_CLES = ("scenario", "ligne", "Mois", "Année")
+
+
+def formats_disponibles():
+    return [format for format in FORMATS if format == "csv" or importlib.util.find_spec("pyarrow") is not None]
+
+
+def _typer(df):
+    # Clés entières, toutes les autres colonnes numériques en float64
+    types = {colonne: ("int64" if colonne in COLONNES_CLES else "float64")
+             for colonne in df.columns if pd.api.types.is_numeric_dtype(df[colonne]) and not pd.api.types.is_bool_dtype(df[colonne])}
+    return df.astype(types)
+
+
+def _table_arrow(df):
+    import pyarrow as pa
+
+    return pa.Table.from_pandas(_typer(df), preserve_index=False)
+
+
+def exporter(df, format="csv"):
+    """Sérialise ``df`` (clés en colonnes, pas en index) dans ``format`` et renvoie les octets."""
+    if format == "csv":
+        return df.to_csv(index=False).encode("utf-8")
+    sortie = io.BytesIO()
+    with EcrivainResultats(sortie, format) as ecrivain:
+        ecrivain.ecrire(df)
+    return sortie.getvalue()
+
+
+class EcrivainResultats:
+    """Écriture incrémentale de tableaux de même schéma dans un fichier CSV, Parquet ou Arrow.
+
+    ``destination`` est un chemin ou un flux binaire ; chaque appel à ``ecrire`` ajoute
+    un bloc (un groupe de lignes Parquet, un lot Arrow, des lignes CSV).
+    """
+
+    def __init__(self, destination, format="parquet", ajout=False):
+        if format not in FORMATS:
+            raise ValueError(f"Format inconnu : {format!r}, valeurs possibles : {sorted(FORMATS)}")
+        self.format = format
+        self.ajout = ajout
+        self.sortie = open(destination, "ab" if ajout else "wb") if isinstance(destination, (str, os.PathLike)) else destination
+        self._proprietaire = self.sortie is not destination
+        self._ecrivain = None
+        self.lignes = 0
+
+    def ecrire(self, df):
+        if self.format == "csv":
+            entete = self.lignes == 0 and not (self.ajout and self.sortie.tell() > 0)
+            self.sortie.write(df.to_csv(index=False, header=entete).encode("utf-8"))
+        else:
+            table = _table_arrow(df)
+            if self._ecrivain is None:
+                self._schema = table.schema
+                self._ecrivain = self._ouvrir(table.schema)
+            self._ecrivain.write_table(table.cast(self._schema))
+        self.lignes += len(df)
+
+    def _ouvrir(self, schema):
+        if self.format == "parquet":
+            import pyarrow.parquet as pq
+
+            return pq.ParquetWriter(self.sortie, schema)
+        import pyarrow as pa
+
+        return pa.ipc.new_file(self.sortie, schema)
+
+    def fermer(self):
+        if self._ecrivain is not None:
+            self._ecrivain.close()
+            self._ecrivain = None
+        if self._proprietaire:
+            self.sortie.close()
+        else:
+            self.sortie.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.fermer()
+
+
+def exporter_lot(destination, params, format="parquet", taille_bloc=1024):
+    """Projections sur 50 ans de N scénarios, écrites bloc par bloc au format long.
+
+    Une ligne par (scénario, année) avec les paramètres numériques du scénario ;
+    la mémoire utilisée dépend de ``taille_bloc``, pas de N.
+    """
+    from scpi.lot import COLONNES_NUMERIQUES, TYPES_DIFFERE, echeanciers_mutualises, extraire_lot, normaliser_lot, projections_lot, taille_lot
+
+    lot = normaliser_lot(params)
+    with EcrivainResultats(destination, format) as ecrivain:
+        for debut in range(0, taille_lot(lot), taille_bloc):
+            bloc = extraire_lot(lot, slice(debut, debut + taille_bloc))
+            projections = projections_lot(bloc, echeanciers_mutualises(bloc))
+            taille, nb_annees = projections["Loyer Brut"].shape
+
+            colonnes = {
+                "scenario": np.repeat(np.arange(debut, debut + taille), nb_annees),
+                "Année": np.tile(np.arange(1, nb_annees + 1), taille),
+                **{cle: np.repeat(bloc[cle], nb_annees) for cle in COLONNES_NUMERIQUES},
+                "type_differe": np.repeat(np.asarray(TYPES_DIFFERE)[bloc["code_differe"]], nb_annees),
+                "frais_inclus": np.repeat(bloc["frais_inclus"], nb_annees),
+                **{colonne: valeurs.ravel() for colonne, valeurs in projections.items()},
+            }
+            ecrivain.ecrire(pd.DataFrame(colonnes))
+        return ecrivain.lignes
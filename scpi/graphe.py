@@ -0,0 +1,133 @@
+"""Graphe de dépendances paramètres → étapes du calcul d'un scénario.
+
+Chaque étape déclare les paramètres qu'elle lit et les étapes dont elle dépend.
+Son résultat est mémoïsé dans le cache partagé sous une empreinte de ses seuls
+paramètres transitifs : un rerun où seul ``taux_imposition`` change ne recalcule
+que la fiscalité et l'assemblage du tableau d'investissement, l'échéancier du
+prêt et les loyers sont relus du cache.
+"""
+from functools import lru_cache
+
+from scpi.cache import cache_simulation
+from scpi.trace import etape
+
+PARAMS_PRET = (
+    "montant_investissement", "apport", "duree_pret", "taux_interet", "taux_assurance",
+    "type_differe", "duree_differe", "frais_courtage", "frais_inclus",
+)
+
+# Étape : (paramètres lus directement, étapes amont)
+ETAPES = {
+    "echeancier": (PARAMS_PRET, ()),
+    "tab_amortissement": (("duree_pret",), ("echeancier",)),
+    "annuites": ((), ("echeancier",)),
+    "loyers": (("montant_investissement", "rendement_souhaite", "taux_revalorisation", "delai_jouissance", "pourcentage_etranger"), ()),
+    "revente": (("montant_investissement", "frais_souscription", "taux_revalorisation"), ()),
+    "efforts": (("duree_pret", "frais_courtage", "frais_inclus", "pourcentage_etranger"), ("annuites", "loyers")),
+    "fiscalite": (("taux_imposition",), ("loyers", "efforts")),
+    "tab_investissement": ((), ("loyers", "efforts", "fiscalite", "revente")),
+}
+
+
+def _echeancier(lot):
+    from scpi.lot import echeanciers_lot
+
+    return echeanciers_lot(lot)
+
+
+def _tab_amortissement(lot, echeancier):
+    from scpi.moteur import tableaux_amortissement
+
+    return tableaux_amortissement(echeancier, int(lot["duree_pret"][0]))
+
+
+def _annuites(lot, echeancier):
+    from scpi.lot import annuites_lot
+
+    return annuites_lot(echeancier)
+
+
+def _loyers(lot):
+    from scpi.lot import loyers_lot
+
+    return loyers_lot(lot)
+
+
+def _revente(lot):
+    from scpi.lot import revente_lot
+
+    return revente_lot(lot)
+
+
+def _efforts(lot, annuites, loyers):
+    from scpi.lot import efforts_lot
+
+    return efforts_lot(lot, annuites, loyers)
+
+
+def _fiscalite(lot, loyers, efforts):
+    from scpi.lot import fiscalite_lot
+
+    return fiscalite_lot(lot, loyers, efforts)
+
+
+def _tab_investissement(lot, loyers, efforts, fiscalite, revente):
+    import numpy as np
+    import pandas as pd
+
+    from scpi.lot import assembler_projections
+
+    projections = assembler_projections(loyers, efforts, fiscalite, revente)
+    return pd.DataFrame({"Année": np.arange(1, revente.shape[1] + 1), **{colonne: valeurs[0] for colonne, valeurs in projections.items()}})
+
+
+CALCULS = {
+    "echeancier": _echeancier,
+    "tab_amortissement": _tab_amortissement,
+    "annuites": _annuites,
+    "loyers": _loyers,
+    "revente": _revente,
+    "efforts": _efforts,
+    "fiscalite": _fiscalite,
+    "tab_investissement": _tab_investissement,
+}
+
+
+@lru_cache(maxsize=None)
+def parametres_etape(nom):
+    """Paramètres dont dépend ``nom``, directement ou par ses étapes amont."""
+    params, amont = ETAPES[nom]
+    return frozenset(params).union(*(parametres_etape(etape_amont) for etape_amont in amont))
+
+
+def etapes_impactees(parametres):
+    """Étapes à recalculer quand ``parametres`` changent."""
+    return [nom for nom in ETAPES if parametres_etape(nom) & set(parametres)]
+
+
+def calculer(params, nom, cache=cache_simulation, _contexte=None):
+    """Résultat de l'étape ``nom`` pour un scénario, en ne recalculant que les étapes absentes du cache."""
+    from scpi.lot import normaliser_lot
+
+    # Partagé avec les étapes amont : lot du scénario (construit au premier calcul effectif) et résultats déjà obtenus
+    contexte = {"lot": {}, "resultats": {}} if _contexte is None else _contexte
+    if nom in contexte["resultats"]:
+        return contexte["resultats"][nom]
+    lot = contexte["lot"]
+
+    def calcul(_):
+        if not lot:
+            lot.update(normaliser_lot(params))
+        resultats_amont = [calculer(params, etape_amont, cache, contexte) for etape_amont in ETAPES[nom][1]]
+        return CALCULS[nom](lot, *resultats_amont)
+
+    with etape(nom):
+        resultat = cache.obtenir({cle: params[cle] for cle in parametres_etape(nom)}, calcul, espace=f"etape:{nom}")
+    contexte["resultats"][nom] = resultat
+    return resultat
+
+
+def calculer_etapes(params, noms, cache=cache_simulation):
+    """Résultats de plusieurs étapes d'un même scénario ; les étapes amont communes ne sont évaluées qu'une fois."""
+    contexte = {"lot": {}, "resultats": {}}
+    return [calculer(params, nom, cache, contexte) for nom in noms]
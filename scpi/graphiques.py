@@ -0,0 +1,294 @@
+"""Construction des figures Plotly du simulateur, sans dépendance à Streamlit.
+
+Les mises en page sont construites et validées une seule fois par processus, puis
+réutilisées à chaque rerun sans nouvelle validation. ``controler_taille`` mesure la taille JSON envoyée au
+navigateur pour tenir chaque graphique sous ``BUDGET_PAYLOAD``.
+"""
+import copy
+import functools
+import logging
+
+import numpy as np
+import plotly.graph_objects as go
+
+BUDGET_PAYLOAD = 30_000  # octets de JSON par graphique
+
+COULEUR_AXES = '#CBA325'
+COULEUR_FRANCAIS = '#16425B'
+COULEUR_FRANCAIS_AIRE = 'rgba(141, 179, 197, 0.3)'
+COULEUR_ETRANGER = '#CBA325'
+COULEUR_ETRANGER_AIRE = 'rgba(241, 216, 122, 0.5)'
+COULEUR_SOMME = '#ACADAF'
+COULEUR_SOMME_AIRE = 'rgba(208, 209, 211, 0.3)'
+COULEUR_CAPITAL_RESTANT = '#A33432'
+COULEUR_CAPITAL_RESTANT_AIRE = 'rgba(232, 176, 170, 0.3)'
+COULEUR_VALEUR_REVENTE = '#10505B'
+COULEUR_VALEUR_REVENTE_AIRE = 'rgba(16, 80, 91, 0.15)'
+COULEUR_EFFORT_ANNUEL = '#D56844'
+COULEUR_EFFORT_ANNUEL_AIRE = 'rgba(213, 104, 68, 0.15)'
+COULEUR_POINT_SORTIE = '#CBA325'
+# Scénarios comparés, dans l'ordre d'affichage
+COULEURS_COMPARAISON = ('#6C5B7B', '#2A9D8F', '#E76F51', '#8D99AE', '#B5838D')
+
+journal = logging.getLogger(__name__)
+
+
+def _axe(titre, showgrid=False, **options):
+    return dict(title=f"<b>{titre}</b>", showgrid=showgrid, zeroline=False, showline=True, linewidth=3, linecolor=COULEUR_AXES, **options)
+
+
+_MISES_EN_PAGE = {
+    "loyers": dict(
+        xaxis=_axe("Années", tickmode='linear', dtick=5, ticksuffix=" "),
+        yaxis=_axe("Montant des Loyers (€)", tickmode='linear', dtick=1000, ticksuffix=" €", tickformat=",",
+                   showgrid=True, gridwidth=1, gridcolor='rgba(200,200,200,0.2)'),
+        legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="center", x=0.5, font=dict(size=14)),
+        width=1200,
+    ),
+    "amortissement": dict(
+        xaxis=_axe("Années", tickmode='linear', dtick=5, ticksuffix=" "),
+        yaxis=_axe("Montant (€)", tickmode='linear', dtick=20000, ticksuffix=" €", tickformat=",",
+                   showgrid=True, gridwidth=1, gridcolor='rgba(200,200,200,0.2)'),
+        legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="center", x=0.5, bgcolor='rgba(0,0,0,0)',
+                    traceorder="normal", font=dict(size=14), itemsizing="constant", itemwidth=40),
+        width=1200,
+    ),
+    "monte_carlo": dict(
+        xaxis=_axe("Années", tickmode='linear', dtick=5),
+        yaxis=_axe("Montant (€)", ticksuffix=" €", tickformat=",", showgrid=True, gridwidth=1, gridcolor='rgba(200,200,200,0.2)'),
+        legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="center", x=0.5, font=dict(size=14)),
+    ),
+    "sensibilite": dict(
+        margin=dict(t=30, b=60, l=60, r=30),
+    ),
+}
+
+
+@functools.lru_cache(maxsize=None)
+def _mise_en_page(nom):
+    mise_en_page = dict(
+        title=dict(text=''),  # Titre affiché séparément par l'interface
+        hovermode="x unified",
+        font=dict(family="Inter", size=14),
+        height=600,
+        margin=dict(t=60, b=60, l=60, r=60),
+        paper_bgcolor='rgba(0,0,0,0)',
+        plot_bgcolor='rgba(0,0,0,0)',
+    )
+    mise_en_page.update(copy.deepcopy(_MISES_EN_PAGE[nom]))
+    # Validée et normalisée une seule fois par processus : les figures la reprennent sans la revalider
+    return go.Layout(mise_en_page).to_plotly_json()
+
+
+def nouvelle_figure(nom, traces=()):
+    """Figure portant la mise en page ``nom``, validée une seule fois par processus.
+
+    La figure est construite sans validation (``_validate=False``) : la mise en page l'a
+    déjà été et les traces le sont à leur création. Les modifications ultérieures de la
+    figure ne sont pas non plus validées.
+    """
+    return go.Figure(data=list(traces), layout=_mise_en_page(nom), _validate=False)
+
+
+def controler_taille(fig, nom):
+    """Taille en octets du JSON de la figure ; journalise un avertissement au-delà du budget."""
+    taille = len(fig.to_json().encode())
+    if taille > BUDGET_PAYLOAD:
+        journal.warning("Graphique %s : %d octets, au-delà du budget de %d octets", nom, taille, BUDGET_PAYLOAD)
+    return taille
+
+
+def traces_bicolores(x, y, signe, couleur_positive, couleur_negative, **options):
+    """Ligne dont chaque segment [i, i+1] prend la couleur du signe de ``signe[i]``.
+
+    Deux traces au plus quel que soit le nombre de points : les segments d'une même
+    couleur sont regroupés dans une série coupée par des NaN.
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    positif = np.asarray(signe)[:-1] >= 0
+    segments_x = np.column_stack([x[:-1], x[1:], np.full(len(x) - 1, np.nan)])
+    segments_y = np.column_stack([y[:-1], y[1:], np.full(len(y) - 1, np.nan)])
+
+    traces = []
+    for masque, couleur in ((positif, couleur_positive), (~positif, couleur_negative)):
+        if masque.any():
+            traces.append(go.Scatter(
+                x=segments_x[masque].ravel(),
+                y=segments_y[masque].ravel(),
+                mode='lines',
+                line=dict(color=couleur, width=2),
+                connectgaps=False,
+                **options
+            ))
+    return traces
+
+
+def figure_loyers(annees, loyer_net_francais, loyer_net_etranger):
+    difference = np.asarray(loyer_net_francais) - np.asarray(loyer_net_etranger)
+    revenus_totaux = np.asarray(loyer_net_francais) + np.asarray(loyer_net_etranger)
+
+    traces = [
+        go.Scatter(
+            x=annees,
+            y=revenus_totaux,
+            name='Revenus Totaux',
+            mode='lines',
+            line=dict(color=COULEUR_SOMME, width=2, dash='dash'),
+            fill='tozeroy',
+            fillcolor=COULEUR_SOMME_AIRE,
+            hovertemplate='<span style="color:' + COULEUR_SOMME + ';">●</span> Revenus Totaux <br>Montant: <b>%{y:.0f} €</b><extra></extra>'
+        ),
+        go.Scatter(
+            x=annees,
+            y=loyer_net_francais,
+            name='Loyer Français',
+            mode='lines',
+            line=dict(color=COULEUR_FRANCAIS, width=3),
+            fill='tozeroy',
+            fillcolor=COULEUR_FRANCAIS_AIRE,
+            hovertemplate='<span style="color:' + COULEUR_FRANCAIS + ';">●</span> Loyer Français <br>Montant: <b>%{y:.0f} €</b><extra></extra>'
+        ),
+        go.Scatter(
+            x=annees,
+            y=loyer_net_etranger,
+            name='Loyer Étranger',
+            mode='lines',
+            line=dict(color=COULEUR_ETRANGER, width=3),
+            fill='tozeroy',
+            fillcolor=COULEUR_ETRANGER_AIRE,
+            hovertemplate='<span style="color:' + COULEUR_ETRANGER + ';">●</span> Loyer Étranger <br>Montant: <b>%{y:.0f} €</b><extra></extra>'
+        ),
+        # Différence (ligne bicolore)
+        *traces_bicolores(annees, np.abs(difference), difference, COULEUR_FRANCAIS, COULEUR_ETRANGER,
+                          showlegend=False, hoverinfo='skip'),
+    ]
+    return nouvelle_figure("loyers", traces)
+
+
+def traces_comparaison(comparaisons):
+    """Courbes fines, sans marqueurs, de chaque scénario comparé ; une entrée de légende par scénario."""
+    traces = []
+    for (nom, synthese), couleur in zip(comparaisons.items(), COULEURS_COMPARAISON * len(comparaisons)):
+        for serie, cle, dash in (('Capital Restant', 'capital_restant', 'dot'), ('Valeur de Revente', 'valeur_revente', 'dash'), ('Effort Net Cumulé', 'effort_net_cumule', None)):
+            traces.append(go.Scatter(
+                x=np.arange(1, len(synthese[cle]) + 1),
+                y=synthese[cle],
+                mode='lines',
+                name=nom,
+                legendgroup=nom,
+                showlegend=cle == 'effort_net_cumule',
+                line=dict(color=couleur, width=1.5, dash=dash),
+                hovertemplate='<span style="color:' + couleur + ';">●</span> ' + nom + ' · ' + serie + ' <br>Montant: <b>%{y:.0f} €</b><extra></extra>',
+            ))
+    return traces
+
+
+def figure_amortissement(capital_restant, valeur_revente, effort_net_cumule, annee_sortie, hauteur_annotation, comparaisons=None):
+    """``comparaisons`` : synthèses (voir ``scpi.moteur.synthese``) des scénarios enregistrés, par nom, superposées."""
+    x_range = np.arange(1, len(capital_restant) + 1)
+    series = [
+        ('Capital Restant', capital_restant, COULEUR_CAPITAL_RESTANT, None),
+        ('Valeur de Revente', valeur_revente, COULEUR_VALEUR_REVENTE, 'dash'),
+        ('Effort Net Cumulé', effort_net_cumule, COULEUR_EFFORT_ANNUEL, None),
+    ]
+    traces = [
+        go.Scatter(
+            x=x_range,
+            y=valeurs,
+            mode='lines+markers',
+            name=nom,
+            line=dict(color=couleur, width=3, dash=dash),
+            marker=dict(size=6, color='white', line=dict(color=couleur, width=2)),
+            hovertemplate='<span style="color:' + couleur + ';">●</span> ' + nom + ' <br>Montant: <b>%{y:.0f} €</b><extra></extra>',
+            **(dict(fill='tozeroy', fillcolor=COULEUR_CAPITAL_RESTANT_AIRE) if nom == 'Capital Restant' else {})
+        )
+        for nom, valeurs, couleur, dash in series
+    ]
+    fig = nouvelle_figure("amortissement", traces + traces_comparaison(comparaisons or {}))
+
+    # Ajouter la ligne et le point de sortie s'il y a un point de sortie
+    if annee_sortie:
+        fig.add_shape(
+            type="line",
+            x0=annee_sortie,
+            x1=annee_sortie,
+            y0=0,
+            y1=1,
+            xref='x',
+            yref='paper',
+            line=dict(color=COULEUR_POINT_SORTIE, width=2, dash="dash")
+        )
+        fig.add_annotation(
+            x=annee_sortie,
+            y=hauteur_annotation,
+            text="Sortie Neutre",
+            showarrow=False,
+            font=dict(size=12, color=COULEUR_POINT_SORTIE),
+            bgcolor="rgba(251, 251, 251, 0.8)",
+            bordercolor=COULEUR_POINT_SORTIE,
+            borderwidth=1,
+            borderpad=4
+        )
+    return fig
+
+
+def figure_monte_carlo(bandes):
+    traces = []
+    # Bande P5-P95 puis médiane pour chaque série
+    for serie, couleur, couleur_aire, dash in [
+        ('Valeur de Revente', COULEUR_VALEUR_REVENTE, COULEUR_VALEUR_REVENTE_AIRE, 'dash'),
+        ('Effort Net Cumulé', COULEUR_EFFORT_ANNUEL, COULEUR_EFFORT_ANNUEL_AIRE, None),
+    ]:
+        df_bande = bandes[serie]
+        traces += [
+            go.Scatter(
+                x=df_bande.index, y=df_bande['P95'], mode='lines', line=dict(width=0),
+                showlegend=False, hoverinfo='skip'
+            ),
+            go.Scatter(
+                x=df_bande.index, y=df_bande['P5'], mode='lines', line=dict(width=0),
+                fill='tonexty', fillcolor=couleur_aire, name=f'{serie} (P5-P95)', hoverinfo='skip'
+            ),
+            go.Scatter(
+                x=df_bande.index, y=df_bande['P50'], mode='lines', name=f'{serie} (médiane)',
+                line=dict(color=couleur, width=3, dash=dash),
+                customdata=df_bande[['P5', 'P95']],
+                hovertemplate='<span style="color:' + couleur + ';">●</span> ' + serie + ' <br>Médiane: <b>%{y:.0f} €</b> (%{customdata[0]:.0f} € - %{customdata[1]:.0f} €)<extra></extra>'
+            ),
+        ]
+    fig = nouvelle_figure("monte_carlo", traces)
+
+    annee_sortie = bandes['Année Sortie Neutre']
+    if not np.isnan(annee_sortie['P50']):
+        fig.add_vline(x=annee_sortie['P50'], line=dict(color=COULEUR_POINT_SORTIE, width=2, dash="dash"))
+        fig.add_annotation(
+            x=annee_sortie['P50'],
+            y=1,
+            yref='paper',
+            text=f"Sortie Neutre médiane (P5 : {annee_sortie['P5']:.0f}, P95 : {annee_sortie['P95']:.0f})",
+            showarrow=False,
+            font=dict(size=12, color=COULEUR_POINT_SORTIE),
+            bgcolor="rgba(251, 251, 251, 0.8)",
+            bordercolor=COULEUR_POINT_SORTIE,
+            borderwidth=1,
+            borderpad=4
+        )
+    return fig
+
+
+def figure_sensibilite(x, y, z, libelle_x, libelle_y, libelle_indicateur):
+    fig = nouvelle_figure("sensibilite", [go.Heatmap(
+        x=x,
+        y=y,
+        z=z,
+        colorscale=[[0, '#A33432'], [0.5, '#F1D87A'], [1, '#16425B']],
+        colorbar=dict(title=dict(text=libelle_indicateur, side='right')),
+        hovertemplate=libelle_x + ' : %{x:.2f}<br>' + libelle_y + ' : %{y:.2f}<br>' + libelle_indicateur + ' : <b>%{z:.2f}</b><extra></extra>',
+    )])
+    fig.update_layout(
+        hovermode="closest",
+        xaxis=dict(title=f"<b>{libelle_x}</b>", showgrid=False, zeroline=False),
+        yaxis=dict(title=f"<b>{libelle_y}</b>", showgrid=False, zeroline=False),
+    )
+    return fig
@@ -0,0 +1,368 @@
+"""Moteur par lot : N jeux de paramètres évalués en une seule passe matricielle.
+
+Les paramètres sont fournis en colonnes (un tableau par clé de ``input_simulateur``,
+ou un scalaire commun à tous les scénarios). Les échéanciers sont des matrices
+(N × mois), les projections des matrices (N × 50 années).
+"""
+import numpy as np
+
+TYPES_DIFFERE = ('Sans différé', 'Différé partiel', 'Différé total')
+NB_ANNEES = 50
+PRELEVEMENTS_SOCIAUX = 0.172
+TAUX_IMPOSITION_EUROPE = 0.20
+TAILLE_BLOC = 2048
+
+COLONNES_NUMERIQUES = (
+    "montant_investissement", "apport", "duree_pret", "taux_interet", "taux_assurance",
+    "duree_differe", "frais_courtage", "rendement_souhaite", "delai_jouissance",
+    "taux_revalorisation", "frais_souscription", "taux_imposition", "pourcentage_etranger",
+)
+# Paramètres dont dépend l'échéancier du prêt
+COLONNES_PRET = (
+    "montant_investissement", "apport", "duree_pret", "taux_interet", "taux_assurance",
+    "duree_differe", "frais_courtage", "code_differe", "frais_inclus",
+)
+# Colonnes de ``indicateurs_lot`` et de ``resume_lot``, dans l'ordre
+INDICATEURS = (
+    "Revenu Mensuel", "Effort Mensuel Moyen", "Effort Net Total", "Rentabilité Brut",
+    "Rentabilité Nette", "Année Sortie Neutre", "TRI",
+)
+
+
+def _codes_differe(valeurs):
+    valeurs = np.asarray(valeurs)
+    if valeurs.dtype.kind in "iu":
+        codes = valeurs.astype(np.int8)
+    else:
+        codes = np.full(valeurs.shape, -1, dtype=np.int8)
+        for code, libelle in enumerate(TYPES_DIFFERE):
+            codes[valeurs == libelle] = code
+    if ((codes < 0) | (codes >= len(TYPES_DIFFERE))).any():
+        raise ValueError(f"type_differe inconnu, valeurs possibles : {TYPES_DIFFERE}")
+    return codes
+
+
+def normaliser_lot(params):
+    """Convertit un mapping colonne -> valeurs (ou un DataFrame) en tableaux de même longueur N."""
+    tailles = {np.size(params[cle]) for cle in (*COLONNES_NUMERIQUES, "type_differe", "frais_inclus")}
+    tailles.discard(1)
+    if len(tailles) > 1:
+        raise ValueError(f"Colonnes de longueurs incompatibles : {sorted(tailles)}")
+    n = tailles.pop() if tailles else 1
+
+    def diffuser(valeurs):
+        valeurs = valeurs.ravel()
+        return valeurs if len(valeurs) == n else np.broadcast_to(valeurs, (n,))
+
+    lot = {cle: diffuser(np.asarray(params[cle], dtype=float)) for cle in COLONNES_NUMERIQUES}
+    lot["code_differe"] = diffuser(_codes_differe(params["type_differe"]))
+    lot["frais_inclus"] = diffuser(np.asarray(params["frais_inclus"], dtype=bool))
+    return lot
+
+
+def extraire_lot(lot, indices):
+    return {cle: valeurs[indices] for cle, valeurs in lot.items()}
+
+
+def taille_lot(lot):
+    return len(lot["code_differe"])
+
+
+def echeanciers_lot(lot):
+    """Tableaux d'amortissement (N × mois), mêmes colonnes que ``tab_amortissement``."""
+    duree_pret = lot["duree_pret"].astype(np.int64)
+    nb_mois = int(duree_pret.max()) if len(duree_pret) else 0
+
+    montant_pret = lot["montant_investissement"] - lot["apport"] + np.where(lot["frais_inclus"], lot["frais_courtage"], 0)
+    montant_pret = montant_pret[:, None]
+    taux_mensuel = (lot["taux_interet"] / 12)[:, None]
+    n = duree_pret[:, None]
+    # Sans différé, la durée de différé n'a aucun effet sur l'échéancier
+    d = np.where(lot["code_differe"] == 0, 0, np.minimum(lot["duree_differe"].astype(np.int64), duree_pret))[:, None]
+    differe_total = (lot["code_differe"] == 2)[:, None]
+
+    mois = np.arange(1, nb_mois + 1)
+    actif = mois <= n
+    en_differe = mois <= d
+
+    croissance_mois = (1 + taux_mensuel) ** mois
+    croissance_differe = (1 + taux_mensuel) ** d
+    capital_post_differe = np.where(differe_total, montant_pret * croissance_differe, montant_pret)
+
+    # Annuité constante sur la durée restante après différé
+    duree_amortissement = n - d
+    taux_sur = np.where(taux_mensuel == 0, 1, taux_mensuel)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mensualite = np.where(
+            duree_amortissement == 0, 0,
+            np.where(taux_mensuel == 0,
+                     capital_post_differe / np.maximum(duree_amortissement, 1),
+                     capital_post_differe * taux_mensuel / (1 - (1 + taux_mensuel) ** -duree_amortissement)),
+        )
+
+    # Solde après j échéances : forme fermée de l'annuité
+    rang = mois - d
+    croissance_rang = croissance_mois / croissance_differe
+    solde_apres = np.where(
+        taux_mensuel == 0,
+        capital_post_differe - mensualite * rang,
+        capital_post_differe * croissance_rang - mensualite * (croissance_rang - 1) / taux_sur,
+    )
+    solde_avant = np.where(
+        taux_mensuel == 0,
+        solde_apres + mensualite,
+        (solde_apres + mensualite) / (1 + taux_mensuel),
+    )
+
+    # Phase de différé : intérêts capitalisés (total) ou payés seuls (partiel)
+    capital_avant_differe = np.where(differe_total, montant_pret * croissance_mois / (1 + taux_mensuel), montant_pret)
+    interets = np.where(en_differe, capital_avant_differe, solde_avant) * taux_mensuel
+    capital_restant = np.where(en_differe, np.where(differe_total, capital_avant_differe * (1 + taux_mensuel), montant_pret), solde_apres)
+    mensualite_hors_assurance = np.where(en_differe, np.where(differe_total, 0, interets), mensualite)
+    remboursement_capital = np.where(en_differe, 0, mensualite - interets)
+    assurance = np.broadcast_to(montant_pret * (lot["taux_assurance"] / 12)[:, None], actif.shape)
+
+    return {
+        "Mensualité sans assurance": mensualite_hors_assurance * actif,
+        "Mensualité avec assurance": (mensualite_hors_assurance + assurance) * actif,
+        "Intérêts": interets * actif,
+        "Assurance": assurance * actif,
+        "Remboursement Capital": remboursement_capital * actif,
+        "Capital Restant": capital_restant * actif,
+        # Intérêts capitalisés pendant un différé total : non déductibles
+        "Intérêts Déductibles": interets * (actif & ~(en_differe & differe_total)),
+    }
+
+
+def echeanciers_mutualises(lot):
+    """Comme ``echeanciers_lot``, mais un seul échéancier (1 × mois) si le prêt est commun à tout le lot."""
+    if taille_lot(lot) > 1 and all((lot[cle] == lot[cle][0]).all() for cle in COLONNES_PRET):
+        return echeanciers_lot(extraire_lot(lot, slice(0, 1)))
+    return echeanciers_lot(lot)
+
+
+def _sommes_annuelles(mensuel, nb_annees=NB_ANNEES):
+    n, nb_mois = mensuel.shape
+    nb_annees_pret = -(-nb_mois // 12)
+    complete = np.zeros((n, nb_annees_pret * 12))
+    complete[:, :nb_mois] = mensuel
+    annuel = np.zeros((n, nb_annees))
+    annuel[:, :min(nb_annees_pret, nb_annees)] = complete.reshape(n, nb_annees_pret, 12).sum(axis=2)[:, :nb_annees]
+    return annuel
+
+
+def capital_fin_annee(capital_restant, duree_pret, nb_annees=NB_ANNEES):
+    n, nb_mois = capital_restant.shape
+    annees = np.arange(1, nb_annees + 1)
+    if nb_mois == 0:
+        return np.zeros((n, nb_annees))
+    fin_annee = np.minimum(12 * annees, duree_pret[:, None].astype(np.int64)) - 1
+    valeurs = np.take_along_axis(capital_restant, np.clip(fin_annee, 0, nb_mois - 1), axis=1)
+    return np.where(12 * (annees - 1) < duree_pret[:, None], valeurs, 0)
+
+
+def report_deductible(imposable_francais, taux):
+    """Report du déficit foncier d'une année sur l'autre.
+
+    Renvoie le report cumulé et l'impôt français année par année, sur le dernier axe.
+    """
+    report = np.empty_like(imposable_francais)
+    impot = np.empty_like(imposable_francais)
+    if imposable_francais.size == imposable_francais.shape[-1]:
+        # Un seul scénario : boucle sur des flottants Python, sans surcoût d'opérations numpy
+        cumul = 0.0
+        for annee, imposable in enumerate(imposable_francais.ravel().tolist()):
+            impot.flat[annee] = max(imposable - cumul, 0.0)
+            cumul = max(cumul - imposable, 0.0)
+            report.flat[annee] = cumul
+        return report, impot * np.asarray(taux)[..., None]
+    cumul = np.zeros(imposable_francais.shape[:-1])
+    for annee in range(imposable_francais.shape[-1]):
+        imposable = imposable_francais[..., annee]
+        impot[..., annee] = np.maximum(imposable - cumul, 0)
+        cumul = np.maximum(cumul - imposable, 0)
+        report[..., annee] = cumul
+    return report, impot * np.asarray(taux)[..., None]
+
+
+def _indices_prix(lot, nb_annees, trajectoires):
+    # Rendement, indice des loyers (début d'année) et indice de revente (fin d'année)
+    annees = np.arange(1, nb_annees + 1)
+    if trajectoires is None:
+        revalorisation = (1 + lot["taux_revalorisation"][:, None]) ** (annees - 1)
+        return lot["rendement_souhaite"][:, None], revalorisation, revalorisation * (1 + lot["taux_revalorisation"][:, None])
+    indice_revente = np.cumprod(1 + trajectoires["revalorisation"], axis=1)
+    return trajectoires["rendement"], indice_revente / (1 + trajectoires["revalorisation"]), indice_revente
+
+
+def loyers_lot(lot, nb_annees=NB_ANNEES, trajectoires=None):
+    """Loyers bruts (N × années) et leur partage entre SCPI françaises et étrangères."""
+    rendement, revalorisation, _ = _indices_prix(lot, nb_annees, trajectoires)
+    loyer_annuel = lot["montant_investissement"][:, None] * rendement
+
+    loyer_brut = loyer_annuel * revalorisation
+    loyer_brut[:, 0] = loyer_annuel[:, 0] * (12 - lot["delai_jouissance"]) / 12
+    if trajectoires is not None and "vacance" in trajectoires:
+        loyer_brut *= 1 - trajectoires["vacance"]
+    part_etranger = (lot["pourcentage_etranger"] / 100)[:, None]
+    return {
+        "Loyer Brut": loyer_brut,
+        "Loyer Français": loyer_brut * (1 - part_etranger),
+        "Loyer Étranger": loyer_brut * part_etranger,
+    }
+
+
+def revente_lot(lot, nb_annees=NB_ANNEES, trajectoires=None):
+    """Valeur de revente en fin d'année (N × années), frais de souscription déduits."""
+    _, _, indice_revente = _indices_prix(lot, nb_annees, trajectoires)
+    return (lot["montant_investissement"] * (1 - lot["frais_souscription"]))[:, None] * indice_revente
+
+
+def annuites_lot(echeanciers, nb_annees=NB_ANNEES):
+    """Sommes annuelles des échéances et des charges déductibles du prêt (N × années)."""
+    return {
+        "Mensualités": _sommes_annuelles(echeanciers["Mensualité avec assurance"], nb_annees),
+        "Charges Déductibles": _sommes_annuelles(echeanciers["Intérêts Déductibles"], nb_annees) + _sommes_annuelles(echeanciers["Assurance"], nb_annees),
+    }
+
+
+def efforts_lot(lot, annuites, loyers):
+    """Effort d'épargne avant impôt et revenu imposable français (N × années)."""
+    nb_annees = loyers["Loyer Brut"].shape[1]
+    en_pret = np.arange(1, nb_annees + 1) <= (lot["duree_pret"] // 12)[:, None]
+    frais_courtage = lot["frais_courtage"]
+    effort_annuel = np.where(en_pret, annuites["Mensualités"] - loyers["Loyer Brut"], -loyers["Loyer Brut"])
+    effort_annuel[:, 0] += np.where(en_pret[:, 0] & ~lot["frais_inclus"], frais_courtage, 0)
+    montant_deductible = np.where(en_pret, annuites["Charges Déductibles"], 0)
+    montant_deductible[:, 0] += np.where(en_pret[:, 0], frais_courtage, 0)
+
+    part_etranger = (lot["pourcentage_etranger"] / 100)[:, None]
+    return {
+        "Effort Annuel": effort_annuel,
+        "Montant Déductible": montant_deductible,
+        "Imposable Français": loyers["Loyer Français"] - montant_deductible * (1 - part_etranger),
+    }
+
+
+def fiscalite_lot(lot, loyers, efforts, impot_etranger=None):
+    """Impôts français (avec report du déficit) et étrangers (N × années).
+
+    ``impot_etranger`` remplace l'impôt étranger calculé au taux européen unique (portefeuilles multi-SCPI).
+    """
+    report, impot_francais = report_deductible(efforts["Imposable Français"], lot["taux_imposition"] + PRELEVEMENTS_SOCIAUX)
+    if impot_etranger is None:
+        impot_etranger = loyers["Loyer Étranger"] * np.maximum(lot["taux_imposition"], TAUX_IMPOSITION_EUROPE)[:, None]
+    return {
+        "Impôt Français": impot_francais,
+        "Impôt Étranger": impot_etranger,
+        "Impôt Total": impot_francais + impot_etranger,
+        "Report Déductible": report,
+    }
+
+
+def assembler_projections(loyers, efforts, fiscalite, valeur_revente):
+    """Colonnes de ``tab_investissement``, dans leur ordre, à partir des résultats de chaque étape."""
+    effort_net = efforts["Effort Annuel"] + fiscalite["Impôt Total"]
+    return {
+        "Loyer Brut": loyers["Loyer Brut"],
+        "Loyer Français": loyers["Loyer Français"],
+        "Loyer Étranger": loyers["Loyer Étranger"],
+        "Effort Annuel": efforts["Effort Annuel"],
+        "Montant Déductible": efforts["Montant Déductible"],
+        "Imposable Français": efforts["Imposable Français"],
+        "Imposable Étranger": loyers["Loyer Étranger"],
+        "Impôt Français": fiscalite["Impôt Français"],
+        "Impôt Étranger": fiscalite["Impôt Étranger"],
+        "Impôt Total": fiscalite["Impôt Total"],
+        "Report Déductible": fiscalite["Report Déductible"],
+        "Effort Annuel Net": effort_net,
+        "Effort Mensuel Net": effort_net / 12,
+        "Valeur de Revente": valeur_revente,
+        "Loyer Net Français": loyers["Loyer Français"] - fiscalite["Impôt Français"],
+        "Loyer Net Étranger": loyers["Loyer Étranger"] - fiscalite["Impôt Étranger"],
+    }
+
+
+def projections_lot(lot, echeanciers, nb_annees=NB_ANNEES, trajectoires=None):
+    """Projections sur 50 ans (N × années), mêmes colonnes que ``tab_investissement``.
+
+    ``trajectoires`` remplace optionnellement les taux constants par des matrices
+    annuelles (K × années) : "rendement", "revalorisation" et "vacance" (part de loyer perdue).
+    """
+    loyers = loyers_lot(lot, nb_annees, trajectoires)
+    efforts = efforts_lot(lot, annuites_lot(echeanciers, nb_annees), loyers)
+    return assembler_projections(loyers, efforts, fiscalite_lot(lot, loyers, efforts), revente_lot(lot, nb_annees, trajectoires))
+
+
+def annee_sortie_neutre(apport, effort_annuel_net, capital_fin, valeur_revente):
+    """Première année (N,) où la revente couvre effort cumulé, capital restant et apport (NaN sinon)."""
+    cout_total = effort_annuel_net.cumsum(axis=1) + capital_fin
+    cout_total[:, 0] += apport
+    sortie = valeur_revente - cout_total >= 0
+    return np.where(sortie.any(axis=1), sortie.argmax(axis=1) + 1, np.nan)
+
+
+def sortie_neutre_lot(lot, echeanciers, projections):
+    """Année de sortie neutre de chaque scénario du lot (NaN si aucune)."""
+    effort_annuel_net = projections["Effort Annuel Net"]
+    capital_fin = capital_fin_annee(echeanciers["Capital Restant"], lot["duree_pret"], effort_annuel_net.shape[1])
+    return annee_sortie_neutre(lot["apport"], effort_annuel_net, capital_fin, projections["Valeur de Revente"])
+
+
+def indicateurs_lot(lot, echeanciers, projections):
+    """Indicateurs par scénario (N,) : ceux de la vue d'ensemble, l'année de sortie neutre et le TRI (%)."""
+    annees_pret = lot["duree_pret"] // 12
+    en_pret = np.arange(1, projections["Effort Annuel Net"].shape[1] + 1) <= annees_pret[:, None]
+
+    effort_net_total = (projections["Effort Annuel Net"] * en_pret).sum(axis=1) + lot["apport"]
+    loyer_apres_pret = lot["montant_investissement"] * lot["rendement_souhaite"] * (1 + lot["taux_revalorisation"]) ** annees_pret
+    loyer_net_apres_pret = loyer_apres_pret - loyer_apres_pret * (lot["taux_imposition"] + PRELEVEMENTS_SOCIAUX)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return {
+            "Revenu Mensuel": loyer_apres_pret / 12,
+            "Effort Mensuel Moyen": (projections["Effort Mensuel Net"] * en_pret).sum(axis=1) / annees_pret,
+            "Effort Net Total": effort_net_total,
+            "Rentabilité Brut": loyer_apres_pret / effort_net_total * 100,
+            "Rentabilité Nette": loyer_net_apres_pret / effort_net_total * 100,
+            "Année Sortie Neutre": sortie_neutre_lot(lot, echeanciers, projections),
+            "TRI": tri_lot_projections(lot, echeanciers, projections) * 100,
+        }
+
+
+def tri_lot_projections(lot, echeanciers, projections):
+    """TRI (N,) en fraction, revente à la fin du prêt (au moins un an)."""
+    from scpi.rentabilite import flux_tresorerie, tri_lot
+
+    effort_annuel_net = projections["Effort Annuel Net"]
+    horizon = np.clip(lot["duree_pret"] // 12, 1, effort_annuel_net.shape[1]).astype(np.int64)
+    capital_fin = capital_fin_annee(echeanciers["Capital Restant"], lot["duree_pret"], effort_annuel_net.shape[1])
+    return tri_lot(flux_tresorerie(lot["apport"], effort_annuel_net, capital_fin, projections["Valeur de Revente"], horizon))
+
+
+def simuler_lot(params):
+    """Échéanciers, projections et indicateurs complets pour N scénarios."""
+    lot = normaliser_lot(params)
+    echeanciers = echeanciers_lot(lot)
+    projections = projections_lot(lot, echeanciers)
+    return {
+        "echeanciers": echeanciers,
+        "projections": projections,
+        "indicateurs": indicateurs_lot(lot, echeanciers, projections),
+    }
+
+
+def resume_lot(params, taille_bloc=TAILLE_BLOC):
+    """Indicateurs par scénario sous forme de DataFrame (une ligne par scénario).
+
+    Les scénarios sont traités par blocs pour borner la mémoire des matrices mensuelles.
+    """
+    import pandas as pd
+
+    lot = normaliser_lot(params)
+    blocs = []
+    for debut in range(0, taille_lot(lot), taille_bloc):
+        bloc = extraire_lot(lot, slice(debut, debut + taille_bloc))
+        echeanciers = echeanciers_mutualises(bloc)
+        blocs.append(indicateurs_lot(bloc, echeanciers, projections_lot(bloc, echeanciers)))
+    return pd.DataFrame({cle: np.concatenate([bloc[cle] for bloc in blocs]) if blocs else np.empty(0) for cle in INDICATEURS})
@@ -0,0 +1,106 @@
+"""Mode stochastique : trajectoires aléatoires de rendement, de revalorisation et de vacance.
+
+L'échéancier du prêt ne dépend d'aucun paramètre aléatoire : il est calculé une seule
+fois puis diffusé sur toutes les trajectoires. Les trajectoires sont traitées par blocs
+et seuls des histogrammes annuels sont conservés, la mémoire ne dépend donc pas du
+nombre de trajectoires.
+"""
+import numpy as np
+import pandas as pd
+
+from scpi.lot import NB_ANNEES, echeanciers_lot, normaliser_lot, projections_lot, sortie_neutre_lot
+
+PERCENTILES = (5, 50, 95)
+NB_CLASSES = 4096
+TAILLE_BLOC = 5000
+
+
+class HistogrammeAnnuel:
+    """Histogramme à classes fixes par année, alimenté bloc par bloc.
+
+    Les bornes sont fixées au premier bloc puis élargies d'une marge ; les valeurs
+    ultérieures hors bornes sont rangées dans les classes extrêmes.
+    """
+
+    def __init__(self, nb_classes=NB_CLASSES, marge=0.5):
+        self.nb_classes = nb_classes
+        self.marge = marge
+        self.comptes = None
+
+    def ajouter(self, valeurs):
+        if self.comptes is None:
+            bas, haut = valeurs.min(axis=0), valeurs.max(axis=0)
+            etendue = np.maximum(haut - bas, 1e-9 * np.maximum(np.abs(haut), 1))
+            self.bas = bas - self.marge * etendue
+            self.largeur = (1 + 2 * self.marge) * etendue / self.nb_classes
+            self.comptes = np.zeros((valeurs.shape[1], self.nb_classes), dtype=np.int64)
+
+        classes = np.clip(((valeurs - self.bas) / self.largeur).astype(np.int64), 0, self.nb_classes - 1)
+        decalage = np.arange(valeurs.shape[1]) * self.nb_classes
+        self.comptes += np.bincount((classes + decalage).ravel(), minlength=self.comptes.size).reshape(self.comptes.shape)
+
+    def percentiles(self, percentiles=PERCENTILES):
+        cumul = self.comptes.cumsum(axis=1)
+        resultat = np.empty((len(percentiles), self.comptes.shape[0]))
+        for i, p in enumerate(percentiles):
+            rang = p / 100 * cumul[:, -1]
+            classe = np.minimum((cumul < rang[:, None]).sum(axis=1), self.nb_classes - 1)
+            # Interpolation linéaire dans la classe atteinte
+            avant = np.where(classe > 0, np.take_along_axis(cumul, np.maximum(classe - 1, 0)[:, None], axis=1)[:, 0], 0)
+            effectif = np.maximum(np.take_along_axis(self.comptes, classe[:, None], axis=1)[:, 0], 1)
+            resultat[i] = self.bas + self.largeur * (classe + np.clip((rang - avant) / effectif, 0, 1))
+        return resultat
+
+
+def generer_trajectoires(params, nb_trajectoires, generateurs, volatilite_rendement, volatilite_revalorisation,
+                         probabilite_vacance, perte_vacance, nb_annees=NB_ANNEES):
+    forme = (nb_trajectoires, nb_annees)
+    alea_rendement, alea_revalorisation, alea_vacance = generateurs
+    trajectoires = {
+        "rendement": np.maximum(params["rendement_souhaite"] + volatilite_rendement * alea_rendement.standard_normal(forme), 0),
+        "revalorisation": np.maximum(params["taux_revalorisation"] + volatilite_revalorisation * alea_revalorisation.standard_normal(forme), -0.99),
+    }
+    if probabilite_vacance > 0:
+        trajectoires["vacance"] = (alea_vacance.random(forme) < probabilite_vacance) * perte_vacance
+    return trajectoires
+
+
+def monte_carlo(params, nb_trajectoires=10_000, graine=0, volatilite_rendement=0.005, volatilite_revalorisation=0.01,
+                probabilite_vacance=0.0, perte_vacance=0.25, percentiles=PERCENTILES, taille_bloc=TAILLE_BLOC):
+    """Bandes de percentiles de l'effort net cumulé, de la valeur de revente et de l'année de sortie neutre.
+
+    Le rendement et la revalorisation sont tirés chaque année selon une loi normale centrée
+    sur les valeurs de ``params`` ; une vacance fait perdre ``perte_vacance`` du loyer de l'année.
+    """
+    lot = normaliser_lot(params)
+    echeancier = echeanciers_lot(lot)
+    generateurs = [np.random.default_rng(graine_fille) for graine_fille in np.random.SeedSequence(graine).spawn(3)]
+
+    effort_cumule = HistogrammeAnnuel()
+    valeur_revente = HistogrammeAnnuel()
+    # Années de sortie 1..50, la classe 0 regroupe les trajectoires sans sortie neutre
+    comptes_sortie = np.zeros(NB_ANNEES + 1, dtype=np.int64)
+
+    for debut in range(0, nb_trajectoires, taille_bloc):
+        taille = min(taille_bloc, nb_trajectoires - debut)
+        trajectoires = generer_trajectoires(params, taille, generateurs, volatilite_rendement, volatilite_revalorisation,
+                                            probabilite_vacance, perte_vacance)
+        projections = projections_lot(lot, echeancier, trajectoires=trajectoires)
+        effort_cumule.ajouter(projections["Effort Annuel Net"].cumsum(axis=1))
+        valeur_revente.ajouter(projections["Valeur de Revente"])
+        annees_sortie = sortie_neutre_lot(lot, echeancier, projections)
+        comptes_sortie += np.bincount(np.nan_to_num(annees_sortie, nan=0).astype(np.int64), minlength=NB_ANNEES + 1)
+
+    colonnes = [f"P{p}" for p in percentiles]
+    annees = pd.Index(np.arange(1, NB_ANNEES + 1), name="Année")
+
+    # Les trajectoires sans sortie sont placées au-delà de l'horizon (NaN si le percentile y tombe)
+    cumul_sortie = np.concatenate([comptes_sortie[1:], comptes_sortie[:1]]).cumsum()
+    rangs_sortie = np.searchsorted(cumul_sortie, [p / 100 * nb_trajectoires for p in percentiles]) + 1
+
+    return {
+        "Effort Net Cumulé": pd.DataFrame(effort_cumule.percentiles(percentiles).T, index=annees, columns=colonnes),
+        "Valeur de Revente": pd.DataFrame(valeur_revente.percentiles(percentiles).T, index=annees, columns=colonnes),
+        "Année Sortie Neutre": pd.Series(np.where(rangs_sortie <= NB_ANNEES, rangs_sortie, np.nan), index=colonnes),
+        "Probabilité Sortie Neutre": 1 - comptes_sortie[0] / nb_trajectoires,
+    }
@@ -0,0 +1,202 @@
+"""Cœur financier du simulateur : échéancier, projection sur 50 ans et indicateurs.
+
+Aucun import lourd au chargement du module (ni Streamlit, ni Plotly, ni même numpy) :
+les dépendances de calcul sont importées au premier appel, ce qui garde le démarrage
+des workers et des traitements par lot quasi instantané.
+"""
+
+# Scénario type des tests et des bancs de performance
+PARAMS_REFERENCE = {
+    "montant_investissement": 100000,
+    "apport": 10000,
+    "duree_pret": 300,
+    "taux_interet": 0.0496,
+    "taux_assurance": 0.001,
+    "type_differe": "Sans différé",
+    "duree_differe": 0,
+    "frais_courtage": 2500,
+    "frais_inclus": False,
+    "rendement_souhaite": 0.05,
+    "delai_jouissance": 6,
+    "taux_revalorisation": 0.01,
+    "frais_souscription": 0.12,
+    "taux_imposition": 0.30,
+    "investissement_etranger": False,
+    "pourcentage_etranger": 0,
+}
+COLONNES_AMORTISSEMENT = ("Mensualité sans assurance", "Mensualité avec assurance", "Intérêts", "Assurance", "Remboursement Capital", "Capital Restant")
+
+
+def tab_amortissement(params):
+    from scpi.lot import echeanciers_lot, normaliser_lot
+
+    # Même noyau que le moteur par lot, pour un lot d'un seul scénario
+    return tableaux_amortissement(echeanciers_lot(normaliser_lot(params)), int(params["duree_pret"]))
+
+
+def tableaux_amortissement(echeancier, duree_pret):
+    """Échéancier mensuel et capital restant annuel du premier scénario d'un échéancier ``echeanciers_lot``."""
+    import numpy as np
+    import pandas as pd
+
+    df_amortissement = pd.DataFrame({"Mois": np.arange(1, duree_pret + 1), **{colonne: echeancier[colonne][0] for colonne in COLONNES_AMORTISSEMENT}})
+
+    # Dernier capital restant de chaque année (y compris une année incomplète)
+    fins_annee = np.append(np.arange(11, duree_pret, 12), duree_pret - 1) if duree_pret % 12 else np.arange(11, duree_pret, 12)
+    capital_restant_annuel = pd.Series(df_amortissement["Capital Restant"].to_numpy()[fins_annee], name="Capital Restant")
+
+    return df_amortissement, capital_restant_annuel
+
+
+def tab_amortissement_annuel(df_amortissement):
+    """Agrégat annuel de l'échéancier : sommes des flux et capital restant en fin d'année."""
+    import numpy as np
+    import pandas as pd
+
+    valeurs = df_amortissement[list(COLONNES_AMORTISSEMENT)].to_numpy(dtype=float)
+    debuts = np.arange(0, len(valeurs), 12)
+    if not len(debuts):
+        return pd.DataFrame(columns=list(COLONNES_AMORTISSEMENT), index=pd.Index([], name="Année"), dtype=float)
+
+    annuel = np.add.reduceat(valeurs, debuts, axis=0)
+    annuel[:, -1] = valeurs[np.minimum(debuts + 11, len(valeurs) - 1), -1]
+    return pd.DataFrame(annuel, columns=list(COLONNES_AMORTISSEMENT), index=pd.Index(np.arange(1, len(debuts) + 1), name="Année"))
+
+
+def tab_amortissement_reference(params):
+    # Implémentation de référence (boucle mois par mois) : tests/test_moteur.py y compare la version vectorisée
+    import numpy_financial as npf
+    import pandas as pd
+
+    # Calcul du montant du prêt
+    montant_pret = params["montant_investissement"] - params["apport"] + params["frais_courtage"] if params["frais_inclus"] else params["montant_investissement"] - params["apport"]
+    capital_restant = montant_pret
+
+    # Calcul de la mensualité initiale
+    if params["type_differe"] == 'Sans différé' or params["duree_differe"] == 0:
+        mensualite = -npf.pmt(params["taux_interet"] / 12, params["duree_pret"], montant_pret)
+    else:
+        mensualite = None  # Calcul de la mensualité post différé
+
+    amortissement = []
+
+    for mois in range(1, params["duree_pret"] + 1):
+        interet = capital_restant * (params["taux_interet"] / 12)
+        assurance = montant_pret * (params["taux_assurance"] / 12)
+        
+        if mois <= params["duree_differe"]:
+            if params["type_differe"] == 'Différé total':
+                remboursement_capital = 0
+                mensualite_hors_assurance = 0
+                mensualite_avec_assurance = assurance
+                capital_restant += interet
+            elif params["type_differe"] == 'Différé partiel':
+                remboursement_capital = 0
+                mensualite_hors_assurance = interet
+                mensualite_avec_assurance = interet + assurance
+            else:
+                remboursement_capital = mensualite - interet
+                mensualite_hors_assurance = mensualite
+                mensualite_avec_assurance = mensualite + assurance
+        else:
+            if mois == params["duree_differe"] + 1:
+                mensualite = -npf.pmt(params["taux_interet"] / 12, params["duree_pret"] - params["duree_differe"], capital_restant)
+            
+            remboursement_capital = mensualite - interet
+            mensualite_hors_assurance = mensualite
+            mensualite_avec_assurance = mensualite + assurance
+
+        capital_restant -= remboursement_capital
+        
+        amortissement.append([mois, mensualite_hors_assurance, mensualite_avec_assurance, interet, assurance, remboursement_capital, capital_restant])
+
+    df_amortissement = pd.DataFrame(amortissement, columns=["Mois", "Mensualité sans assurance", "Mensualité avec assurance", "Intérêts", "Assurance", "Remboursement Capital", "Capital Restant"])
+    capital_restant_annuel = df_amortissement.groupby(df_amortissement.index // 12)["Capital Restant"].last()
+    
+    return df_amortissement, capital_restant_annuel
+
+
+def tab_investissement(params, df_amortissement):
+    import numpy as np
+    import pandas as pd
+
+    from scpi.lot import NB_ANNEES, normaliser_lot, projections_lot
+
+    lot = normaliser_lot(params)
+
+    # Intérêts capitalisés pendant un différé total : non déductibles la première année
+    interets_deductibles = df_amortissement["Intérêts"].to_numpy(dtype=float, copy=True)
+    if params["type_differe"] == 'Différé total':
+        interets_deductibles[:int(params["duree_differe"])] = 0
+
+    # Sommes annuelles par un seul reshape, report déductible dans un noyau séquentiel
+    echeancier = {
+        "Mensualité avec assurance": df_amortissement["Mensualité avec assurance"].to_numpy(dtype=float)[None, :],
+        "Intérêts Déductibles": interets_deductibles[None, :],
+        "Assurance": df_amortissement["Assurance"].to_numpy(dtype=float)[None, :],
+    }
+    projections = projections_lot(lot, echeancier)
+
+    return pd.DataFrame({"Année": np.arange(1, NB_ANNEES + 1), **{colonne: valeurs[0] for colonne, valeurs in projections.items()}})
+
+
+def simulation(params):
+    """Échéancier, capital restant annuel et projections ; seules les étapes touchées par un changement de paramètres sont recalculées."""
+    from scpi.graphe import calculer_etapes
+
+    (df_amortissement, capital_restant_annuel), df_investissement = calculer_etapes(params, ("tab_amortissement", "tab_investissement"))
+    return df_amortissement, capital_restant_annuel, df_investissement
+
+
+def indicateurs(params, df_investissement, loyer_apres_pret=None):
+    """Indicateurs de la vue d'ensemble (revenu, effort mensuel, rentabilités).
+
+    ``loyer_apres_pret`` remplace le loyer de fin de prêt déduit de ``params`` (portefeuille multi-SCPI).
+    """
+    from scpi.lot import PRELEVEMENTS_SOCIAUX
+
+    annees_pret = params["duree_pret"] // 12
+    effort_net_total = sum(df_investissement["Effort Annuel Net"][:annees_pret]) + params["apport"]
+    if loyer_apres_pret is None:
+        loyer_apres_pret = params["montant_investissement"] * params["rendement_souhaite"] * (1 + params["taux_revalorisation"])**annees_pret
+    impot_apres_pret = loyer_apres_pret * (params["taux_imposition"] + PRELEVEMENTS_SOCIAUX)
+    loyer_net_apres_pret = loyer_apres_pret - impot_apres_pret
+
+    return {
+        "effort_net_total": effort_net_total,
+        "loyer_apres_pret": loyer_apres_pret,
+        "revenu_mensuel": loyer_apres_pret / 12,
+        "effort_mensuel_moyen": sum(df_investissement["Effort Mensuel Net"][:annees_pret]) / annees_pret if annees_pret else float("nan"),
+        "rendement_brut": (loyer_apres_pret / effort_net_total) * 100 if effort_net_total else float("nan"),
+        "rendement_net": (loyer_net_apres_pret / effort_net_total) * 100 if effort_net_total else float("nan"),
+    }
+
+
+def synthese(params):
+    """Indicateurs et séries de « La vie de votre investissement » d'un scénario enregistré (mode comparaison).
+
+    ``params`` peut porter une clé ``portefeuille`` (colonnes de ``input_portefeuille``).
+    """
+    import numpy as np
+
+    from scpi.rentabilite import sortie_neutre_scenario, tri_scenario
+
+    portefeuille = params.get("portefeuille")
+    if portefeuille is None:
+        df_amortissement, capital_restant_annuel, df_investissement = simulation(params)
+        loyer_apres_pret = None
+    else:
+        from scpi.portefeuille import loyer_apres_pret_portefeuille, simulation_portefeuille
+
+        df_amortissement, capital_restant_annuel, df_investissement = simulation_portefeuille(params, portefeuille)
+        loyer_apres_pret = loyer_apres_pret_portefeuille(params, portefeuille)
+
+    duree_max = int(params["duree_pret"]) // 12
+    return {
+        **indicateurs(params, df_investissement, loyer_apres_pret),
+        "tri": tri_scenario(params, capital_restant_annuel, df_investissement),
+        "annee_sortie_neutre": sortie_neutre_scenario(params["apport"], capital_restant_annuel, df_investissement),
+        "capital_restant": np.asarray(capital_restant_annuel, dtype=float)[:duree_max],
+        "valeur_revente": df_investissement["Valeur de Revente"].to_numpy()[:duree_max],
+        "effort_net_cumule": df_investissement["Effort Annuel Net"].cumsum().to_numpy()[:duree_max],
+    }
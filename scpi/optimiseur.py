@@ -0,0 +1,147 @@
+"""Optimisation du financement : meilleure combinaison de différé, durée de prêt, apport et frais.
+
+L'espace des choix du formulaire (type et durée du différé, durée du prêt par pas de
+12 mois, apport par pas de 100 €, frais inclus ou non) compte de l'ordre d'un million
+de combinaisons. Plutôt que de toutes les simuler :
+
+1. une structure de prêt (différé, durée, frais) qui dépasse l'effort maximal avec
+   l'apport maximal est écartée, l'effort mensuel décroissant avec l'apport ;
+2. les structures restantes sont évaluées ensemble, en un appel au moteur par lot,
+   sur une grille grossière d'apports ;
+3. une structure dont le meilleur point, augmenté du plus grand écart entre deux
+   points voisins de sa grille, reste sous le k-ième meilleur résultat est élaguée,
+   sauf si sa grille franchit une contrainte (point faisable voisin d'un point qui ne
+   l'est pas) ;
+4. les survivantes sont affinées au pas de 100 € autour de leur meilleur point et
+   de chaque franchissement de contrainte.
+
+L'élagage est une heuristique, pas une borne exacte : l'objectif peut dépasser entre
+deux points de grille la borne de l'étape 3, et une structure sans aucun point
+faisable sur la grille grossière est écartée même si une fenêtre étroite d'apports la
+rendrait faisable. Sur les objectifs réguliers du simulateur, le classement coïncide
+avec une recherche exhaustive au pas de 100 €.
+
+Le classement garde le meilleur apport de chaque structure : les k lignes sont k
+financements différents, pas k apports voisins d'un même prêt. Sans montant emprunté,
+le différé n'a pas d'effet : ces structures sont ramenées à « Sans différé » avant
+le classement, pour ne pas occuper plusieurs lignes avec le même financement.
+"""
+import itertools
+
+import numpy as np
+import pandas as pd
+
+from scpi.lot import TYPES_DIFFERE, resume_lot
+from scpi.solveur import CIBLES
+
+OBJECTIFS = ("rendement_net", "tri")
+DUREES_PRET = range(12, 361, 12)
+DUREE_DIFFERE_MAX = 12
+PAS_APPORT = 100
+NB_POINTS_APPORT = 21
+COLONNES_STRUCTURE = ("type_differe", "duree_differe", "duree_pret", "frais_inclus")
+
+
+def structures_financement(params):
+    """Structures de prêt distinctes ; un différé de 0 mois équivaut à « Sans différé »."""
+    differes = [(TYPES_DIFFERE[0], 0)] + [(type_differe, duree) for type_differe in TYPES_DIFFERE[1:] for duree in range(1, DUREE_DIFFERE_MAX + 1)]
+    frais = (False, True) if params["frais_courtage"] > 0 else (False,)
+    lignes = [(type_differe, duree_differe, duree_pret, frais_inclus)
+              for (type_differe, duree_differe), duree_pret, frais_inclus in itertools.product(differes, DUREES_PRET, frais)
+              if duree_differe < duree_pret]
+    return pd.DataFrame(lignes, columns=list(COLONNES_STRUCTURE))
+
+
+def _evaluer(params, structures, indices, apports):
+    # Une passe du moteur par lot pour tous les couples (structure, apport)
+    choix = structures.iloc[indices]
+    return resume_lot({**params, **{colonne: choix[colonne].to_numpy() for colonne in COLONNES_STRUCTURE}, "apport": apports})
+
+
+def _scores(resume, colonne, effort_max, sortie_max):
+    # Objectif des points qui respectent les contraintes, -inf ailleurs
+    valeurs = resume[colonne].to_numpy()
+    faisables = np.isfinite(valeurs)
+    if effort_max is not None:
+        faisables &= resume["Effort Mensuel Moyen"].to_numpy() <= effort_max
+    if sortie_max is not None:
+        faisables &= resume["Année Sortie Neutre"].to_numpy() <= sortie_max
+    return np.where(faisables, valeurs, -np.inf)
+
+
+def _sans_differe_si_rien_emprunte(params, points):
+    # Sans montant emprunté, tous les différés donnent le même financement
+    montant_pret = params["montant_investissement"] - points["apport"] + np.where(points["frais_inclus"], params["frais_courtage"], 0)
+    rien_emprunte = (montant_pret <= 0).to_numpy()
+    points = points.copy()
+    points.loc[rien_emprunte, "type_differe"] = TYPES_DIFFERE[0]
+    points.loc[rien_emprunte, "duree_differe"] = 0
+    return points
+
+
+def optimiser_financement(params, objectif="rendement_net", effort_max=None, apport_max=None, sortie_max=None, k=5, nb_points=NB_POINTS_APPORT):
+    """Les ``k`` meilleurs financements pour ``objectif`` (``rendement_net`` ou ``tri``) sous contraintes.
+
+    ``effort_max`` borne l'effort mensuel moyen (€), ``apport_max`` l'apport (€, plafonné
+    au montant investi), ``sortie_max`` l'année de sortie neutre. Les autres paramètres
+    (montant, taux, SCPI, fiscalité) sont ceux de ``params``.
+    """
+    if objectif not in OBJECTIFS:
+        raise ValueError(f"Objectif inconnu : {objectif!r}, valeurs possibles : {OBJECTIFS}")
+    colonne = CIBLES[objectif]
+    structures = structures_financement(params)
+    apport_max = min(params["montant_investissement"] if apport_max is None else apport_max, params["montant_investissement"])
+    apport_max = np.floor(apport_max / PAS_APPORT) * PAS_APPORT
+    combinaisons = len(structures) * (int(apport_max // PAS_APPORT) + 1)
+    evalues = 0
+
+    # 1. Faisabilité de l'effort à l'apport maximal
+    if effort_max is not None:
+        resume = _evaluer(params, structures, np.arange(len(structures)), np.full(len(structures), apport_max))
+        evalues += len(structures)
+        structures = structures[resume["Effort Mensuel Moyen"].to_numpy() <= effort_max].reset_index(drop=True)
+
+    # 2. Grille grossière d'apports pour toutes les structures
+    grille = np.unique(np.round(np.linspace(0, apport_max, nb_points) / PAS_APPORT) * PAS_APPORT)
+    nb_structures, nb_grille = len(structures), len(grille)
+    scores = _scores(_evaluer(params, structures, np.repeat(np.arange(nb_structures), nb_grille), np.tile(grille, nb_structures)),
+                     colonne, effort_max, sortie_max).reshape(nb_structures, nb_grille)
+    evalues += scores.size
+
+    # 3. Élagage : borne optimiste = meilleur point + plus grand écart entre voisins
+    meilleurs = scores.max(axis=1, initial=-np.inf)
+    with np.errstate(invalid="ignore"):
+        ecarts = np.abs(np.diff(np.where(np.isfinite(scores), scores, np.nan), axis=1))
+    variation = np.nan_to_num(np.nanmax(ecarts, axis=1, initial=0.0), nan=0.0) if nb_grille > 1 else np.zeros(nb_structures)
+    finis = np.sort(meilleurs[np.isfinite(meilleurs)])[::-1]
+    seuil = finis[min(k, len(finis)) - 1] if len(finis) else np.inf
+    # Franchissement de contrainte entre deux points voisins : l'optimum peut se trouver entre eux
+    faisables = np.isfinite(scores)
+    franchissements = faisables[:, :-1] != faisables[:, 1:]
+    candidats = np.flatnonzero(np.isfinite(meilleurs) & ((meilleurs + variation >= seuil) | franchissements.any(axis=1)))
+
+    # 4. Affinage au pas de 100 € entre les voisins du meilleur point et de part et d'autre de chaque franchissement
+    indices, apports = [], []
+    for structure in candidats:
+        j = int(scores[structure].argmax())
+        intervalles = [(max(j - 1, 0), min(j + 1, nb_grille - 1))]
+        intervalles += [(i, i + 1) for i in np.flatnonzero(franchissements[structure])]
+        valeurs = np.unique(np.concatenate([np.arange(grille[bas], grille[haut] + PAS_APPORT / 2, PAS_APPORT) for bas, haut in intervalles]))
+        indices.append(np.full(len(valeurs), structure))
+        apports.append(valeurs)
+    if not indices:
+        return {"classement": pd.DataFrame(columns=[*COLONNES_STRUCTURE, "apport"]), "scenarios_evalues": evalues, "combinaisons": combinaisons}
+    indices, apports = np.concatenate(indices), np.concatenate(apports)
+    resume = _evaluer(params, structures, indices, apports)
+    evalues += len(indices)
+
+    points = pd.concat([structures.iloc[indices].reset_index(drop=True), pd.DataFrame({"apport": apports}), resume], axis=1)
+    points["score"] = _scores(resume, colonne, effort_max, sortie_max)
+    points = _sans_differe_si_rien_emprunte(params, points[np.isfinite(points["score"])])
+    # Meilleur apport de chaque structure, puis les k meilleures structures ; à score égal, le plus petit apport
+    classement = (points.sort_values(["score", "apport"], ascending=[False, True], kind="stable")
+                  .drop_duplicates(list(COLONNES_STRUCTURE))
+                  .head(k)
+                  .drop(columns="score")
+                  .reset_index(drop=True))
+    return {"classement": classement, "scenarios_evalues": evalues, "combinaisons": combinaisons}
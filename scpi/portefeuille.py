@@ -0,0 +1,97 @@
+"""Portefeuille de plusieurs SCPI financé par un même prêt.
+
+Les lignes du portefeuille sont stockées en colonnes (un tableau de H valeurs par
+caractéristique) ; loyers, impôts étrangers et valeurs de revente sont des matrices
+(H × années) calculées en une passe, puis sommées pour alimenter les étapes communes
+du moteur (effort d'épargne, impôt français avec report du déficit).
+"""
+import numpy as np
+
+from scpi.lot import NB_ANNEES, TAUX_IMPOSITION_EUROPE, assembler_projections, efforts_lot, fiscalite_lot, normaliser_lot
+
+# Caractéristiques d'une ligne, taux en fraction ; ``poids`` est la part relative du montant investi
+COLONNES_LIGNES = ("poids", "rendement", "delai_jouissance", "frais_souscription", "taux_revalorisation", "part_etranger", "taux_imposition_etranger")
+VALEURS_DEFAUT = {"part_etranger": 0.0, "taux_imposition_etranger": TAUX_IMPOSITION_EUROPE}
+
+
+def normaliser_portefeuille(lignes):
+    """Convertit un DataFrame, un mapping de colonnes ou une liste de dicts en tableaux (H,)."""
+    if isinstance(lignes, (list, tuple)):
+        lignes = {colonne: [ligne.get(colonne, VALEURS_DEFAUT.get(colonne)) for ligne in lignes] for colonne in COLONNES_LIGNES}
+    manquantes = [colonne for colonne in COLONNES_LIGNES if colonne not in lignes and colonne not in VALEURS_DEFAUT]
+    if manquantes:
+        raise ValueError(f"Colonnes manquantes : {manquantes}")
+
+    taille = len(lignes["poids"])
+    portefeuille = {
+        colonne: np.asarray(lignes[colonne], dtype=float) if colonne in lignes else np.full(taille, VALEURS_DEFAUT[colonne])
+        for colonne in COLONNES_LIGNES
+    }
+    if taille == 0 or (portefeuille["poids"] < 0).any() or portefeuille["poids"].sum() <= 0:
+        raise ValueError("Le portefeuille doit contenir au moins une ligne de poids positif")
+    return portefeuille
+
+
+def lignes_portefeuille(params, portefeuille, nb_annees=NB_ANNEES):
+    """Matrices (H × années) par ligne : loyers bruts, français et étrangers, impôt étranger, revente."""
+    annees = np.arange(1, nb_annees + 1)
+    montant = params["montant_investissement"] * portefeuille["poids"] / portefeuille["poids"].sum()
+    croissance = 1 + portefeuille["taux_revalorisation"][:, None]
+    revalorisation = croissance ** (annees - 1)
+
+    loyer_annuel = montant * portefeuille["rendement"]
+    loyer_brut = loyer_annuel[:, None] * revalorisation
+    loyer_brut[:, 0] = loyer_annuel * (12 - portefeuille["delai_jouissance"]) / 12
+    loyer_etranger = loyer_brut * portefeuille["part_etranger"][:, None]
+
+    return {
+        "Montant": montant,
+        "Loyer Brut": loyer_brut,
+        "Loyer Français": loyer_brut - loyer_etranger,
+        "Loyer Étranger": loyer_etranger,
+        # Règle européenne par ligne : le plus élevé du taux du pays et de la TMI
+        "Impôt Étranger": loyer_etranger * np.maximum(params["taux_imposition"], portefeuille["taux_imposition_etranger"])[:, None],
+        "Valeur de Revente": (montant * (1 - portefeuille["frais_souscription"]))[:, None] * revalorisation * croissance,
+    }
+
+
+def projections_portefeuille(params, lignes, nb_annees=NB_ANNEES):
+    """Lignes (H × années) et projections agrégées (1 × années), mêmes colonnes que ``tab_investissement``.
+
+    ``params`` fournit le prêt, la TMI et le montant total ; les caractéristiques des SCPI
+    (rendement, délai, frais, revalorisation, part étrangère) viennent de ``lignes``.
+    """
+    from scpi.graphe import calculer
+
+    portefeuille = normaliser_portefeuille(lignes)
+    detail = lignes_portefeuille(params, portefeuille, nb_annees)
+
+    # Les intérêts déductibles sont répartis au prorata de la part française du montant investi
+    part_etranger = (detail["Montant"] * portefeuille["part_etranger"]).sum() / detail["Montant"].sum()
+    lot = normaliser_lot({**params, "pourcentage_etranger": 100 * part_etranger})
+    loyers = {colonne: detail[colonne].sum(axis=0)[None, :] for colonne in ("Loyer Brut", "Loyer Français", "Loyer Étranger")}
+
+    # Échéancier partagé avec le graphe de la simulation simple (mêmes paramètres de prêt)
+    efforts = efforts_lot(lot, calculer(params, "annuites"), loyers)
+    fiscalite = fiscalite_lot(lot, loyers, efforts, impot_etranger=detail["Impôt Étranger"].sum(axis=0)[None, :])
+    return {"lignes": detail, "projections": assembler_projections(loyers, efforts, fiscalite, detail["Valeur de Revente"].sum(axis=0)[None, :])}
+
+
+def loyer_apres_pret_portefeuille(params, lignes):
+    """Loyer brut annuel du portefeuille à la fin du prêt (revalorisation propre à chaque ligne)."""
+    portefeuille = normaliser_portefeuille(lignes)
+    montant = params["montant_investissement"] * portefeuille["poids"] / portefeuille["poids"].sum()
+    return float((montant * portefeuille["rendement"] * (1 + portefeuille["taux_revalorisation"]) ** (params["duree_pret"] // 12)).sum())
+
+
+def simulation_portefeuille(params, lignes):
+    """Comme ``simulation`` : échéancier, capital restant annuel et tableau d'investissement agrégé."""
+    import pandas as pd
+
+    from scpi.graphe import calculer
+
+    projections = projections_portefeuille(params, lignes)["projections"]
+    df_amortissement, capital_restant_annuel = calculer(params, "tab_amortissement")
+    nb_annees = projections["Loyer Brut"].shape[1]
+    df_investissement = pd.DataFrame({"Année": np.arange(1, nb_annees + 1), **{colonne: valeurs[0] for colonne, valeurs in projections.items()}})
+    return df_amortissement, capital_restant_annuel, df_investissement
@@ -0,0 +1,157 @@
+"""Taux de rendement interne (TRI) des flux de trésorerie, pour tout un lot de scénarios.
+
+Flux de l'investisseur, année par année : apport en année 0, effort net (signe opposé)
+chaque année jusqu'à l'horizon, puis revente nette du capital restant dû à l'horizon.
+La VAN de tous les scénarios est évaluée sur une grille de taux par un seul produit
+matriciel ; dans l'intervalle de changement de signe le plus proche de 0 % (même
+convention que ``numpy_financial.irr``), un Newton borné retombe sur la bissection
+dès qu'il sort de l'intervalle, ce qui garantit la convergence. Quand la VAN au dernier
+taux de la grille n'a pas encore le signe de sa limite (le premier flux non nul), la
+racine est au-delà : la borne haute est repoussée géométriquement jusqu'au changement
+de signe. Sans changement de signe (flux tous de même signe, ou nuls), le TRI n'existe
+pas et vaut NaN.
+"""
+import numpy as np
+
+# Grille d'encadrement : fine autour des taux usuels, plus lâche vers les extrêmes
+GRILLE_TAUX = np.concatenate([
+    np.linspace(-0.99, -0.20, 16, endpoint=False),
+    np.linspace(-0.20, 0.50, 71, endpoint=False),
+    np.geomspace(0.50, 10.0, 14),
+])
+ITERATIONS_MAX = 100
+FACTEUR_PROLONGEMENT = 10.0
+PROLONGEMENTS_MAX = 30
+
+
+def flux_tresorerie(apport, effort_annuel_net, capital_fin_annee, valeur_revente, horizon):
+    """Flux (N × (T + 1)) : année 0 puis années 1 à T, nuls au-delà de l'horizon de chaque scénario.
+
+    ``horizon`` (N,) est l'année de revente, au moins 1 ; les autres tableaux sont (N × années).
+    """
+    horizon = np.asarray(horizon, dtype=np.int64)
+    lignes = np.arange(len(horizon))
+    duree = int(horizon.max()) if len(horizon) else 0
+
+    flux = np.zeros((len(horizon), duree + 1))
+    flux[:, 0] = -np.asarray(apport, dtype=float)
+    flux[:, 1:] = np.where(np.arange(1, duree + 1) <= horizon[:, None], -effort_annuel_net[:, :duree], 0)
+    flux[lignes, horizon] += valeur_revente[lignes, horizon - 1] - capital_fin_annee[lignes, horizon - 1]
+    return flux
+
+
+def _van(flux, taux):
+    # VAN et sa dérivée par rapport au taux, un taux par ligne
+    periodes = np.arange(flux.shape[1])
+    actualisation = (1 + taux)[:, None] ** -periodes
+    van = (flux * actualisation).sum(axis=1)
+    derivee = -(flux * periodes * actualisation).sum(axis=1) / (1 + taux)
+    return van, derivee
+
+
+def _encadrer_au_dela(flux, van):
+    # Taux multiplié par FACTEUR_PROLONGEMENT depuis le dernier de la grille jusqu'au changement de signe de la VAN
+    a = np.full(len(flux), GRILLE_TAUX[-1])
+    van_a = np.asarray(van, dtype=float).copy()
+    b = np.full(len(flux), np.nan)
+    for _ in range(PROLONGEMENTS_MAX):
+        ouverts = np.flatnonzero(np.isnan(b))
+        if not len(ouverts):
+            break
+        essai = a[ouverts] * FACTEUR_PROLONGEMENT
+        van_essai = _van(flux[ouverts], essai)[0]
+        bascule = np.signbit(van_essai) != np.signbit(van_a[ouverts])
+        b[ouverts[bascule]] = essai[bascule]
+        a[ouverts[~bascule]] = essai[~bascule]
+        van_a[ouverts[~bascule]] = van_essai[~bascule]
+    return a, b, van_a
+
+
+def tri_lot(flux, tolerance=1e-10, iterations_max=ITERATIONS_MAX):
+    """TRI (N,) de chaque ligne de ``flux``, en fraction ; NaN si aucun taux n'annule la VAN."""
+    flux = np.atleast_2d(np.asarray(flux, dtype=float))
+    n = len(flux)
+    van_grille = flux @ ((1 + GRILLE_TAUX)[None, :] ** -np.arange(flux.shape[1])[:, None])
+
+    # Intervalle de changement de signe le plus proche de 0 % ; zéro exact sur la grille accepté tel quel
+    changement = np.signbit(van_grille[:, :-1]) != np.signbit(van_grille[:, 1:])
+    distance = np.minimum(np.abs(GRILLE_TAUX[:-1]), np.abs(GRILLE_TAUX[1:]))
+    intervalle = np.where(changement, distance, np.inf).argmin(axis=1)
+    existe = changement[np.arange(n), intervalle]
+    exact = van_grille == 0
+
+    a, b = GRILLE_TAUX[intervalle], GRILLE_TAUX[intervalle + 1]
+    van_a = van_grille[np.arange(n), intervalle]
+
+    # La VAN tend vers le premier flux non nul quand le taux croît : si elle n'en a pas
+    # encore le signe au dernier taux de la grille, la racine est au-delà
+    premier = flux[np.arange(n), (flux != 0).argmax(axis=1)]
+    au_dela = (~existe & ~exact.any(axis=1) & (premier != 0) & (van_grille[:, -1] != 0)
+               & (np.signbit(van_grille[:, -1]) != np.signbit(premier)))
+    if au_dela.any():
+        a[au_dela], b[au_dela], van_a[au_dela] = _encadrer_au_dela(flux[au_dela], van_grille[au_dela, -1])
+        existe[au_dela] = ~np.isnan(b[au_dela])
+    taux = (a + b) / 2
+    actif = existe.copy()
+    for _ in range(iterations_max):
+        if not actif.any():
+            break
+        van, derivee = _van(flux[actif], taux[actif])
+
+        # Resserre l'intervalle du côté où la VAN a le même signe
+        meme_signe = np.signbit(van) == np.signbit(van_a[actif])
+        a_actif = np.where(meme_signe, taux[actif], a[actif])
+        b_actif = np.where(meme_signe, b[actif], taux[actif])
+        a[actif], b[actif] = a_actif, b_actif
+        van_a[actif] = np.where(meme_signe, van, van_a[actif])
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            newton = taux[actif] - van / derivee
+        dans_intervalle = np.isfinite(newton) & (newton > a_actif) & (newton < b_actif)
+        suivant = np.where(dans_intervalle, newton, (a_actif + b_actif) / 2)
+
+        converge = (van == 0) | (np.abs(suivant - taux[actif]) <= tolerance * (1 + np.abs(taux[actif]))) | (b_actif - a_actif <= tolerance)
+        taux[actif] = np.where(van == 0, taux[actif], suivant)
+        indices = np.flatnonzero(actif)
+        actif[indices[converge]] = False
+
+    resultat = np.where(existe, taux, np.nan)
+    # Lignes dont la VAN s'annule exactement sur un point de grille sans changement de signe détecté
+    sans_intervalle = ~existe & exact.any(axis=1) & (flux != 0).any(axis=1)
+    resultat[sans_intervalle] = GRILLE_TAUX[exact[sans_intervalle].argmax(axis=1)]
+    return resultat
+
+
+def _capital_annuel(capital_restant_annuel, nb_annees):
+    # Capital restant dû en fin d'année, nul après la fin du prêt
+    capital = np.zeros(nb_annees)
+    capital[:min(len(capital_restant_annuel), nb_annees)] = np.asarray(capital_restant_annuel, dtype=float)[:nb_annees]
+    return capital
+
+
+def tri_scenario(params, capital_restant_annuel, df_investissement, horizon=None):
+    """TRI (en %) d'une simulation simple, revente à ``horizon`` (défaut : fin du prêt, au moins 1 an)."""
+    from scpi.lot import NB_ANNEES
+
+    horizon = max(int(params["duree_pret"]) // 12, 1) if horizon is None else min(max(int(horizon), 1), NB_ANNEES)
+    flux = flux_tresorerie(
+        [params["apport"]],
+        df_investissement["Effort Annuel Net"].to_numpy(dtype=float)[None, :],
+        _capital_annuel(capital_restant_annuel, len(df_investissement))[None, :],
+        df_investissement["Valeur de Revente"].to_numpy(dtype=float)[None, :],
+        [horizon],
+    )
+    return float(tri_lot(flux)[0] * 100)
+
+
+def sortie_neutre_scenario(apport, capital_restant_annuel, df_investissement):
+    """Année de sortie neutre d'une simulation simple, ou None si la revente ne couvre jamais le coût."""
+    from scpi.lot import annee_sortie_neutre
+
+    annee = annee_sortie_neutre(
+        apport,
+        df_investissement["Effort Annuel Net"].to_numpy(dtype=float)[None, :],
+        _capital_annuel(capital_restant_annuel, len(df_investissement))[None, :],
+        df_investissement["Valeur de Revente"].to_numpy(dtype=float)[None, :],
+    )[0]
+    return None if np.isnan(annee) else int(annee)
@@ -0,0 +1,149 @@
+"""Résultats de simulation en colonnes : un tableau contigu par lot au lieu de DataFrames.
+
+Les projections annuelles de N scénarios sont rangées dans un seul tableau
+(colonnes × N × années), en float64 ou en float32 pour les gros lots ; chaque colonne
+est une vue sur ce tableau. Les séries dérivées (effort cumulé, coût total de sortie,
+écart français / étranger...) sont calculées au premier accès et gardées à part : les
+projections elles-mêmes ne sont jamais modifiées, on peut donc les partager entre
+sessions sans copie. 100 000 scénarios × 50 ans tiennent dans environ 350 Mio en float32.
+"""
+import numpy as np
+
+from scpi.lot import NB_ANNEES, TAILLE_BLOC
+
+COLONNES_PROJECTIONS = (
+    "Loyer Brut", "Loyer Français", "Loyer Étranger", "Effort Annuel", "Montant Déductible",
+    "Imposable Français", "Imposable Étranger", "Impôt Français", "Impôt Étranger", "Impôt Total",
+    "Report Déductible", "Effort Annuel Net", "Effort Mensuel Net", "Valeur de Revente",
+    "Loyer Net Français", "Loyer Net Étranger",
+)
+# Capital restant dû en fin d'année (nul après le prêt), nécessaire au coût de sortie
+COLONNES = COLONNES_PROJECTIONS + ("Capital Restant",)
+
+
+def _cout_total(resultats):
+    cout_total = resultats["Effort Net Cumulé"] + resultats["Capital Restant"]
+    cout_total[:, 0] += resultats["apport"]
+    return cout_total
+
+
+# Séries dérivées (N × années), dans l'ordre où elles sont exportées
+DERIVEES = {
+    "Effort Net Cumulé": lambda resultats: resultats["Effort Annuel Net"].cumsum(axis=1),
+    "Cout Total": _cout_total,
+    "Difference": lambda resultats: resultats["Valeur de Revente"] - resultats["Cout Total"],
+    "Différence": lambda resultats: resultats["Loyer Net Français"] - resultats["Loyer Net Étranger"],
+    "Différence_Abs": lambda resultats: np.abs(resultats["Différence"]),
+    "Revenus Totaux": lambda resultats: resultats["Loyer Net Français"] + resultats["Loyer Net Étranger"],
+}
+
+
+class Resultats:
+    """Projections (N × années) par colonne et valeurs par scénario (N,), dont ``apport``.
+
+    ``resultats["Loyer Brut"]`` renvoie une vue sur le tableau commun, une série dérivée
+    est calculée puis mémorisée à son premier accès, une valeur par scénario (apport,
+    indicateurs) est renvoyée telle quelle.
+    """
+
+    def __init__(self, donnees, scenarios, colonnes=COLONNES):
+        if donnees.shape[0] != len(colonnes):
+            raise ValueError(f"{donnees.shape[0]} colonnes de données pour {len(colonnes)} noms")
+        self.donnees = donnees
+        self.colonnes = tuple(colonnes)
+        self.scenarios = dict(scenarios)
+        self._positions = {colonne: i for i, colonne in enumerate(self.colonnes)}
+        self._derivees = {}
+
+    @classmethod
+    def vide(cls, nb_scenarios, nb_annees=NB_ANNEES, dtype=np.float64):
+        return cls(np.zeros((len(COLONNES), nb_scenarios, nb_annees), dtype=dtype), {"apport": np.zeros(nb_scenarios, dtype=dtype)})
+
+    @classmethod
+    def depuis_tableau(cls, df_investissement, capital_restant_annuel, apport, dtype=np.float64):
+        """Un scénario, à partir du tableau d'investissement et du capital restant de ``simulation``."""
+        resultats = cls.vide(1, len(df_investissement), dtype)
+        for colonne in COLONNES_PROJECTIONS:
+            resultats[colonne][0] = df_investissement[colonne].to_numpy()
+        capital = np.asarray(capital_restant_annuel, dtype=float)[:resultats.nb_annees]
+        resultats["Capital Restant"][0, :len(capital)] = capital
+        resultats["apport"][0] = apport
+        return resultats
+
+    def __len__(self):
+        return self.donnees.shape[1]
+
+    def __contains__(self, nom):
+        return nom in self._positions or nom in self.scenarios or nom in DERIVEES
+
+    def __getitem__(self, nom):
+        if nom in self._positions:
+            return self.donnees[self._positions[nom]]
+        if nom in self.scenarios:
+            return self.scenarios[nom]
+        if nom in DERIVEES:
+            if nom not in self._derivees:
+                self._derivees[nom] = DERIVEES[nom](self)
+            return self._derivees[nom]
+        raise KeyError(nom)
+
+    @property
+    def nb_annees(self):
+        return self.donnees.shape[2]
+
+    @property
+    def nbytes(self):
+        """Mémoire occupée par les tableaux, séries dérivées déjà calculées comprises."""
+        return self.donnees.nbytes + sum(valeurs.nbytes for valeurs in self.scenarios.values()) + sum(valeurs.nbytes for valeurs in self._derivees.values())
+
+    def liberer_derivees(self):
+        self._derivees.clear()
+
+    def selection(self, indices):
+        """Sous-ensemble de scénarios ; une tranche partage la mémoire, un tableau d'indices la copie."""
+        return Resultats(self.donnees[:, indices], {nom: valeurs[indices] for nom, valeurs in self.scenarios.items()}, self.colonnes)
+
+    def dataframe(self, scenario=0, derivees=False):
+        """Tableau d'investissement d'un scénario (mêmes colonnes que ``simulation``), séries dérivées en option."""
+        import pandas as pd
+
+        colonnes = COLONNES_PROJECTIONS + (tuple(DERIVEES) if derivees else ())
+        # Sans copie : les colonnes restent des vues (sur un fichier projeté en mémoire, par exemple)
+        return pd.DataFrame({"Année": np.arange(1, self.nb_annees + 1), **{colonne: self[colonne][scenario] for colonne in colonnes}}, copy=False)
+
+    def tableau_scenarios(self):
+        """Valeurs par scénario (une ligne par scénario), comme ``resume_lot``."""
+        import pandas as pd
+
+        return pd.DataFrame(self.scenarios)
+
+
+def resultats_lot(params, dtype=np.float64, taille_bloc=TAILLE_BLOC):
+    """Projections et indicateurs de N scénarios dans un ``Resultats``, calculés par blocs.
+
+    Seules les matrices mensuelles d'un bloc existent à la fois ; le résultat est
+    pré-alloué dans ``dtype`` (``np.float32`` divise la mémoire par deux).
+    """
+    from scpi.lot import normaliser_lot
+
+    return resultats_depuis_lot(normaliser_lot(params), dtype, taille_bloc)
+
+
+def resultats_depuis_lot(lot, dtype=np.float64, taille_bloc=TAILLE_BLOC):
+    """Comme ``resultats_lot``, pour un lot déjà normalisé (``normaliser_lot``)."""
+    from scpi.lot import capital_fin_annee, echeanciers_mutualises, extraire_lot, indicateurs_lot, projections_lot, taille_lot
+
+    resultats = Resultats.vide(taille_lot(lot), dtype=dtype)
+    resultats["apport"][:] = lot["apport"]
+    for debut in range(0, len(resultats), taille_bloc):
+        bloc = extraire_lot(lot, slice(debut, debut + taille_bloc))
+        fin = debut + len(bloc["apport"])
+        echeanciers = echeanciers_mutualises(bloc)
+        projections = projections_lot(bloc, echeanciers)
+
+        for colonne in COLONNES_PROJECTIONS:
+            resultats[colonne][debut:fin] = projections[colonne]
+        resultats["Capital Restant"][debut:fin] = capital_fin_annee(echeanciers["Capital Restant"], bloc["duree_pret"], resultats.nb_annees)
+        for nom, valeurs in indicateurs_lot(bloc, echeanciers, projections).items():
+            resultats.scenarios.setdefault(nom, np.empty(len(resultats), dtype=dtype))[debut:fin] = valeurs
+    return resultats
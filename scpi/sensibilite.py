@@ -0,0 +1,50 @@
+"""Sensibilité croisée : balayage de deux paramètres sur une grille, en un seul appel au moteur par lot."""
+import numpy as np
+
+from scpi.lot import resume_lot
+
+# Bornes des widgets de ``input_simulateur`` et pas minimal des paramètres discrets
+VARIABLES = {
+    "taux_interet": (0.0, 0.10, None),
+    "duree_pret": (12, 360, 12),
+    "taux_assurance": (0.0, 0.01, None),
+    "apport": (0.0, None, None),
+    "rendement_souhaite": (0.01, 0.10, None),
+    "delai_jouissance": (0, 12, 1),
+    "taux_revalorisation": (0.0, 0.05, None),
+    "frais_souscription": (0.0, 0.20, None),
+    "taux_imposition": (0.0, 0.45, None),
+    "pourcentage_etranger": (0, 100, 1),
+}
+NB_POINTS_MAX = 200
+
+
+def axe_sensibilite(params, variable, nb_points):
+    """Valeurs balayées pour ``variable`` : ``nb_points`` points entre les bornes des widgets."""
+    if variable not in VARIABLES:
+        raise ValueError(f"Paramètre inconnu : {variable!r}, valeurs possibles : {sorted(VARIABLES)}")
+    borne_min, borne_max, pas = VARIABLES[variable]
+    if borne_max is None:
+        borne_max = float(params["montant_investissement"])
+    valeurs = np.linspace(borne_min, borne_max, min(nb_points, NB_POINTS_MAX))
+    if pas is not None:
+        valeurs = np.unique(np.round(valeurs / pas) * pas)
+    return valeurs
+
+
+def grille_sensibilite(params, variable_x, variable_y, nb_points=50):
+    """Tous les indicateurs de ``resume_lot`` sur la grille (variable_y × variable_x).
+
+    Renvoie les axes sous les clés "x" et "y" et une matrice (len(y) × len(x)) par indicateur,
+    de sorte que changer l'indicateur affiché ne demande aucun recalcul.
+    """
+    if variable_x == variable_y:
+        raise ValueError("Les deux paramètres balayés doivent être différents")
+    valeurs_x = axe_sensibilite(params, variable_x, nb_points)
+    valeurs_y = axe_sensibilite(params, variable_y, nb_points)
+    grille_x, grille_y = np.meshgrid(valeurs_x, valeurs_y)
+
+    resume = resume_lot({**params, variable_x: grille_x.ravel(), variable_y: grille_y.ravel()})
+
+    forme = grille_x.shape
+    return {"x": valeurs_x, "y": valeurs_y, **{indicateur: resume[indicateur].to_numpy().reshape(forme) for indicateur in resume}}
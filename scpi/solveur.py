@@ -0,0 +1,132 @@
+"""Recherche d'objectif : valeur d'un paramètre libre pour atteindre un indicateur cible.
+
+Une première passe évalue toute une grille du paramètre en un seul appel au moteur
+par lot pour encadrer la solution, puis ``scipy.optimize.brentq`` affine dans
+l'intervalle trouvé. Les évaluations sont mémorisées pendant la recherche.
+"""
+import numpy as np
+
+from scpi.lot import echeanciers_lot, indicateurs_lot, normaliser_lot, projections_lot
+
+CIBLES = {
+    "effort_mensuel_moyen": "Effort Mensuel Moyen",
+    "rendement_net": "Rentabilité Nette",
+    "annee_sortie_neutre": "Année Sortie Neutre",
+    "tri": "TRI",
+}
+NB_POINTS_GRILLE = 33
+PAS_DUREE_PRET = 12
+
+
+def bornes_variable(params, variable):
+    """Bornes des widgets de ``input_simulateur`` pour le paramètre libre."""
+    bornes = {
+        "apport": (0.0, float(params["montant_investissement"])),
+        "duree_pret": (12, 360),
+        "taux_interet": (0.0, 0.10),
+        "rendement_souhaite": (0.01, 0.10),
+    }
+    if variable not in bornes:
+        raise ValueError(f"Paramètre libre inconnu : {variable!r}, valeurs possibles : {sorted(bornes)}")
+    return bornes[variable]
+
+
+class _Evaluateur:
+    def __init__(self, params, variable, cible):
+        self.params = params
+        self.variable = variable
+        self.colonne = CIBLES[cible]
+        self.memoire = {}
+        self.appels_moteur = 0
+
+    def evaluer(self, valeurs):
+        valeurs = np.atleast_1d(np.asarray(valeurs, dtype=float))
+        manquantes = np.array([v for v in np.unique(valeurs) if v not in self.memoire])
+        if len(manquantes):
+            lot = normaliser_lot({**self.params, self.variable: manquantes})
+            echeanciers = echeanciers_lot(lot)
+            resultats = indicateurs_lot(lot, echeanciers, projections_lot(lot, echeanciers))[self.colonne]
+            self.memoire.update(zip(manquantes.tolist(), resultats.tolist()))
+            self.appels_moteur += 1
+        return np.array([self.memoire[v] for v in valeurs.tolist()])
+
+
+def _premier_encadrement(grille, ecarts):
+    signes = np.sign(ecarts)
+    exactes = np.flatnonzero(ecarts == 0)
+    if len(exactes):
+        return exactes[0], exactes[0]
+    changements = np.flatnonzero(np.isfinite(ecarts[:-1]) & np.isfinite(ecarts[1:]) & (signes[:-1] != signes[1:]))
+    return (changements[0], changements[0] + 1) if len(changements) else None
+
+
+def _solution(evaluateur, valeur):
+    return {
+        "variable": evaluateur.variable,
+        "valeur": float(valeur),
+        "resultat": float(evaluateur.evaluer(valeur)[0]),
+        "appels_moteur": evaluateur.appels_moteur,
+    }
+
+
+def chercher_parametre(params, cible, valeur_cible, variable, tolerance=1e-6):
+    """Valeur de ``variable`` pour laquelle l'indicateur ``cible`` atteint ``valeur_cible``.
+
+    Pour l'année de sortie neutre, renvoie la plus petite (ou plus grande) valeur
+    garantissant une sortie au plus tard l'année visée. Lève ``ValueError`` si la
+    cible est hors d'atteinte dans les bornes des widgets.
+    """
+    if cible not in CIBLES:
+        raise ValueError(f"Indicateur cible inconnu : {cible!r}, valeurs possibles : {sorted(CIBLES)}")
+    evaluateur = _Evaluateur(params, variable, cible)
+    borne_min, borne_max = bornes_variable(params, variable)
+
+    if variable == "duree_pret":
+        grille = np.arange(borne_min, borne_max + 1, PAS_DUREE_PRET, dtype=float)
+    else:
+        grille = np.linspace(borne_min, borne_max, NB_POINTS_GRILLE)
+    resultats = evaluateur.evaluer(grille)
+
+    if cible == "annee_sortie_neutre":
+        # Fonction en escalier : on encadre la bascule du critère « sortie au plus tard l'année visée »
+        annees = np.where(np.isnan(resultats), np.inf, resultats)
+        atteinte = annees <= valeur_cible
+        if atteinte.all():
+            # Critère tenu sur toute la grille : borne du côté où la sortie recule
+            return _solution(evaluateur, grille[0] if annees[-1] <= annees[0] else grille[-1])
+        ecarts = np.where(atteinte, 1.0, -1.0)
+    else:
+        ecarts = resultats - valeur_cible
+
+    encadrement = _premier_encadrement(grille, ecarts)
+    if encadrement is None:
+        raise ValueError(f"Cible {valeur_cible} hors d'atteinte pour {variable} entre {borne_min} et {borne_max} "
+                         f"(résultats de {np.nanmin(resultats):.2f} à {np.nanmax(resultats):.2f})")
+    gauche, droite = encadrement
+
+    if gauche == droite or variable == "duree_pret":
+        # Paramètre discret : point de grille le plus proche de la cible
+        if cible == "annee_sortie_neutre":
+            indice = droite if atteinte[droite] else gauche
+        else:
+            indice = min((gauche, droite), key=lambda i: abs(ecarts[i]))
+        valeur = grille[indice]
+    elif cible == "annee_sortie_neutre":
+        # Bissection sur le critère booléen
+        a, b = grille[gauche], grille[droite]
+        atteinte_a = atteinte[gauche]
+        while b - a > tolerance * max(1.0, abs(b)):
+            milieu = (a + b) / 2
+            resultat = evaluateur.evaluer(milieu)[0]
+            if (not np.isnan(resultat) and resultat <= valeur_cible) == atteinte_a:
+                a = milieu
+            else:
+                b = milieu
+        valeur = a if atteinte_a else b
+    else:
+        from scipy.optimize import brentq
+
+        valeur = brentq(lambda x: evaluateur.evaluer(x)[0] - valeur_cible, grille[gauche], grille[droite],
+                        xtol=tolerance * max(1.0, abs(grille[droite])))
+
+    return _solution(evaluateur, valeur)
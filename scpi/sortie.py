@@ -0,0 +1,162 @@
+"""Sortie à n'importe quel mois : index de sommes cumulées, interrogé sans relancer le moteur.
+
+Pour chaque scénario, l'index garde sur 50 ans, mois par mois (le mois 0 étant la
+souscription) : l'effort net cumulé, le capital restant dû et la valeur de revente.
+La position nette d'une revente au mois m, remboursement anticipé du prêt compris,
+
+    valeur de revente[m] - capital restant[m] - apport - effort net cumulé[m]
+
+se lit alors en temps constant, pour un mois ou pour tout un lot de scénarios.
+
+L'effort mensuel reprend les échéances réelles du prêt ; le reste de l'effort annuel
+(loyers, impôts, frais) est réparti uniformément sur les douze mois, l'impôt étant
+annuel. En fin d'année, effort net cumulé, capital restant et valeur de revente sont
+donc exactement ceux du tableau d'investissement. La valeur de revente est interpolée
+linéairement entre deux fins d'année.
+
+L'apport est déduit de la position à chaque mois. L'année de sortie neutre annuelle
+(``annee_sortie_neutre``) et le « Cout Total » exporté ne le comptent qu'en première
+année : avec un apport, le mois de sortie neutre peut donc tomber après cette année.
+"""
+import numpy as np
+
+from scpi.lot import NB_ANNEES, TAILLE_BLOC, echeanciers_mutualises, extraire_lot, normaliser_lot, projections_lot, taille_lot
+
+NB_MOIS = NB_ANNEES * 12
+
+
+def _mensualiser(annuel):
+    # (N × années) -> (N × mois), chaque mois recevant un douzième de son année
+    return np.repeat(annuel / 12, 12, axis=1)
+
+
+def _interpoler(initiale, fins_annee):
+    # Valeurs (N × mois + 1) linéaires entre la valeur initiale et chaque fin d'année
+    bornes = np.column_stack([initiale, fins_annee])
+    fraction = np.tile(np.arange(12) / 12, fins_annee.shape[1])
+    debut = np.repeat(bornes[:, :-1], 12, axis=1)
+    fin = np.repeat(bornes[:, 1:], 12, axis=1)
+    return np.column_stack([debut + (fin - debut) * fraction, bornes[:, -1]])
+
+
+class IndexSortie:
+    """Effort net cumulé, capital restant et valeur de revente (N × mois + 1) de N scénarios."""
+
+    def __init__(self, apport, effort_cumule, capital_restant, valeur_revente):
+        self.apport = np.asarray(apport, dtype=float)
+        self.effort_cumule = effort_cumule
+        self.capital_restant = capital_restant
+        self.valeur_revente = valeur_revente
+        # Meilleure position atteinte depuis le mois 1 : croissante, donc ordonnée pour la dichotomie
+        positions = valeur_revente - capital_restant - self.apport[:, None] - effort_cumule
+        positions[:, 0] = -np.inf
+        self._meilleure_position = np.maximum.accumulate(positions, axis=1)
+
+    @classmethod
+    def construire(cls, apport, montant_pret, valeur_initiale, mensualites, capital_restant, duree_pret, effort_annuel_net, valeur_revente):
+        """Index à partir des échéanciers (N × mois du prêt) et des projections annuelles (N × années)."""
+        nb_scenarios, nb_annees = effort_annuel_net.shape
+        nb_mois = nb_annees * 12
+        duree_pret = np.broadcast_to(np.asarray(duree_pret, dtype=np.int64), (nb_scenarios,))
+
+        def etendre(mensuel):
+            complet = np.zeros((nb_scenarios, nb_mois))
+            largeur = min(mensuel.shape[1], nb_mois)
+            complet[:, :largeur] = mensuel[:, :largeur]
+            return complet
+
+        # Échéances des années comptées en prêt par le tableau d'investissement, le reste de l'effort étalé
+        annee = np.arange(nb_mois) // 12 + 1
+        echeances = etendre(mensualites) * (annee <= (duree_pret // 12)[:, None])
+        reste = effort_annuel_net - echeances.reshape(nb_scenarios, nb_annees, 12).sum(axis=2)
+        effort_cumule = np.zeros((nb_scenarios, nb_mois + 1))
+        np.cumsum(echeances + _mensualiser(reste), axis=1, out=effort_cumule[:, 1:])
+
+        capital = np.empty((nb_scenarios, nb_mois + 1))
+        capital[:, 0] = montant_pret
+        capital[:, 1:] = etendre(capital_restant)
+        return cls(apport, effort_cumule, capital, _interpoler(np.broadcast_to(valeur_initiale, (nb_scenarios,)), valeur_revente))
+
+    @classmethod
+    def depuis_lot(cls, lot, echeanciers, projections):
+        """Index d'un lot normalisé (``normaliser_lot``) et de ses échéanciers et projections."""
+        n = taille_lot(lot)
+        montant_pret = lot["montant_investissement"] - lot["apport"] + np.where(lot["frais_inclus"], lot["frais_courtage"], 0)
+        nb_mois = echeanciers["Capital Restant"].shape[1]
+        return cls.construire(
+            lot["apport"], montant_pret, lot["montant_investissement"] * (1 - lot["frais_souscription"]),
+            np.broadcast_to(echeanciers["Mensualité avec assurance"], (n, nb_mois)),
+            np.broadcast_to(echeanciers["Capital Restant"], (n, nb_mois)),
+            lot["duree_pret"], projections["Effort Annuel Net"], projections["Valeur de Revente"],
+        )
+
+    @classmethod
+    def depuis_simulation(cls, params, df_amortissement, df_investissement):
+        """Index d'une simulation simple (``simulation``), sans recalcul."""
+        montant_pret = params["montant_investissement"] - params["apport"] + (params["frais_courtage"] if params["frais_inclus"] else 0)
+        return cls.construire(
+            [params["apport"]], montant_pret, params["montant_investissement"] * (1 - params["frais_souscription"]),
+            df_amortissement["Mensualité avec assurance"].to_numpy(dtype=float)[None, :],
+            df_amortissement["Capital Restant"].to_numpy(dtype=float)[None, :],
+            int(params["duree_pret"]),
+            df_investissement["Effort Annuel Net"].to_numpy(dtype=float)[None, :],
+            df_investissement["Valeur de Revente"].to_numpy(dtype=float)[None, :],
+        )
+
+    def __len__(self):
+        return len(self.apport)
+
+    @property
+    def nb_mois(self):
+        return self.effort_cumule.shape[1] - 1
+
+    def position(self, mois, scenarios=slice(None)):
+        """Position nette d'une revente au mois ``mois`` (scalaire ou tableau), en temps constant."""
+        mois = np.clip(mois, 0, self.nb_mois)
+        lignes = np.arange(len(self))[scenarios]
+        return (self.valeur_revente[lignes, mois] - self.capital_restant[lignes, mois]
+                - self.apport[lignes] - self.effort_cumule[lignes, mois])
+
+    def detail(self, mois, scenario=0):
+        """Composantes de la position nette au mois ``mois`` pour un scénario."""
+        mois = int(np.clip(mois, 0, self.nb_mois))
+        return {
+            "Valeur de Revente": float(self.valeur_revente[scenario, mois]),
+            "Capital Restant": float(self.capital_restant[scenario, mois]),
+            "Effort Net Cumulé": float(self.effort_cumule[scenario, mois]),
+            "Position Nette": float(self.position(mois, [scenario])[0]),
+        }
+
+    def premier_mois(self, seuil=0.0):
+        """Premier mois (N,) où la position nette atteint ``seuil`` (NaN sinon), par dichotomie sur tout le lot."""
+        lignes = np.arange(len(self))
+        bas = np.ones(len(self), dtype=np.int64)
+        haut = np.full(len(self), self.nb_mois + 1, dtype=np.int64)
+        while (bas < haut).any():
+            milieu = (bas + haut) // 2
+            atteint = self._meilleure_position[lignes, np.minimum(milieu, self.nb_mois)] >= seuil
+            ouvert = bas < haut
+            haut = np.where(ouvert & atteint, milieu, haut)
+            bas = np.where(ouvert & ~atteint, milieu + 1, bas)
+        return np.where(bas <= self.nb_mois, bas, np.nan)
+
+
+def sorties_lot(params, mois=(), seuil=0.0, taille_bloc=TAILLE_BLOC):
+    """Mois de sortie neutre de N scénarios et position nette à chaque mois de ``mois``, une ligne par scénario.
+
+    Les scénarios sont traités par blocs ; seul l'index d'un bloc existe à la fois.
+    """
+    import pandas as pd
+
+    lot = normaliser_lot(params)
+    n = taille_lot(lot)
+    colonnes = {"Mois Sortie Neutre": np.empty(n), **{f"Position Mois {m}": np.empty(n) for m in mois}}
+    for debut in range(0, n, taille_bloc):
+        bloc = extraire_lot(lot, slice(debut, debut + taille_bloc))
+        echeanciers = echeanciers_mutualises(bloc)
+        index = IndexSortie.depuis_lot(bloc, echeanciers, projections_lot(bloc, echeanciers))
+        fin = debut + len(index)
+        colonnes["Mois Sortie Neutre"][debut:fin] = index.premier_mois(seuil)
+        for m in mois:
+            colonnes[f"Position Mois {m}"][debut:fin] = index.position(m)
+    return pd.DataFrame(colonnes)
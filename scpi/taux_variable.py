@@ -0,0 +1,115 @@
+"""Prêt à taux variable (capé ou non) sur K trajectoires de taux, en une passe vectorisée.
+
+Une trajectoire donne le taux annuel de chaque mois (indice + marge). Le taux appliqué
+est celui du mois de révision, borné par ``taux_min`` / ``taux_max`` (prêt capé), et
+reste fixe jusqu'à la révision suivante ; à chaque révision la mensualité est recalculée
+pour amortir le capital restant sur la durée restante. Les différés partiel et total
+suivent les mêmes règles que ``echeanciers_lot`` (intérêts capitalisés non déductibles).
+
+La récurrence avance mois par mois, chaque pas traitant les K trajectoires à la fois :
+les échéanciers obtenus (K × mois) alimentent ensuite ``projections_lot``, donc la
+déduction des intérêts et l'impôt de chaque trajectoire.
+"""
+import numpy as np
+
+from scpi.lot import extraire_lot, indicateurs_lot, normaliser_lot, projections_lot, taille_lot
+
+PERIODE_REVISION = 12
+
+
+def _diffuser_lot(lot, nb_trajectoires):
+    # Un scénario unique est répété sur les K trajectoires ; sinon une ligne par trajectoire
+    taille = taille_lot(lot)
+    if taille == nb_trajectoires:
+        return lot
+    if taille != 1:
+        raise ValueError(f"{taille} scénarios pour {nb_trajectoires} trajectoires de taux")
+    return extraire_lot(lot, np.zeros(nb_trajectoires, dtype=np.int64))
+
+
+def echeanciers_taux_variable(lot, taux, periode_revision=PERIODE_REVISION, taux_min=None, taux_max=None):
+    """Échéanciers (K × mois) pour des taux annuels mensuels ``taux`` (K × mois, ou un vecteur pour K = 1).
+
+    Une trajectoire plus courte que le prêt est prolongée par sa dernière valeur.
+    Mêmes colonnes que ``echeanciers_lot``.
+    """
+    taux = np.atleast_2d(np.asarray(taux, dtype=float))
+    lot = _diffuser_lot(lot, len(taux))
+    duree_pret = lot["duree_pret"].astype(np.int64)
+    nb_mois = int(duree_pret.max()) if len(duree_pret) else 0
+    if taux.shape[1] < nb_mois:
+        taux = np.pad(taux, ((0, 0), (0, nb_mois - taux.shape[1])), mode="edge")
+    taux = np.clip(taux[:, :nb_mois], taux_min, taux_max) if taux_min is not None or taux_max is not None else taux[:, :nb_mois]
+
+    montant_pret = lot["montant_investissement"] - lot["apport"] + np.where(lot["frais_inclus"], lot["frais_courtage"], 0)
+    differe = np.where(lot["code_differe"] == 0, 0, np.minimum(lot["duree_differe"].astype(np.int64), duree_pret))
+    differe_total = lot["code_differe"] == 2
+
+    forme = (len(taux), nb_mois)
+    interets = np.zeros(forme)
+    mensualite_hors_assurance = np.zeros(forme)
+    remboursement_capital = np.zeros(forme)
+    capital_restant = np.zeros(forme)
+
+    capital = montant_pret.astype(float)
+    mensualite = np.zeros(len(taux))
+    taux_mensuel = np.zeros(len(taux))
+    for mois in range(nb_mois):
+        if mois % periode_revision == 0:
+            taux_mensuel = taux[:, mois] / 12
+        interet = capital * taux_mensuel
+        en_differe = mois < differe
+
+        # Nouvelle annuité à chaque révision et au premier mois d'amortissement, sur la durée restante
+        restants = duree_pret - mois
+        recalcul = ~en_differe & ((mois % periode_revision == 0) | (mois == differe)) & (restants > 0)
+        if recalcul.any():
+            with np.errstate(divide="ignore", invalid="ignore"):
+                annuite = np.where(taux_mensuel == 0, capital / np.maximum(restants, 1), capital * taux_mensuel / (1 - (1 + taux_mensuel) ** -restants))
+            mensualite = np.where(recalcul, annuite, mensualite)
+
+        paiement = np.where(en_differe, np.where(differe_total, 0, interet), mensualite)
+        amortissement = np.where(en_differe, 0, mensualite - interet)
+        capital = np.where(en_differe & differe_total, capital + interet, capital - amortissement)
+
+        interets[:, mois] = interet
+        mensualite_hors_assurance[:, mois] = paiement
+        remboursement_capital[:, mois] = amortissement
+        capital_restant[:, mois] = capital
+
+    actif = np.arange(1, nb_mois + 1) <= duree_pret[:, None]
+    capitalises = (np.arange(nb_mois) < differe[:, None]) & differe_total[:, None]
+    assurance = np.broadcast_to((montant_pret * lot["taux_assurance"] / 12)[:, None], forme)
+    return {
+        "Mensualité sans assurance": mensualite_hors_assurance * actif,
+        "Mensualité avec assurance": (mensualite_hors_assurance + assurance) * actif,
+        "Intérêts": interets * actif,
+        "Assurance": assurance * actif,
+        "Remboursement Capital": remboursement_capital * actif,
+        "Capital Restant": capital_restant * actif,
+        "Intérêts Déductibles": interets * (actif & ~capitalises),
+    }
+
+
+def trajectoires_taux(taux_initial, nb_trajectoires, nb_mois=360, volatilite=0.005, derive=0.0, graine=0):
+    """Trajectoires (K × mois) de taux annuels : marche aléatoire à pas annuel, taux constant dans l'année, jamais négatif."""
+    alea = np.random.default_rng(graine)
+    nb_annees = -(-nb_mois // 12)
+    chocs = derive + volatilite * alea.standard_normal((nb_trajectoires, nb_annees))
+    chocs[:, 0] = 0
+    annuels = np.maximum(taux_initial + chocs.cumsum(axis=1), 0)
+    return np.repeat(annuels, 12, axis=1)[:, :nb_mois]
+
+
+def simulation_taux_variable(params, taux, periode_revision=PERIODE_REVISION, taux_min=None, taux_max=None):
+    """Comme ``simuler_lot`` pour un scénario et K trajectoires de taux (``taux_interet`` de ``params`` ignoré)."""
+    taux = np.atleast_2d(np.asarray(taux, dtype=float))
+    lot = _diffuser_lot(normaliser_lot(params), len(taux))
+    echeanciers = echeanciers_taux_variable(lot, taux, periode_revision, taux_min, taux_max)
+    projections = projections_lot(lot, echeanciers)
+    return {
+        "echeanciers": echeanciers,
+        "projections": projections,
+        "indicateurs": indicateurs_lot(lot, echeanciers, projections),
+    }
+
@@ -0,0 +1,122 @@
+"""Mesures par étape d'un rerun : durée, allocations et succès/échec du cache.
+
+Le traçage est actif seulement à l'intérieur de ``with rerun(actif=True)``. Ailleurs,
+``etape`` renvoie un gestionnaire de contexte vide partagé : le coût d'une étape non
+tracée se limite à la lecture d'une ``ContextVar``. Les allocations sont mesurées avec
+``tracemalloc``, démarré pendant les reruns tracés seulement ; ce suivi est global au
+processus, les valeurs se mélangent donc si plusieurs sessions tracent en même temps.
+"""
+import contextlib
+import json
+import os
+import threading
+import time
+import tracemalloc
+import uuid
+from contextvars import ContextVar
+
+FICHIER = os.environ.get("SCPI_TRACE_FICHIER", "traces_scpi.jsonl")
+
+_rerun_courant = ContextVar("rerun_scpi", default=None)
+_NUL = contextlib.nullcontext()
+_verrou = threading.Lock()
+_reruns_actifs = 0
+_tracemalloc_demarre = False
+
+
+class Etape:
+    def __init__(self, rerun, nom):
+        self.rerun = rerun
+        self.mesure = {"etape": nom, "parent": rerun.pile[-1].mesure["etape"] if rerun.pile else None, "profondeur": len(rerun.pile)}
+        self._pic = 0
+
+    def __enter__(self):
+        courant, pic = tracemalloc.get_traced_memory()
+        if self.rerun.pile:
+            parent = self.rerun.pile[-1]
+            parent._pic = max(parent._pic, pic)
+        tracemalloc.reset_peak()
+        self.rerun.pile.append(self)
+        self._memoire = courant
+        self._debut = time.perf_counter()
+        self.mesure["debut_ms"] = (self._debut - self.rerun.debut) * 1000
+        return self
+
+    def __exit__(self, *exc):
+        duree = time.perf_counter() - self._debut
+        courant, pic = tracemalloc.get_traced_memory()
+        self._pic = max(self._pic, pic)
+        self.rerun.pile.pop()
+        if self.rerun.pile:
+            parent = self.rerun.pile[-1]
+            parent._pic = max(parent._pic, self._pic)
+        tracemalloc.reset_peak()
+
+        self.mesure["duree_ms"] = duree * 1000
+        self.mesure["allocation_nette_kio"] = (courant - self._memoire) / 1024
+        self.mesure["allocation_pic_kio"] = (self._pic - self._memoire) / 1024
+        self.rerun.etapes.append(self.mesure)
+
+
+class Rerun:
+    def __init__(self):
+        self.id = uuid.uuid4().hex[:12]
+        self.horodatage = time.time()
+        self.debut = time.perf_counter()
+        self.pile = []
+        self.etapes = []
+
+
+def etape(nom):
+    """Gestionnaire de contexte mesurant l'étape ``nom`` si le rerun courant est tracé."""
+    rerun = _rerun_courant.get()
+    if rerun is None:
+        return _NUL
+    return Etape(rerun, nom)
+
+
+def compter(compteur):
+    """Incrémente ``compteur`` (ex. ``"cache_succes"``) de l'étape en cours, si le rerun est tracé."""
+    rerun = _rerun_courant.get()
+    if rerun is not None and rerun.pile:
+        mesure = rerun.pile[-1].mesure
+        mesure[compteur] = mesure.get(compteur, 0) + 1
+
+
+def _ecrire(rerun, fichier):
+    lignes = "".join(json.dumps({"rerun": rerun.id, "horodatage": rerun.horodatage, **mesure}, ensure_ascii=False) + "\n" for mesure in rerun.etapes)
+    with _verrou, open(fichier, "a", encoding="utf-8") as f:
+        f.write(lignes)
+
+
+@contextlib.contextmanager
+def rerun(actif, fichier=FICHIER):
+    """Trace les étapes exécutées dans le bloc ; renvoie le ``Rerun`` (ou None si inactif).
+
+    Les mesures, dans l'ordre de fin des étapes, sont ajoutées à ``fichier`` en JSON lines
+    (une ligne par étape) à la sortie du bloc ; ``fichier=None`` n'écrit rien.
+    """
+    global _reruns_actifs, _tracemalloc_demarre
+    if not actif:
+        yield None
+        return
+
+    with _verrou:
+        if _reruns_actifs == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            _tracemalloc_demarre = True
+        _reruns_actifs += 1
+    courant = Rerun()
+    jeton = _rerun_courant.set(courant)
+    try:
+        with Etape(courant, "rerun"):
+            yield courant
+    finally:
+        _rerun_courant.reset(jeton)
+        with _verrou:
+            _reruns_actifs -= 1
+            if _reruns_actifs == 0 and _tracemalloc_demarre:
+                tracemalloc.stop()
+                _tracemalloc_demarre = False
+        if fichier is not None:
+            _ecrire(courant, fichier)
@@ -0,0 +1,67 @@
+"""Contrôle des paramètres selon les bornes des widgets de ``input_simulateur``."""
+import numpy as np
+
+from scpi.lot import COLONNES_NUMERIQUES, TYPES_DIFFERE
+
+COLONNES_REQUISES = (*COLONNES_NUMERIQUES, "type_differe", "frais_inclus")
+
+# Bornes des widgets, taux exprimés en fraction comme dans ``params``
+BORNES = {
+    "montant_investissement": (0, 1_000_000),
+    "apport": (0, None),  # Plafonné par le montant investi
+    "duree_pret": (0, 360),
+    "taux_interet": (0.0, 0.10),
+    "taux_assurance": (0.0, 0.01),
+    "duree_differe": (0, 12),
+    "frais_courtage": (0, 10_000),
+    "rendement_souhaite": (0.01, 0.10),
+    "delai_jouissance": (0, 12),
+    "taux_revalorisation": (0.0, 0.05),
+    "frais_souscription": (0.0, 0.20),
+    "taux_imposition": (0.0, 0.45),
+    "pourcentage_etranger": (0, 100),
+}
+PAS = {"duree_pret": 12, "duree_differe": 1, "delai_jouissance": 1}
+VALEURS_AUTORISEES = {"taux_imposition": (0.0, 0.11, 0.30, 0.41, 0.45)}
+TOLERANCE = 1e-9
+
+
+def valider_lot(params):
+    """Message d'erreur par scénario (chaîne vide si le scénario est valide).
+
+    ``params`` est un DataFrame ou un mapping de colonnes de même longueur.
+    """
+    manquantes = [colonne for colonne in COLONNES_REQUISES if colonne not in params]
+    if manquantes:
+        raise ValueError(f"Colonnes manquantes : {manquantes}")
+    taille = len(params["type_differe"])
+    erreurs = [[] for _ in range(taille)]
+
+    def signaler(masque, message):
+        for indice in np.flatnonzero(masque):
+            erreurs[indice].append(message)
+
+    valeurs = {}
+    for colonne in COLONNES_NUMERIQUES:
+        try:
+            valeurs[colonne] = np.asarray(params[colonne], dtype=float)
+        except (TypeError, ValueError):
+            raise ValueError(f"Colonne non numérique : {colonne}")
+        signaler(np.isnan(valeurs[colonne]), f"{colonne} manquant")
+
+    for colonne, (borne_min, borne_max) in BORNES.items():
+        valeur = valeurs[colonne]
+        if borne_max is None:
+            borne_max = valeurs["montant_investissement"]
+        signaler((valeur < borne_min - TOLERANCE) | (valeur > borne_max + TOLERANCE), f"{colonne} hors bornes")
+    for colonne, pas in PAS.items():
+        signaler(np.abs(valeurs[colonne] / pas - np.round(valeurs[colonne] / pas)) > TOLERANCE, f"{colonne} doit être un multiple de {pas}")
+    for colonne, autorisees in VALEURS_AUTORISEES.items():
+        signaler(~np.isclose(valeurs[colonne][:, None], autorisees, atol=TOLERANCE).any(axis=1), f"{colonne} doit valoir {autorisees}")
+
+    type_differe = np.asarray(params["type_differe"], dtype=object)
+    signaler(~np.isin(type_differe, TYPES_DIFFERE), "type_differe inconnu")
+    frais_inclus = np.asarray(params["frais_inclus"], dtype=object)
+    signaler(~np.isin(frais_inclus, (True, False, 0, 1)), "frais_inclus doit être booléen")
+
+    return np.array(["; ".join(messages) for messages in erreurs], dtype=object)
@@ -1,34 +1,55 @@
+import os
+
 import streamlit as st
-import pandas as pd
-import numpy_financial as npf
 import numpy as np
-import plotly.graph_objects as go
-import matplotlib.pyplot as plt
-import uuid
-from datetime import date
-
-
-st.set_page_config(
-    layout="centered", 
-    page_title="Simulateur SCPI", 
-    page_icon="📊", 
-    initial_sidebar_state="expanded", 
-)
-
-with open("assets/style.css") as f:
-    st.markdown(f"<style>{f.read()}</style>", unsafe_allow_html=True)
-
-st.markdown(f"""
-<div class="title-container">
-    <h1 class="main-title">Simulateur SCPI</h1>
-    <div class="separator"></div>
-    <p class="subtitle">Investissez dans de l'immobilier professionnel à partir de 50 000€</p>
-    <div class="info-container">
-        <div class="update-info">Dernière mise à jour : 09/10/2024</div>
-        <div class="author-info">Par Antoine Berjoan</div>
+import pandas as pd
+
+from scpi.cache import cache_simulation
+from scpi.entrepot import CHEMIN as CHEMIN_ENTREPOT, entrepot_partage
+from scpi.export import FORMATS, exporter, formats_disponibles
+from scpi.graphiques import controler_taille, figure_amortissement, figure_loyers, figure_monte_carlo, figure_sensibilite
+from scpi.moteur import COLONNES_AMORTISSEMENT, indicateurs, simulation, synthese, tab_amortissement_annuel
+from scpi.monte_carlo import monte_carlo
+from scpi.optimiseur import optimiser_financement
+from scpi.portefeuille import loyer_apres_pret_portefeuille, simulation_portefeuille
+from scpi.rentabilite import sortie_neutre_scenario, tri_scenario
+from scpi.resultats import Resultats
+from scpi.sensibilite import grille_sensibilite
+from scpi.sortie import IndexSortie
+from scpi.solveur import chercher_parametre
+from scpi.trace import FICHIER as FICHIER_TRACES, etape, rerun
+
+RACINE = os.path.dirname(os.path.abspath(__file__))
+
+
+@st.cache_resource
+def feuille_style():
+    # Lue une fois par processus et partagée entre sessions
+    with open(os.path.join(RACINE, "assets", "style.css")) as f:
+        return f"<style>{f.read()}</style>"
+
+
+def configurer_page():
+    st.set_page_config(
+        layout="centered", 
+        page_title="Simulateur SCPI", 
+        page_icon="📊", 
+        initial_sidebar_state="expanded", 
+    )
+
+    st.markdown(feuille_style(), unsafe_allow_html=True)
+
+    st.markdown(f"""
+    <div class="title-container">
+        <h1 class="main-title">Simulateur SCPI</h1>
+        <div class="separator"></div>
+        <p class="subtitle">Investissez dans de l'immobilier professionnel à partir de 50 000€</p>
+        <div class="info-container">
+            <div class="update-info">Dernière mise à jour : 09/10/2024</div>
+            <div class="author-info">Par Antoine Berjoan</div>
+        </div>
     </div>
-</div>
-""", unsafe_allow_html=True)
+    """, unsafe_allow_html=True)
 
 
 def input_simulateur():
@@ -83,264 +104,112 @@ def input_simulateur():
         "pourcentage_etranger": pourcentage_etranger,
     }
 
-def tab_amortissement(params):
-    # Calcul du montant du prêt
-    montant_pret = params["montant_investissement"] - params["apport"] + params["frais_courtage"] if params["frais_inclus"] else params["montant_investissement"] - params["apport"]
-    capital_restant = montant_pret
-
-    # Calcul de la mensualité initiale
-    if params["type_differe"] == 'Sans différé' or params["duree_differe"] == 0:
-        mensualite = -npf.pmt(params["taux_interet"] / 12, params["duree_pret"], montant_pret)
-    else:
-        mensualite = None  # Calcul de la mensualité post différé
-
-    amortissement = []
-
-    for mois in range(1, params["duree_pret"] + 1):
-        interet = capital_restant * (params["taux_interet"] / 12)
-        assurance = montant_pret * (params["taux_assurance"] / 12)
-        
-        if mois <= params["duree_differe"]:
-            if params["type_differe"] == 'Différé total':
-                remboursement_capital = 0
-                mensualite_hors_assurance = 0
-                mensualite_avec_assurance = assurance
-                capital_restant += interet
-            elif params["type_differe"] == 'Différé partiel':
-                remboursement_capital = 0
-                mensualite_hors_assurance = interet
-                mensualite_avec_assurance = interet + assurance
-            else:
-                remboursement_capital = mensualite - interet
-                mensualite_hors_assurance = mensualite
-                mensualite_avec_assurance = mensualite + assurance
-        else:
-            if mois == params["duree_differe"] + 1:
-                mensualite = -npf.pmt(params["taux_interet"] / 12, params["duree_pret"] - params["duree_differe"], capital_restant)
-            
-            remboursement_capital = mensualite - interet
-            mensualite_hors_assurance = mensualite
-            mensualite_avec_assurance = mensualite + assurance
-
-        capital_restant -= remboursement_capital
-        
-        amortissement.append([mois, mensualite_hors_assurance, mensualite_avec_assurance, interet, assurance, remboursement_capital, capital_restant])
+def input_monte_carlo():
+    with st.sidebar:
+        with st.expander("🎲 Mode stochastique (Monte Carlo)"):
+            if not st.checkbox("Activer les scénarios aléatoires", help="Rendement et revalorisation tirés au hasard chaque année autour des valeurs choisies."):
+                return None
+            return {
+                "nb_trajectoires": st.select_slider("Nombre de trajectoires", options=[10000, 25000, 50000, 100000], value=10000),
+                "volatilite_rendement": st.slider("Volatilité du rendement (pts)", 0.0, 2.0, 0.5, 0.1) / 100,
+                "volatilite_revalorisation": st.slider("Volatilité de la revalorisation (pts)", 0.0, 5.0, 1.0, 0.1) / 100,
+                "probabilite_vacance": st.slider("Probabilité de vacance annuelle (%)", 0, 30, 0, 1) / 100,
+                "perte_vacance": st.slider("Perte de loyer en cas de vacance (%)", 0, 100, 25, 5) / 100,
+                "graine": st.number_input("Graine aléatoire", 0, 10**6, 0, 1),
+            }
 
-    df_amortissement = pd.DataFrame(amortissement, columns=["Mois", "Mensualité sans assurance", "Mensualité avec assurance", "Intérêts", "Assurance", "Remboursement Capital", "Capital Restant"])
-    capital_restant_annuel = df_amortissement.groupby(df_amortissement.index // 12)["Capital Restant"].last()
-    
-    return df_amortissement, capital_restant_annuel
+PORTEFEUILLE_DEFAUT = {
+    "SCPI": ["SCPI France", "SCPI Europe"],
+    "Poids (%)": [50.0, 50.0],
+    "Rendement (%)": [5.0, 5.5],
+    "Délai (mois)": [6, 5],
+    "Frais (%)": [12.0, 10.0],
+    "Revalorisation (%)": [1.0, 1.0],
+    "Étranger (%)": [0.0, 100.0],
+    "Impôt pays (%)": [20.0, 20.0],
+}
+
+def input_portefeuille():
+    with st.sidebar:
+        with st.expander("🧺 Portefeuille multi-SCPI"):
+            if not st.checkbox("Répartir sur plusieurs SCPI", help="Chaque SCPI a son rendement, son délai, ses frais, sa revalorisation et sa fiscalité ; le prêt et la TMI restent ceux saisis plus haut."):
+                return None
+            st.caption("Remplace rendement, délai, revalorisation, frais et part étrangère ci-dessus. Les onglets Objectif et Sensibilité restent calculés sur une SCPI unique.")
+            df_lignes = st.data_editor(
+                pd.DataFrame(PORTEFEUILLE_DEFAUT),
+                num_rows="dynamic",
+                hide_index=True,
+                column_config={
+                    "Poids (%)": st.column_config.NumberColumn(min_value=0.0, max_value=100.0, step=1.0),
+                    "Rendement (%)": st.column_config.NumberColumn(min_value=1.0, max_value=10.0, step=0.1),
+                    "Délai (mois)": st.column_config.NumberColumn(min_value=0, max_value=12, step=1),
+                    "Frais (%)": st.column_config.NumberColumn(min_value=0.0, max_value=20.0, step=0.5),
+                    "Revalorisation (%)": st.column_config.NumberColumn(min_value=0.0, max_value=5.0, step=0.1),
+                    "Étranger (%)": st.column_config.NumberColumn(min_value=0.0, max_value=100.0, step=1.0),
+                    "Impôt pays (%)": st.column_config.NumberColumn(min_value=0.0, max_value=45.0, step=0.5),
+                },
+                key="portefeuille",
+            ).dropna(subset=list(PORTEFEUILLE_DEFAUT)[1:])
+            if df_lignes.empty or df_lignes["Poids (%)"].sum() <= 0:
+                st.warning("Ajoutez au moins une SCPI de poids positif.")
+                return None
+            return {
+                "poids": df_lignes["Poids (%)"].tolist(),
+                "rendement": (df_lignes["Rendement (%)"] / 100).tolist(),
+                "delai_jouissance": df_lignes["Délai (mois)"].tolist(),
+                "frais_souscription": (df_lignes["Frais (%)"] / 100).tolist(),
+                "taux_revalorisation": (df_lignes["Revalorisation (%)"] / 100).tolist(),
+                "part_etranger": (df_lignes["Étranger (%)"] / 100).tolist(),
+                "taux_imposition_etranger": (df_lignes["Impôt pays (%)"] / 100).tolist(),
+            }
 
-def tab_investissement(params, df_amortissement):
+def bouton_export(params, table, tableau, nom_fichier):
+    format_export = st.radio("Format", formats_disponibles(), horizontal=True, format_func=str.upper, key=f"format_{table}")
+    mime, extension = FORMATS[format_export]
+    # Sérialisation différée au clic, mise en cache par jeu de paramètres
+    st.download_button(label=f"Télécharger les résultats ({format_export.upper()})", 
+                    data=lambda: cache_simulation.obtenir({**params, "export": [table, format_export]}, lambda _: exporter(tableau(), format_export), espace="export"), 
+                    file_name=nom_fichier + extension, 
+                    mime=mime,
+                    key=f"export_{table}")
 
-    resultats = []
-    deductible_cumule = 0
+def colonnes_montants(colonnes):
+    return {colonne: st.column_config.NumberColumn(format="localized") for colonne in colonnes}
 
-    taux_imposition_europe = 20
+def color_alternating_rows(s):
+    return ['background-color: #EEEFF1' if i % 2 == 0 else 'background-color: #FBFBFB' for i in range(len(s))]
 
-    for annee in range(1, 51):
-        if annee == 1:
-            loyer_brut = params["montant_investissement"] * params["rendement_souhaite"] * (12 - params["delai_jouissance"]) / 12
-        else:
-            loyer_brut = params["montant_investissement"] * params["rendement_souhaite"] * (1 + params["taux_revalorisation"])**(annee - 1)
-
-        loyer_francais = loyer_brut * (1 - params["pourcentage_etranger"] / 100)
-        loyer_etranger = loyer_brut * (params["pourcentage_etranger"] / 100)
-
-        if annee <= params["duree_pret"] // 12:
-            effort_annuel = df_amortissement["Mensualité avec assurance"][(annee-1)*12:annee*12].sum() - loyer_brut
-            if annee == 1 and not params["frais_inclus"]:
-                effort_annuel += params["frais_courtage"]
-         
-            if annee == 1:
-                if params["type_differe"] == 'Différé total':
-                    montant_deductible =df_amortissement["Assurance"][:12].sum() + \
-                                        df_amortissement["Intérêts"][params["duree_differe"]:12].sum() + \
-                                        params["frais_courtage"]
-                else:  
-                    montant_deductible =df_amortissement["Assurance"][:12].sum() + \
-                                        df_amortissement["Intérêts"][:12].sum() + \
-                                        params["frais_courtage"]
-            else:
-                montant_deductible =df_amortissement["Intérêts"][(annee-1)*12:annee*12].sum() + \
-                                    df_amortissement["Assurance"][(annee-1)*12:annee*12].sum() 
-        else:
-            effort_annuel = -loyer_brut
-            montant_deductible = 0
+def style_investissement(df_investissement):
+    df_to_display_investissement = df_investissement[['Loyer Brut', 'Impôt Total', 'Effort Annuel Net', 'Effort Mensuel Net', 'Valeur de Revente']]
 
-        imposable_francais = loyer_francais - (montant_deductible * (1 - params["pourcentage_etranger"] / 100))
-        imposable_etranger = loyer_etranger
+    return df_to_display_investissement.style.format("{:,.0f}") \
+        .set_properties(**{
+            'color': '#202021',
+        }) \
+        .apply(color_alternating_rows) \
+        .set_table_styles([
+            {'selector': 'th',
+            'props': [('font-weight', 'bold'),
+                    ('background-color', '#284264'),
+                    ('color', 'white')]},
+            # Assurer que la table occupe toute la largeur disponible
+            {'selector': 'table',
+            'props': [('width', '100%'),
+                    ('table-layout', 'fixed')]},
+        ])
 
-        if imposable_francais < 0:
-            deductible_cumule += abs(imposable_francais)
-            impot_francais = 0
-        else:
-            if deductible_cumule > 0:
-                if deductible_cumule < imposable_francais:
-                    net_imposable = imposable_francais - deductible_cumule
-                    impot_francais = net_imposable * (params["taux_imposition"] + 0.172)
-                    deductible_cumule = 0
-                else:
-                    deductible_cumule -= imposable_francais
-                    impot_francais = 0
-            else:
-                impot_francais = imposable_francais * (params["taux_imposition"] + 0.172)
-
-        impot_etranger = imposable_etranger * max(params["taux_imposition"], taux_imposition_europe / 100)
-        impot_total = impot_francais + impot_etranger
-
-        effort_net = effort_annuel + impot_total
-        valeur_revente = params["montant_investissement"] * (1 - params["frais_souscription"]) * (1 + params["taux_revalorisation"])**annee
-
-        resultats.append({
-            "Année": annee,
-            "Loyer Brut": loyer_brut,
-            "Loyer Français": loyer_francais,
-            "Loyer Étranger": loyer_etranger,
-            "Effort Annuel": effort_annuel,
-            "Montant Déductible": montant_deductible,
-            "Imposable Français": imposable_francais,
-            "Imposable Étranger": imposable_etranger,
-            "Impôt Français": impot_francais,
-            "Impôt Étranger": impot_etranger,
-            "Impôt Total": impot_total,
-            "Report Déductible": deductible_cumule,
-            "Effort Annuel Net": effort_net,
-            "Effort Mensuel Net": effort_net / 12,
-            "Valeur de Revente": valeur_revente,
-            "Loyer Net Français": loyer_francais - impot_francais,
-            "Loyer Net Étranger": loyer_etranger - impot_etranger
-        })
-
-    return pd.DataFrame(resultats)
+def figure_partagee(cle, nom, construire):
+    """Figure ``nom`` construite une fois par clé de cache et partagée, en lecture seule, entre sessions."""
+    def calcul(_):
+        fig = construire()
+        # Taille du JSON relue par le cache pour son plafond mémoire, sans resérialiser
+        fig._taille_json = controler_taille(fig, nom)
+        return fig
 
-def color_alternating_rows(s):
-    return ['background-color: #EEEFF1' if i % 2 == 0 else 'background-color: #FBFBFB' for i in range(len(s))]
+    return calcul(None) if cle is None else cache_simulation.obtenir(cle, calcul, espace=f"figure_{nom}")
 
-def create_line_segments(x, y, color):
-    segments = []
-    for i in range(len(x) - 1):
-        segments.append(go.Scatter(
-            x=x[i:i+2],
-            y=y[i:i+2],
-            mode='lines',
-            line=dict(color=color[i], width=2),
-            showlegend=False,
-            hoverinfo='skip'
-        ))
-    return segments
-
-def graphique_loyers_francais_vs_etrangers(df_investissement): 
-    couleur_francais = '#16425B' 
-    couleur_francais_aire = 'rgba(141, 179, 197, 0.3)' 
-    couleur_etranger = '#CBA325' 
-    couleur_etranger_aire = 'rgba(241, 216, 122, 0.5)'
-    couleur_somme = '#ACADAF'
-    couleur_somme_aire = 'rgba(208, 209, 211, 0.3)'
-
-    # Calculer la différence et sa valeur absolue
-    df_investissement['Différence'] = df_investissement['Loyer Net Français'] - df_investissement['Loyer Net Étranger']
-    df_investissement['Différence_Abs'] = np.abs(df_investissement['Différence'])
-
-    # Calculer les revenus totaux
-    df_investissement['Revenus Totaux'] = df_investissement['Loyer Net Français'] + df_investissement['Loyer Net Étranger']
-
-    fig = go.Figure()
-
-    # Revenus Totaux
-    fig.add_trace(go.Scatter(
-        x=df_investissement['Année'],
-        y=df_investissement['Revenus Totaux'],
-        name='Revenus Totaux',
-        mode='lines',
-        line=dict(color=couleur_somme, width=2, dash='dash'),
-        fill='tozeroy',
-        fillcolor=couleur_somme_aire,
-        hovertemplate='<span style="color:' + couleur_somme + ';">●</span> Revenus Totaux <br>Montant: <b>%{y:.0f} €</b><extra></extra>'
-    ))
-
-    # Loyer Français
-    fig.add_trace(go.Scatter(
-        x=df_investissement['Année'],
-        y=df_investissement['Loyer Net Français'],
-        name='Loyer Français',
-        mode='lines',
-        line=dict(color=couleur_francais, width=3),
-        fill='tozeroy',
-        fillcolor=couleur_francais_aire,
-        hovertemplate='<span style="color:' + couleur_francais + ';">●</span> Loyer Français <br>Montant: <b>%{y:.0f} €</b><extra></extra>'
-    ))
-
-    # Loyer Étranger
-    fig.add_trace(go.Scatter(
-        x=df_investissement['Année'],
-        y=df_investissement['Loyer Net Étranger'],
-        name='Loyer Étranger',
-        mode='lines',
-        line=dict(color=couleur_etranger, width=3),
-        fill='tozeroy',
-        fillcolor=couleur_etranger_aire,
-        hovertemplate='<span style="color:' + couleur_etranger + ';">●</span> Loyer Étranger <br>Montant: <b>%{y:.0f} €</b><extra></extra>'
-    ))
-
-    # Différence (ligne bicolore)
-    for i in range(len(df_investissement) - 1):
-        color = couleur_francais if df_investissement['Différence'].iloc[i] >= 0 else couleur_etranger
-        fig.add_trace(go.Scatter(
-            x=df_investissement['Année'].iloc[i:i+2],
-            y=df_investissement['Différence_Abs'].iloc[i:i+2],
-            mode='lines',
-            line=dict(color=color, width=2),
-            showlegend=False,
-            hoverinfo='skip'
-        ))
-
-    # Mettre à jour les paramètres du graphique
-    fig.update_layout(
-        title=dict(
-            text='',  # Désactiver le titre pour ajouter un titre personnalisé
-        ),
-        xaxis=dict(
-            title="<b>Années</b>",
-            tickmode='linear',
-            dtick=5,
-            ticksuffix=" ",
-            showgrid=False,
-            zeroline=False,
-            showline=True,
-            linewidth=3,
-            linecolor='#CBA325',
-        ),
-        yaxis=dict(
-            title="<b>Montant des Loyers (€)</b>",
-            tickmode='linear',
-            dtick=1000,
-            ticksuffix=" €",
-            tickformat=",",
-            showgrid=True,
-            gridwidth=1,
-            gridcolor='rgba(200,200,200,0.2)',
-            zeroline=False,
-            showline=True,
-            linewidth=3,
-            linecolor='#CBA325',
-        ),
-        font=dict(family="Inter", size=14),
-        height=600,
-        width=1200,
-        margin=dict(t=60, b=60, l=60, r=60),
-        paper_bgcolor='rgba(0,0,0,0)',
-        plot_bgcolor='rgba(0,0,0,0)',
-        legend=dict(
-            orientation="h",
-            yanchor="bottom",
-            y=1.02,
-            xanchor="center",
-            x=0.5,
-            font=dict(size=14),
-        ),
-        hovermode="x unified",
-    )
+def graphique_loyers_francais_vs_etrangers(df_investissement, cle=None):
+    fig = figure_partagee(cle, "loyers", lambda: figure_loyers(df_investissement['Année'], df_investissement['Loyer Net Français'], df_investissement['Loyer Net Étranger']))
 
     # Ajouter le titre en tant qu'élément séparé
     st.markdown("""
@@ -362,143 +231,28 @@ def graphique_loyers_francais_vs_etrangers(df_investissement):
     # Afficher le graphique
     st.plotly_chart(fig, use_container_width=True, config={'displayModeBar': False})
 
-def plot_amortissement(df_amortissement, df_investissement, duree_pret, apport):
-    # Définition des couleurs
-    couleur_capital_restant = '#A33432'
-    couleur_valeur_revente = '#10505B'
-    couleur_effort_annuel = '#D56844'
-    couleur_point_sortie = '#CBA325'
-    couleur_capital_restant_aire = 'rgba(232, 176, 170, 0.3)'
-
-    df_amortissement_annuel = df_amortissement.groupby(df_amortissement.index // 12).last()
-    df_amortissement_annuel.index = np.arange(1, len(df_amortissement_annuel) + 1)
-
-    df_investissement['Effort Net Cumulé'] = df_investissement['Effort Annuel Net'].cumsum()
-
-    # Calcul du point de sortie sans perte (intégration de l'apport)
-    df_investissement['Cout Total'] = df_investissement['Effort Net Cumulé'] + df_amortissement_annuel['Capital Restant'].reindex(df_investissement['Année']).fillna(0)
-    df_investissement['Cout Total'].iloc[0] += apport
-    df_investissement['Difference'] = df_investissement['Valeur de Revente'] - df_investissement['Cout Total']
-    point_sortie = df_investissement[df_investissement['Difference'] >= 0].head(1)
-    annee_sortie = point_sortie['Année'].values[0] if not point_sortie.empty else None
-
-    # Créer la figure pour la période "avant"
-    fig = go.Figure()
-
-    duree_max = duree_pret // 12
-    x_range = np.arange(1, duree_max + 1)
-
-    # Capital Restant
-    fig.add_trace(go.Scatter(
-        x=x_range, 
-        y=df_amortissement_annuel['Capital Restant'][:duree_max], 
-        mode='lines+markers', 
-        name='Capital Restant', 
-        line=dict(color=couleur_capital_restant, width=3), 
-        marker=dict(size=6, color='white', line=dict(color=couleur_capital_restant, width=2)),
-        hovertemplate='<span style="color:' + couleur_capital_restant + ';">●</span> Capital Restant <br>Montant: <b>%{y:.0f} €</b><extra></extra>',
-        fill='tozeroy',
-        fillcolor=couleur_capital_restant_aire
-    ))
-
-    # Valeur de Revente
-    fig.add_trace(go.Scatter(
-        x=x_range, 
-        y=df_investissement['Valeur de Revente'][:duree_max], 
-        mode='lines+markers', 
-        name='Valeur de Revente', 
-        line=dict(dash='dash', color=couleur_valeur_revente, width=3), 
-        marker=dict(size=6, color='white', line=dict(color=couleur_valeur_revente, width=2)),
-        hovertemplate='<span style="color:' + couleur_valeur_revente + ';">●</span> Valeur de Revente <br>Montant: <b>%{y:.0f} €</b><extra></extra>'
-    ))
-
-    # Effort Net Cumulé
-    fig.add_trace(go.Scatter(
-        x=x_range, 
-        y=df_investissement['Effort Net Cumulé'][:duree_max], 
-        mode='lines+markers', 
-        name='Effort Net Cumulé', 
-        line=dict(color=couleur_effort_annuel, width=3), 
-        marker=dict(size=6, color='white', line=dict(color=couleur_effort_annuel, width=2)),
-        hovertemplate='<span style="color:' + couleur_effort_annuel + ';">●</span> Effort Net Cumulé <br>Montant: <b>%{y:.0f} €</b><extra></extra>'
-    ))
-
-    # Ajouter la ligne et le point de sortie s'il y a un point de sortie
-    if annee_sortie:
-        fig.add_shape(
-            type="line",
-            x0=annee_sortie,
-            x1=annee_sortie,
-            y0=0,
-            y1=1,
-            xref='x',
-            yref='paper',
-            line=dict(color=couleur_point_sortie, width=2, dash="dash")
+def plot_amortissement(df_amortissement, df_investissement, duree_pret, apport, comparaisons=None, cle=None):
+    def construire():
+        df_amortissement_annuel = df_amortissement.groupby(df_amortissement.index // 12).last()
+        df_amortissement_annuel.index = np.arange(1, len(df_amortissement_annuel) + 1)
+
+        # Séries locales : le tableau d'investissement, partagé via le cache, n'est pas modifié
+        effort_net_cumule = df_investissement['Effort Annuel Net'].cumsum()
+
+        # Calcul du point de sortie sans perte (intégration de l'apport)
+        annee_sortie = sortie_neutre_scenario(apport, df_amortissement_annuel['Capital Restant'], df_investissement)
+
+        duree_max = duree_pret // 12
+        return figure_amortissement(
+            df_amortissement_annuel['Capital Restant'][:duree_max],
+            df_investissement['Valeur de Revente'][:duree_max],
+            effort_net_cumule[:duree_max],
+            annee_sortie,
+            max(df_amortissement_annuel['Capital Restant'].max(), df_investissement['Valeur de Revente'].max()) + 20000,
+            comparaisons,
         )
 
-        # Ajouter l'annotation pour la ligne verticale
-        fig.add_annotation(
-            x=annee_sortie,
-            y=max(df_amortissement_annuel['Capital Restant'].max(), df_investissement['Valeur de Revente'].max()) + 20000,
-            text="Sortie Neutre",
-            showarrow=False,
-            font=dict(size=12, color=couleur_point_sortie),
-            bgcolor="rgba(251, 251, 251, 0.8)",
-            bordercolor=couleur_point_sortie,
-            borderwidth=1,
-            borderpad=4
-        )
-
-    # Mettre à jour la mise en page
-    fig.update_layout(
-        title=dict(
-            text='',  # Désactiver le titre pour ajouter un titre personnalisé séparé
-        ),
-        xaxis=dict(
-            title="<b>Années</b>",
-            tickmode='linear',
-            dtick=5,
-            ticksuffix=" ",
-            showgrid=False,
-            zeroline=False,
-            showline=True,
-            linewidth=3,
-            linecolor="#CBA325",
-        ),
-        yaxis=dict(
-            title="<b>Montant (€)</b>",
-            tickmode='linear',
-            dtick=20000,
-            ticksuffix=" €",
-            tickformat=",",
-            showgrid=True,
-            gridwidth=1,
-            gridcolor='rgba(200,200,200,0.2)',
-            zeroline=False,
-            showline=True,
-            linewidth=3,
-            linecolor="#CBA325",
-        ),
-        hovermode="x unified",
-        font=dict(family="Inter", size=14),
-        height=600,
-        width=1200,
-        margin=dict(t=60, b=60, l=60, r=60),
-        paper_bgcolor='rgba(0,0,0,0)',
-        plot_bgcolor='rgba(0,0,0,0)',
-        legend=dict(
-            orientation="h",
-            yanchor="bottom",
-            y=1.02,
-            xanchor="center",
-            x=0.5,
-            bgcolor='rgba(0,0,0,0)',
-            traceorder="normal",
-            font=dict(size=14),
-            itemsizing="constant",
-            itemwidth=40,
-        )
-    )
+    fig = figure_partagee(cle, "amortissement", construire)
 
     # Ajouter le titre en tant qu'élément séparé
     st.markdown("""
@@ -521,169 +275,404 @@ def plot_amortissement(df_amortissement, df_investissement, duree_pret, apport):
     st.plotly_chart(fig, use_container_width=True, config={'displayModeBar': False})
 
 
-def main():    
-    params = input_simulateur()
-    df_amortissement, capital_restant_annuel = tab_amortissement(params)
-    df_investissement = tab_investissement(params, df_amortissement)
+def revente_anticipee(params, df_amortissement, df_investissement):
+    with st.expander("🏁 Revente anticipée, mois par mois"):
+        index = IndexSortie.depuis_simulation(params, df_amortissement, df_investissement)
+        mois_sortie = index.premier_mois()[0]
+        st.caption(f"Sortie sans perte dès le mois {mois_sortie:.0f} (année {int(-(-mois_sortie // 12))})." if np.isfinite(mois_sortie)
+                   else "La revente ne couvre jamais l'apport, les efforts cumulés et le capital restant dû sur 50 ans.")
+        mois = st.slider("Revente au mois", 1, index.nb_mois, min(int(params["duree_pret"]), index.nb_mois))
+        detail = index.detail(mois)
+        euros = lambda valeur: f"{round(valeur):,}€".replace(",", " ")
+        col1, col2, col3, col4 = st.columns(4)
+        col1.metric("Valeur de revente", euros(detail['Valeur de Revente']))
+        col2.metric("Capital restant dû", euros(detail['Capital Restant']), help="Remboursé par anticipation à la revente.")
+        col3.metric("Effort net cumulé", euros(detail['Effort Net Cumulé']))
+        col4.metric("Position nette", euros(detail['Position Nette']), help="Revente moins capital restant dû, apport et efforts nets cumulés.")
 
-    duree_pret = int(params["duree_pret"])
 
-    onglet1, onglet2, onglet3 = st.tabs(["Vue d'ensemble", "Tableau d'amortissement", "Tableau d'investissement"])
-    
-    with onglet1:            
-        col1, col2, col3, col4 = st.columns(4)
+def graphique_monte_carlo(bandes):
+    fig = figure_monte_carlo(bandes)
+    controler_taille(fig, "monte_carlo")
+
+    st.markdown("""
+    <h2 style='
+        text-align: center; 
+        color: #16425B; 
+        font-size: 20px; 
+        font-weight: 700; 
+        margin-top: 30px; 
+        margin-bottom: 0px; 
+        background-color: rgba(251, 251, 251, 1); 
+        padding: 20px 15px; 
+        border-radius: 15px;
+        box-shadow: 0 4px 8px rgba(0, 0, 0, 0.6);
+        '> Scénarios aléatoires (Monte Carlo)
+    </h2>
+    """, unsafe_allow_html=True)
+
+    st.plotly_chart(fig, use_container_width=True, config={'displayModeBar': False})
+    st.caption(f"Probabilité d'atteindre une sortie neutre sous 50 ans : {bandes['Probabilité Sortie Neutre']:.0%}")
 
-        # Calcul pour St.Metric
-        effort_net_total = sum(df_investissement["Effort Annuel Net"][:params["duree_pret"] // 12])+ (params["apport"])
-        loyer_apres_pret = params["montant_investissement"] * params["rendement_souhaite"] * (1 + params["taux_revalorisation"])**(params["duree_pret"] // 12)
-        rendement_brut = (loyer_apres_pret / effort_net_total) * 100
-        revenu_mensuel = loyer_apres_pret / 12
-        effort_mensuel_moyen = sum(df_investissement["Effort Mensuel Net"][:params["duree_pret"] // 12]) / (params["duree_pret"] // 12)
-        impot_apres_pret = loyer_apres_pret * (params["taux_imposition"] + 0.172)
-        loyer_net_apres_pret = loyer_apres_pret - impot_apres_pret
-        rendement_net = (loyer_net_apres_pret / effort_net_total) * 100
 
-        
-        with col1:
-            st.metric("Revenu Mensuel", f"{revenu_mensuel:.0f}€", help='Revenus perçus à la fin de votre investissment. Il devrait augmenter avec le temps.')
+def onglet_objectif(params):
+    cibles = {
+        "Effort mensuel moyen (€)": ("effort_mensuel_moyen", 200.0),
+        "Rentabilité nette (%)": ("rendement_net", 5.0),
+        "Année de sortie neutre": ("annee_sortie_neutre", 15.0),
+        "TRI (%)": ("tri", 4.0),
+    }
+    variables = {
+        "Apport (€)": ("apport", lambda valeur: f"{valeur:,.0f} €"),
+        "Durée prêt (mois)": ("duree_pret", lambda valeur: f"{valeur:.0f} mois"),
+        "Taux intérêt (%)": ("taux_interet", lambda valeur: f"{valeur * 100:.2f} %"),
+        "Rendement locatif (%)": ("rendement_souhaite", lambda valeur: f"{valeur * 100:.2f} %"),
+    }
 
+    with st.form("objectif"):
+        libelle_cible = st.selectbox("🎯 Indicateur visé", list(cibles))
+        valeur_cible = st.number_input("Valeur visée", value=cibles[libelle_cible][1], step=1.0)
+        libelle_variable = st.selectbox("🔧 Paramètre à ajuster", list(variables))
+        if not st.form_submit_button("Calculer"):
+            return
+
+    cible, _ = cibles[libelle_cible]
+    variable, formater = variables[libelle_variable]
+    try:
+        solution = chercher_parametre(params, cible, valeur_cible, variable)
+    except ValueError as erreur:
+        st.warning(str(erreur))
+        return
+    st.success(f"{libelle_variable} : **{formater(solution['valeur'])}** (résultat obtenu : {solution['resultat']:.2f}, "
+               f"{solution['appels_moteur']} appels au moteur)")
+
+
+def onglet_optimisation(params):
+    objectifs = {"Rentabilité nette (%)": "rendement_net", "TRI (%)": "tri"}
+
+    with st.form("optimisation"):
+        st.markdown("**🏦 Meilleur financement** : différé, durée du prêt, apport et frais inclus, les autres paramètres restant ceux de la barre latérale.")
+        libelle_objectif = st.selectbox("Indicateur à maximiser", list(objectifs))
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            effort_max = st.number_input("Effort mensuel max (€)", 0, 10000, 300, 25)
         with col2:
-             st.metric("Effort Mensuel", f"{effort_mensuel_moyen:.0f}€", help='Apport non inclus dans le calcul. Effort net moyen pendant votre investissement, donc fiscalité incluse.')
-                
+            apport_max = st.number_input("Apport max (€)", 0, int(params["montant_investissement"]), min(20000, int(params["montant_investissement"])), 1000)
         with col3:
-            st.metric("Rentabilité Brut", f"{rendement_brut:.2f}%", help='Avec 0 fiscalité')
-
-        with col4:
-            st.metric("Rentabilité Nette", f"{rendement_net:.2f}%", help='Rentabilité de votre investissement : ce que vous percevez au terme / ce que vous avez investi (mensualités et impôts compris)')
-
-        st.markdown(
-                    """
-                    <style>
-                    .custom-box-disclaimer {
-                        background: rgba(232, 176, 170, 0.3);                
-                        color: #A33432;
-                        font-weight: 500;
-                        padding: 20px; 
-                        border-radius: 15px;
-                        margin-top: 10px; 
-                        margin-bottom: 20px; 
-                        box-shadow: 0 4px 8px rgba(232, 176, 170, 0.3), 0 6px 20px rgba(232, 176, 170, 0.15);
-                        border: 2px solid #A33432;
-                    }
-                    </style>
-                    <div class="custom-box-disclaimer">
-                        <strong>Ce simulateur ne constitue pas un conseil en investissement.</strong> Le nerf de la guerre reste la sélection de vos SCPI ; ce sont elles qui détermineront le succès de votre investissement. Pour obtenir plus d'informations, recueillir un avis sur votre sélection ou votre situation vous pouvez me contacter.
-                    """,
-                    unsafe_allow_html=True
+            sortie_max = st.number_input("Sortie neutre au plus tard (année)", 1, 50, 20, 1)
+        if not st.form_submit_button("Optimiser"):
+            return
+
+    options = {"objectif": objectifs[libelle_objectif], "effort_max": effort_max, "apport_max": apport_max, "sortie_max": sortie_max}
+    resultat = cache_simulation.obtenir({**params, **options}, lambda _: optimiser_financement(params, **options), espace="optimisation")
+    if resultat["classement"].empty:
+        st.warning("Aucun financement ne respecte ces contraintes.")
+        return
+    st.dataframe(
+        resultat["classement"][["type_differe", "duree_differe", "duree_pret", "frais_inclus", "apport", "Effort Mensuel Moyen", "Rentabilité Nette", "TRI", "Année Sortie Neutre"]],
+        use_container_width=True,
+        hide_index=True,
+        column_config={
+            "type_differe": "Différé",
+            "duree_differe": "Durée différé (mois)",
+            "duree_pret": "Durée prêt (mois)",
+            "frais_inclus": "Frais inclus",
+            "apport": st.column_config.NumberColumn("Apport (€)", format="localized"),
+            "Effort Mensuel Moyen": st.column_config.NumberColumn("Effort mensuel (€)", format="%.0f"),
+            "Rentabilité Nette": st.column_config.NumberColumn("Rentabilité nette (%)", format="%.2f"),
+            "TRI": st.column_config.NumberColumn("TRI (%)", format="%.2f"),
+            "Année Sortie Neutre": st.column_config.NumberColumn("Sortie neutre (année)", format="%.0f"),
+        },
+    )
+    st.caption(f"{resultat['scenarios_evalues']:,} scénarios simulés sur {resultat['combinaisons']:,} combinaisons possibles".replace(",", " "))
+
+
+def onglet_sensibilite(params):
+    variables = {
+        "Taux intérêt (%)": ("taux_interet", 100),
+        "Durée prêt (mois)": ("duree_pret", 1),
+        "Taux assurance (%)": ("taux_assurance", 100),
+        "Apport (€)": ("apport", 1),
+        "Rendement locatif (%)": ("rendement_souhaite", 100),
+        "Délai de jouissance (mois)": ("delai_jouissance", 1),
+        "Taux de revalorisation (%)": ("taux_revalorisation", 100),
+        "Frais de souscription (%)": ("frais_souscription", 100),
+        "Taux d'imposition (TMI)": ("taux_imposition", 100),
+        "% SCPI étrangère": ("pourcentage_etranger", 1),
+    }
+    indicateurs_affiches = {
+        "Rentabilité nette (%)": "Rentabilité Nette",
+        "Effort mensuel moyen (€)": "Effort Mensuel Moyen",
+        "Rentabilité brute (%)": "Rentabilité Brut",
+        "Année de sortie neutre": "Année Sortie Neutre",
+        "TRI (%)": "TRI",
+    }
+
+    col1, col2 = st.columns(2)
+    with col1:
+        libelle_x = st.selectbox("Axe horizontal", list(variables), index=0)
+    with col2:
+        libelle_y = st.selectbox("Axe vertical", [libelle for libelle in variables if libelle != libelle_x], index=0)
+    col1, col2 = st.columns(2)
+    with col1:
+        nb_points = st.slider("Résolution de la grille", 10, 200, 50, 10)
+    with col2:
+        libelle_indicateur = st.selectbox("Indicateur affiché", list(indicateurs_affiches))
+
+    variable_x, echelle_x = variables[libelle_x]
+    variable_y, echelle_y = variables[libelle_y]
+    # Toute la grille en un calcul par lot, mise en cache par définition de grille
+    grille = cache_simulation.obtenir(
+        {**params, "sensibilite": [variable_x, variable_y, nb_points]},
+        lambda _: grille_sensibilite(params, variable_x, variable_y, nb_points),
+        espace="sensibilite",
+    )
+
+    fig = figure_partagee(
+        {**params, "sensibilite": [variable_x, variable_y, nb_points, libelle_indicateur]},
+        "sensibilite",
+        lambda: figure_sensibilite(
+            grille["x"] * echelle_x,
+            grille["y"] * echelle_y,
+            grille[indicateurs_affiches[libelle_indicateur]],
+            libelle_x,
+            libelle_y,
+            libelle_indicateur,
+        ),
+    )
+    st.plotly_chart(fig, use_container_width=True, config={'displayModeBar': False})
+
+
+def input_comparaison(params):
+    with st.sidebar:
+        with st.expander("⚖️ Comparaison de scénarios"):
+            scenarios = st.session_state.setdefault("scenarios", {})
+            st.caption("Enregistrez les paramètres actuels sous un nom, puis modifiez-les : les scénarios enregistrés sont superposés au graphique et comparés dans la vue d'ensemble.")
+            nom = st.text_input("Nom du scénario", value=f"Scénario {len(scenarios) + 1}")
+            if st.button("Enregistrer les paramètres actuels", disabled=not nom.strip()):
+                scenarios[nom.strip()] = params
+            if not scenarios:
+                return {}
+            compares = st.multiselect("Scénarios comparés", list(scenarios), default=list(scenarios))
+            if st.button("Supprimer tous les scénarios"):
+                scenarios.clear()
+                return {}
+            return {nom: scenarios[nom] for nom in compares}
+
+
+def tableau_comparaison(metriques, comparaisons):
+    lignes = {"Paramètres actuels": metriques, **comparaisons}
+    return pd.DataFrame({
+        "Revenu Mensuel (€)": [synthese["revenu_mensuel"] for synthese in lignes.values()],
+        "Effort Mensuel (€)": [synthese["effort_mensuel_moyen"] for synthese in lignes.values()],
+        "Rentabilité Brut (%)": [synthese["rendement_brut"] for synthese in lignes.values()],
+        "Rentabilité Nette (%)": [synthese["rendement_net"] for synthese in lignes.values()],
+        "TRI (%)": [synthese["tri"] for synthese in lignes.values()],
+        "Sortie sans perte (année)": [synthese["annee_sortie_neutre"] for synthese in lignes.values()],
+    }, index=pd.Index(list(lignes), name="Scénario"))
+
+
+def simulateur():
+    with etape("input_simulateur"):
+        params = input_simulateur()
+    portefeuille = input_portefeuille()
+    options_monte_carlo = input_monte_carlo()
+    # Paramètres complets du scénario affiché : clé de cache et valeur enregistrée pour la comparaison
+    scenario = params if portefeuille is None else {**params, "portefeuille": portefeuille}
+    scenarios_compares = input_comparaison(scenario)
+
+    # Résultats partagés entre sessions, en lecture seule : les séries dérivées sont calculées à part
+    with etape("simulation"):
+        # Scénario précalculé dans l'entrepôt (SCPI_ENTREPOT) : lu sur disque sans copie ni recalcul
+        stocke = entrepot_partage(CHEMIN_ENTREPOT).simulation(params) if CHEMIN_ENTREPOT and portefeuille is None else None
+        if stocke is not None:
+            resultats = stocke
+        elif portefeuille is None:
+            # Chaque étape est déjà dans le cache partagé (graphe.calculer) : pas de seconde copie du résultat
+            resultats = simulation(params)
+        else:
+            resultats = cache_simulation.obtenir(scenario, lambda _: simulation_portefeuille(params, portefeuille), espace="portefeuille")
+        df_amortissement, capital_restant_annuel, df_investissement = resultats
+
+    # Scénarios enregistrés : paramètres figés, synthèses relues du cache d'un rerun à l'autre
+    with etape("comparaison"):
+        comparaisons = {nom: cache_simulation.obtenir(enregistre, synthese, espace="synthese") for nom, enregistre in scenarios_compares.items()}
+
+    duree_pret = int(params["duree_pret"])
+
+    # Calcul pour St.Metric
+    metriques = indicateurs(params, df_investissement, loyer_apres_pret_portefeuille(params, portefeuille) if portefeuille else None)
+    revenu_mensuel = metriques["revenu_mensuel"]
+    effort_mensuel_moyen = metriques["effort_mensuel_moyen"]
+    rendement_brut = metriques["rendement_brut"]
+    rendement_net = metriques["rendement_net"]
+
+    # Seul l'onglet ouvert est rendu ; changer d'onglet relance le script
+    onglet1, onglet2, onglet3, onglet4, onglet5 = st.tabs(["Vue d'ensemble", "Tableau d'amortissement", "Tableau d'investissement", "Objectif", "Sensibilité"], key="onglet", on_change="rerun")
+    
+    with onglet1:
+        if onglet1.open:
+            col1, col2, col3, col4 = st.columns(4)
+
+            with col1:
+                st.metric("Revenu Mensuel", f"{revenu_mensuel:.0f}€", help='Revenus perçus à la fin de votre investissment. Il devrait augmenter avec le temps.')
+
+            with col2:
+                 st.metric("Effort Mensuel", f"{effort_mensuel_moyen:.0f}€", help='Apport non inclus dans le calcul. Effort net moyen pendant votre investissement, donc fiscalité incluse.')
+                
+            with col3:
+                st.metric("Rentabilité Brut", f"{rendement_brut:.2f}%", help='Avec 0 fiscalité')
+
+            with col4:
+                st.metric("Rentabilité Nette", f"{rendement_net:.2f}%", help='Rentabilité de votre investissement : ce que vous percevez au terme / ce que vous avez investi (mensualités et impôts compris)')
+
+            col5, col6 = st.columns(2)
+            tri = tri_scenario(params, capital_restant_annuel, df_investissement)
+            annee_sortie = sortie_neutre_scenario(params['apport'], capital_restant_annuel, df_investissement)
+
+            with col5:
+                st.metric("TRI", f"{tri:.2f}%" if np.isfinite(tri) else "—", help="Taux de rendement interne des flux : apport, efforts nets annuels puis revente à la fin du prêt, capital restant dû remboursé.")
+
+            with col6:
+                st.metric("Sortie sans perte", f"Année {annee_sortie}" if annee_sortie else "—", help="Première année où la revente couvre l'apport, les efforts cumulés et le capital restant dû.")
+
+            if comparaisons:
+                st.dataframe(
+                    tableau_comparaison({**metriques, "tri": tri, "annee_sortie_neutre": annee_sortie}, comparaisons),
+                    use_container_width=True,
+                    column_config={
+                        **colonnes_montants(["Revenu Mensuel (€)", "Effort Mensuel (€)"]),
+                        **{colonne: st.column_config.NumberColumn(format="%.2f") for colonne in ["Rentabilité Brut (%)", "Rentabilité Nette (%)", "TRI (%)"]},
+                    },
                 )
 
+            st.markdown(
+                        """
+                        <style>
+                        .custom-box-disclaimer {
+                            background: rgba(232, 176, 170, 0.3);                
+                            color: #A33432;
+                            font-weight: 500;
+                            padding: 20px; 
+                            border-radius: 15px;
+                            margin-top: 10px; 
+                            margin-bottom: 20px; 
+                            box-shadow: 0 4px 8px rgba(232, 176, 170, 0.3), 0 6px 20px rgba(232, 176, 170, 0.15);
+                            border: 2px solid #A33432;
+                        }
+                        </style>
+                        <div class="custom-box-disclaimer">
+                            <strong>Ce simulateur ne constitue pas un conseil en investissement.</strong> Le nerf de la guerre reste la sélection de vos SCPI ; ce sont elles qui détermineront le succès de votre investissement. Pour obtenir plus d'informations, recueillir un avis sur votre sélection ou votre situation vous pouvez me contacter.
+                        """,
+                        unsafe_allow_html=True
+                    )
+
         
-        plot_amortissement(df_amortissement, df_investissement, duree_pret, params['apport'])
-        st.markdown(
-                    """
-                    <style>
-                    .custom-box {
-                        background: rgba(251, 233, 186, 0.4);                
-                        color: #DF9F46;
-                        font-weight: 500;
-                        padding: 20px; 
-                        border-radius: 15px;
-                        margin-top: -5px; 
-                        margin-bottom: 50px; 
-                        box-shadow: 0 4px 10px rgba(251, 233, 186, 0.6);
-                    }
-                    </style>
-                    <div class="custom-box">
-                        L'investissement en SCPI a pour fonction première la <strong>distribution de revenus complémentaires</strong> à une échéance donnée. <strong>L'objectif n'est pas la revente</strong> à court, moyen ou moyen-long terme.
-                    </div>
-                    """,
-                    unsafe_allow_html=True
-                )
+            with etape("plot_amortissement"):
+                plot_amortissement(df_amortissement, df_investissement, duree_pret, params['apport'], comparaisons, {**scenario, "comparaisons": scenarios_compares})
+            with etape("revente_anticipee"):
+                revente_anticipee(params, df_amortissement, df_investissement)
+            if options_monte_carlo is not None:
+                with etape("monte_carlo"):
+                    bandes = cache_simulation.obtenir({**params, **options_monte_carlo}, lambda _: monte_carlo(params, **options_monte_carlo), espace="monte_carlo")
+                graphique_monte_carlo(bandes)
+            st.markdown(
+                        """
+                        <style>
+                        .custom-box {
+                            background: rgba(251, 233, 186, 0.4);                
+                            color: #DF9F46;
+                            font-weight: 500;
+                            padding: 20px; 
+                            border-radius: 15px;
+                            margin-top: -5px; 
+                            margin-bottom: 50px; 
+                            box-shadow: 0 4px 10px rgba(251, 233, 186, 0.6);
+                        }
+                        </style>
+                        <div class="custom-box">
+                            L'investissement en SCPI a pour fonction première la <strong>distribution de revenus complémentaires</strong> à une échéance donnée. <strong>L'objectif n'est pas la revente</strong> à court, moyen ou moyen-long terme.
+                        </div>
+                        """,
+                        unsafe_allow_html=True
+                    )
         
-        graphique_loyers_francais_vs_etrangers(df_investissement)
-        st.markdown(
-            """
-            <style>
-            .custom-box-revenus {
-                background: rgba(152, 153, 195, 0.3);                
-                color: #383D6D;
-                font-weight: 500;
-                padding: 20px; 
-                border-radius: 15px;
-                margin-top: -5px; 
-                margin-bottom: 50px; 
-                box-shadow: 0 4px 8px rgba(152, 153, 195, 0.3), 0 6px 20px rgba(152, 153, 195, 0.15);
-            }
-            </style>
-            <div class="custom-box-revenus">
-                Ce sont vos <strong>revenus nets de fiscalité.</strong> Les loyers français bénéficient de la déduction des intérêts d'emprunt pendant la période de financement, ce qui explique leur meilleure rentabilité nette initiale. <br>La courbe bi-color illustre quel type de SCPI paie le mieux. <strong>Lorsqu'il n'y a plus ou peu d'intérêts à déduire, la SCPI étrangère offre une rentabilité souvent plus avantageuse.</strong>
-            </div>
-            """,
-            unsafe_allow_html=True
-        )
+            with etape("graphique_loyers_francais_vs_etrangers"):
+                graphique_loyers_francais_vs_etrangers(df_investissement, scenario)
+            st.markdown(
+                """
+                <style>
+                .custom-box-revenus {
+                    background: rgba(152, 153, 195, 0.3);                
+                    color: #383D6D;
+                    font-weight: 500;
+                    padding: 20px; 
+                    border-radius: 15px;
+                    margin-top: -5px; 
+                    margin-bottom: 50px; 
+                    box-shadow: 0 4px 8px rgba(152, 153, 195, 0.3), 0 6px 20px rgba(152, 153, 195, 0.15);
+                }
+                </style>
+                <div class="custom-box-revenus">
+                    Ce sont vos <strong>revenus nets de fiscalité.</strong> Les loyers français bénéficient de la déduction des intérêts d'emprunt pendant la période de financement, ce qui explique leur meilleure rentabilité nette initiale. <br>La courbe bi-color illustre quel type de SCPI paie le mieux. <strong>Lorsqu'il n'y a plus ou peu d'intérêts à déduire, la SCPI étrangère offre une rentabilité souvent plus avantageuse.</strong>
+                </div>
+                """,
+                unsafe_allow_html=True
+            )
         
 
             
     with onglet2:
-        df_amortissement.set_index('Mois', inplace=True)
-
-        styled_df_amortissement = df_amortissement.style.format("{:,.0f}") \
-    .set_properties(**{
-        'color': '#202021',
-    }) \
-    .apply(color_alternating_rows) \
-    .set_table_styles([
-        {'selector': 'th',
-         'props': [('font-weight', 'bold'),
-                   ('background-color', '#284264'),
-                   ('color', 'white')]},
-        # Assurer que la table occupe toute la largeur disponible
-        {'selector': 'table',
-         'props': [('width', '100%'),
-                   ('table-layout', 'fixed')]},
-    ])
-        st.dataframe(styled_df_amortissement, use_container_width=True)  
-
-        # Bouton de téléchargement
-        csv = df_amortissement.to_csv(index=True)  # index=True pour inclure la colonne 'Année'
-        st.download_button(label="Télécharger les résultats (CSV)", 
-                        data=csv, 
-                        file_name="tableau_amortissement.csv", 
-                        mime="text/csv")
+        if onglet2.open:
+            # Vue annuelle par défaut ; le détail mensuel n'est rendu que pour l'année choisie
+            with etape("table_amortissement"):
+                st.dataframe(tab_amortissement_annuel(df_amortissement).round(0), use_container_width=True, column_config=colonnes_montants(COLONNES_AMORTISSEMENT))
+
+            with st.expander("Détail mensuel"):
+                annee_detail = st.selectbox("Année", range(1, -(-duree_pret // 12) + 1), format_func=lambda annee: f"Année {annee}")
+                if annee_detail is not None:
+                    df_detail = df_amortissement.iloc[(annee_detail - 1) * 12:annee_detail * 12].set_index('Mois')
+                    st.dataframe(df_detail.round(0), use_container_width=True, column_config=colonnes_montants(COLONNES_AMORTISSEMENT))
+
+            # Bouton de téléchargement
+            bouton_export(scenario, "amortissement", lambda: df_amortissement, "tableau_amortissement")
              
 
     with onglet3:
-        df_investissement.set_index('Année', inplace=True)
+        if onglet3.open:
+            with etape("table_investissement"):
+                st.dataframe(style_investissement(df_investissement.set_index('Année')), use_container_width=True)
 
-        df_to_display_investissement = df_investissement[['Loyer Brut', 'Impôt Total', 'Effort Annuel Net', 'Effort Mensuel Net', 'Valeur de Revente']]
-        
-        styled_df_investissement = df_to_display_investissement.style.format("{:,.0f}") \
-        .set_properties(**{
-            'color': '#202021',
-        }) \
-        .apply(color_alternating_rows) \
-        .set_table_styles([
-            {'selector': 'th',
-            'props': [('font-weight', 'bold'),
-                    ('background-color', '#284264'),
-                    ('color', 'white')]},
-            # Assurer que la table occupe toute la largeur disponible
-            {'selector': 'table',
-            'props': [('width', '100%'),
-                    ('table-layout', 'fixed')]},
-        ]) \
+            # Bouton de téléchargement, avec les séries dérivées des graphiques (cumuls, coût de sortie, écarts)
+            bouton_export(scenario, "investissement", lambda: Resultats.depuis_tableau(df_investissement, capital_restant_annuel, params['apport']).dataframe(derivees=True), "resultats_simulation_scpi")
+    
+    with onglet4:
+        if onglet4.open:
+            onglet_objectif(params)
+            onglet_optimisation(params)
 
-        st.dataframe(styled_df_investissement, use_container_width=True)
+    with onglet5:
+        if onglet5.open:
+            onglet_sensibilite(params)
 
-        # Bouton de téléchargement
-        csv = df_investissement.to_csv(index=True)  # index=True pour inclure la colonne 'Année'
-        st.download_button(label="Télécharger les résultats (CSV)", 
-                        data=csv, 
-                        file_name="resultats_simulation_scpi.csv", 
-                        mime="text/csv") # Comment changer le fichier de téléchargement ?
-    
     if rendement_net > 10:
         st.balloons()
 
+def panneau_performance(mesures):
+    with st.sidebar:
+        st.checkbox("⏱️ Mesures de performance", key="mesures_performance", help=f"Durée, allocations et cache de chaque étape du rerun, enregistrés aussi dans {FICHIER_TRACES}")
+        if mesures is not None:
+            df_mesures = pd.DataFrame(mesures.etapes).sort_values('debut_ms')
+            df_mesures['etape'] = ["\u2003" * profondeur + nom for nom, profondeur in zip(df_mesures['etape'], df_mesures['profondeur'])]
+            st.dataframe(df_mesures.drop(columns=['parent', 'profondeur', 'debut_ms']).set_index('etape').round(1), use_container_width=True)
+            st.caption(f"Cache : {cache_simulation.statistiques()['taux_succes']:.0%} de succès")
+
+def main():
+    configurer_page()
+    # Mesures activées pour ce rerun si la case du panneau était cochée au précédent
+    with rerun(st.session_state.get("mesures_performance", False)) as mesures:
+        simulateur()
+    panneau_performance(mesures)
+
 if __name__ == "__main__":
     main()
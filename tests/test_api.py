@@ -0,0 +1,24 @@
+"""Service HTTP/JSON, appelé en direct par ``ClientLocal``."""
+import scpi.api
+from scpi.api import ClientLocal
+from scpi.cache import CacheSimulation
+from scpi.moteur import PARAMS_REFERENCE
+
+
+def test_simulation():
+    with ClientLocal(processus=False, travailleurs=1, cache=CacheSimulation()) as client:
+        statut, reponse = client.post("/simulation", {"params": PARAMS_REFERENCE})
+    assert statut == 200
+    assert "erreur" not in reponse
+
+
+def test_erreur_interne(monkeypatch):
+    def echec(liste_params):
+        raise RuntimeError("moteur en échec")
+
+    monkeypatch.setattr(scpi.api, "_resumer", echec)
+    with ClientLocal(processus=False, travailleurs=1, cache=CacheSimulation()) as client:
+        statut, reponse = client.post("/simulation", {"params": PARAMS_REFERENCE})
+        assert client.get("/sante")[0] == 200
+    assert statut == 500
+    assert reponse == {"erreur": "Erreur interne (RuntimeError)"}
@@ -0,0 +1,88 @@
+"""Cache partagé : empreinte des paramètres, espaces de clés et éviction au plafond mémoire."""
+import os
+import subprocess
+import sys
+
+import numpy as np
+
+from scpi.cache import CacheSimulation, cle_params, taille_memoire
+from scpi.moteur import PARAMS_REFERENCE
+
+RACINE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_cle_independante_de_l_ordre_et_du_type():
+    inverse = dict(reversed(list(PARAMS_REFERENCE.items())))
+    flottants = {cle: float(valeur) if type(valeur) is int else valeur for cle, valeur in PARAMS_REFERENCE.items()}
+    numpy = {cle: np.float64(valeur) if type(valeur) is float else valeur for cle, valeur in PARAMS_REFERENCE.items()}
+    assert cle_params(inverse) == cle_params(flottants) == cle_params(numpy) == cle_params(PARAMS_REFERENCE)
+    assert cle_params({**PARAMS_REFERENCE, "apport": 10001}) != cle_params(PARAMS_REFERENCE)
+    assert cle_params(PARAMS_REFERENCE, "export") != cle_params(PARAMS_REFERENCE)
+
+
+def test_obtenir_calcule_une_seule_fois():
+    cache = CacheSimulation()
+    appels = []
+
+    def calcul(params):
+        appels.append(params)
+        return np.arange(3.0)
+
+    premier = cache.obtenir(PARAMS_REFERENCE, calcul)
+    second = cache.obtenir(dict(reversed(list(PARAMS_REFERENCE.items()))), calcul)
+    assert second is premier
+    assert len(appels) == 1
+    assert cache.statistiques() | {"memoire_max": None} == {
+        "succes": 1, "echecs": 1, "taux_succes": 0.5, "entrees": 1, "memoire": 24, "memoire_max": None,
+    }
+
+
+def test_espaces_separes():
+    cache = CacheSimulation()
+    assert cache.obtenir(PARAMS_REFERENCE, lambda _: "a", espace="un") == "a"
+    assert cache.obtenir(PARAMS_REFERENCE, lambda _: "b", espace="deux") == "b"
+    assert cache.obtenir(PARAMS_REFERENCE, lambda _: "c", espace="un") == "a"
+    assert cache.statistiques()["entrees"] == 2
+
+
+def test_consulter_et_deposer():
+    cache = CacheSimulation()
+    cle = cle_params(PARAMS_REFERENCE, "api:resume")
+    assert cache.consulter(cle) is None
+    cache.deposer(cle, {"TRI": 0.05})
+    assert cache.consulter(cle) == {"TRI": 0.05}
+    assert cache.consulter(cle_params(PARAMS_REFERENCE)) is None
+    assert cache.statistiques()["succes"] == 1
+    assert cache.statistiques()["echecs"] == 2
+
+
+def test_eviction_au_plafond():
+    tableau = np.zeros(1000)
+    cache = CacheSimulation(memoire_max=3 * taille_memoire(tableau))
+    for apport in range(3):
+        cache.obtenir({**PARAMS_REFERENCE, "apport": apport}, lambda _: tableau.copy())
+    # Le plus ancien non relu est évincé au quatrième dépôt
+    cache.obtenir({**PARAMS_REFERENCE, "apport": 0}, lambda _: None)
+    cache.obtenir({**PARAMS_REFERENCE, "apport": 3}, lambda _: tableau.copy())
+    assert cache.consulter(cle_params({**PARAMS_REFERENCE, "apport": 1}, "simulation")) is None
+    assert cache.consulter(cle_params({**PARAMS_REFERENCE, "apport": 0}, "simulation")) is not None
+    assert cache.statistiques()["memoire"] <= 3 * taille_memoire(tableau)
+
+    # Plus gros que le plafond : renvoyé mais pas conservé
+    enorme = cache.obtenir({**PARAMS_REFERENCE, "apport": 4}, lambda _: np.zeros(10_000))
+    assert len(enorme) == 10_000
+    assert cache.consulter(cle_params({**PARAMS_REFERENCE, "apport": 4}, "simulation")) is None
+
+
+def test_plafond_par_variable_d_environnement():
+    script = (
+        "import numpy as np\n"
+        "from scpi.cache import cache_simulation, cle_params\n"
+        "assert cache_simulation.statistiques()['memoire_max'] == 1024 ** 2\n"
+        "for i in range(2):\n"
+        "    cache_simulation.obtenir({'i': i}, lambda _: np.zeros(80_000))\n"
+        "assert cache_simulation.consulter(cle_params({'i': 0}, 'simulation')) is None\n"
+        "assert cache_simulation.consulter(cle_params({'i': 1}, 'simulation')) is not None\n"
+    )
+    environnement = {**os.environ, "SCPI_CACHE_MEMOIRE_MO": "1", "PYTHONPATH": RACINE}
+    subprocess.run([sys.executable, "-c", script], check=True, env=environnement, cwd=RACINE)
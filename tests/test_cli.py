@@ -0,0 +1,80 @@
+"""Simulation par lot en ligne de commande : schéma des sorties et reprise après interruption."""
+import os
+
+import pandas as pd
+import pytest
+
+from scpi import cli
+from scpi.lot import INDICATEURS
+from scpi.moteur import PARAMS_REFERENCE
+
+TAILLE_BLOC = 2
+
+
+def profils(chemin, lignes):
+    pd.DataFrame([{**PARAMS_REFERENCE, "id": f"client-{i}", **modifications} for i, modifications in enumerate(lignes)]).to_csv(chemin, index=False)
+    return str(chemin)
+
+
+def lire(sortie):
+    if sortie.endswith(".parquet"):
+        return pd.concat([pd.read_parquet(os.path.join(sortie, partie)) for partie in sorted(os.listdir(sortie))], ignore_index=True)
+    return pd.read_csv(sortie, keep_default_na=False, na_values=[""])
+
+
+@pytest.mark.parametrize("extension", [".csv", ".parquet"])
+def test_bloc_entierement_invalide(tmp_path, extension):
+    # Premier bloc rejeté en entier (durée non multiple de 12), second bloc valide
+    entree = profils(tmp_path / "profils.csv", [{"duree_pret": 7}, {"duree_pret": 7}, {}, {"apport": 20000}])
+    sortie = str(tmp_path / f"resultats{extension}")
+    assert cli.executer(entree, sortie, travailleurs=1, taille_bloc=TAILLE_BLOC, progression=None) == 4
+
+    resultats = lire(sortie)
+    assert list(resultats.columns) == ["ligne", "id", *INDICATEURS, "erreur"]
+    assert resultats["ligne"].tolist() == [0, 1, 2, 3]
+    assert resultats["ligne"].dtype.kind == "i"
+    assert resultats.loc[:1, list(INDICATEURS)].isna().all().all()
+    assert resultats.loc[2:, "Revenu Mensuel"].notna().all()
+    assert (resultats.loc[:1, "erreur"] != "").all()
+
+
+@pytest.mark.parametrize("extension", [".csv", ".parquet"])
+def test_reprise_sans_doublon(tmp_path, monkeypatch, extension):
+    entree = profils(tmp_path / "profils.csv", [{"apport": 1000 * i} for i in range(7)])
+    attendu = lire_complet(tmp_path, entree, extension)
+
+    # Interruption après le deuxième bloc écrit, avec des restes d'écriture après le point de reprise
+    ecrire = cli.Sortie.ecrire
+
+    def ecrire_puis_interrompre(self, resultats):
+        if self.etat["blocs"] == 2:
+            if self.parquet:
+                open(os.path.join(self.chemin, "part-000002.parquet"), "wb").close()
+            else:
+                with open(self.chemin, "ab") as f:
+                    f.write(b"ligne incomplete")
+            raise KeyboardInterrupt
+        ecrire(self, resultats)
+
+    sortie = str(tmp_path / f"resultats{extension}")
+    monkeypatch.setattr(cli.Sortie, "ecrire", ecrire_puis_interrompre)
+    with pytest.raises(KeyboardInterrupt):
+        cli.executer(entree, sortie, travailleurs=1, taille_bloc=TAILLE_BLOC, progression=None)
+    assert os.path.exists(sortie + cli.SUFFIXE_REPRISE)
+
+    monkeypatch.setattr(cli.Sortie, "ecrire", ecrire)
+    assert cli.executer(entree, sortie, travailleurs=1, taille_bloc=TAILLE_BLOC, progression=None) == 7
+    assert not os.path.exists(sortie + cli.SUFFIXE_REPRISE)
+    pd.testing.assert_frame_equal(lire(sortie), attendu)
+
+
+def lire_complet(tmp_path, entree, extension):
+    sortie = str(tmp_path / f"reference{extension}")
+    cli.executer(entree, sortie, travailleurs=1, taille_bloc=TAILLE_BLOC, progression=None)
+    return lire(sortie)
+
+
+def test_indicateurs_du_moteur():
+    from scpi.lot import simuler_lot
+
+    assert tuple(simuler_lot(PARAMS_REFERENCE)["indicateurs"]) == INDICATEURS
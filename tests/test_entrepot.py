@@ -0,0 +1,39 @@
+"""Entrepôt sur disque : écriture, relecture et partage entre sessions."""
+import numpy as np
+import pandas as pd
+
+from scpi.entrepot import Entrepot, entrepot_partage, main
+from scpi.moteur import PARAMS_REFERENCE
+
+
+def balayage(taux):
+    return pd.DataFrame([{**PARAMS_REFERENCE, "taux_interet": t} for t in taux])
+
+
+def test_precision_par_defaut(tmp_path):
+    Entrepot(tmp_path / "bibliotheque").ajouter(balayage([0.03]))
+    fichier = tmp_path / "balayage.csv"
+    balayage([0.03]).to_csv(fichier, index=False)
+    main([str(fichier), str(tmp_path / "cli")])
+    assert Entrepot(tmp_path / "bibliotheque").dtype == Entrepot(tmp_path / "cli").dtype == np.float64
+
+
+def test_simulation_stockee(tmp_path):
+    entrepot = Entrepot(tmp_path)
+    entrepot.ajouter(balayage([0.03, 0.04]))
+    _, _, df_investissement = Entrepot(tmp_path).simulation({**PARAMS_REFERENCE, "taux_interet": 0.04})
+    from scpi.moteur import simulation
+
+    np.testing.assert_allclose(df_investissement["Effort Annuel Net"], simulation({**PARAMS_REFERENCE, "taux_interet": 0.04})[2]["Effort Annuel Net"])
+    assert Entrepot(tmp_path).simulation({**PARAMS_REFERENCE, "taux_interet": 0.05}) is None
+
+
+def test_entrepot_partage_voit_les_ajouts(tmp_path):
+    Entrepot(tmp_path).ajouter(balayage([0.03]))
+    partage = entrepot_partage(tmp_path)
+    assert entrepot_partage(tmp_path) is partage
+    assert partage.ligne({**PARAMS_REFERENCE, "taux_interet": 0.04}) is None
+
+    # Ajout par un autre écrivain, comme la CLI
+    Entrepot(tmp_path).ajouter(balayage([0.04]))
+    assert entrepot_partage(tmp_path).ligne({**PARAMS_REFERENCE, "taux_interet": 0.04}) == 1
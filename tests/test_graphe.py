@@ -0,0 +1,46 @@
+"""Recalcul incrémental : seules les étapes en aval d'un paramètre modifié sont réévaluées."""
+import collections
+
+import pandas as pd
+import pytest
+
+from scpi import graphe
+from scpi.cache import cache_simulation
+from scpi.moteur import PARAMS_REFERENCE, simulation, tab_amortissement, tab_investissement
+
+
+@pytest.fixture
+def appels(monkeypatch):
+    compteur = collections.Counter()
+    for nom, calcul in graphe.CALCULS.items():
+        def compter(*arguments, nom=nom, calcul=calcul):
+            compteur[nom] += 1
+            return calcul(*arguments)
+        monkeypatch.setitem(graphe.CALCULS, nom, compter)
+    cache_simulation.vider()
+    yield compteur
+    cache_simulation.vider()
+
+
+def test_changement_de_fiscalite(appels):
+    simulation(PARAMS_REFERENCE)
+    assert set(appels) == set(graphe.ETAPES)
+    assert all(nombre == 1 for nombre in appels.values())
+
+    appels.clear()
+    params = {**PARAMS_REFERENCE, "taux_imposition": 0.41}
+    df_amortissement, capital_restant_annuel, df_investissement = simulation(params)
+    assert set(appels) == {"fiscalite", "tab_investissement"} == set(graphe.etapes_impactees(["taux_imposition"]))
+
+    # Identique à un calcul à froid, sans cache
+    reference_amortissement, reference_capital = tab_amortissement(params)
+    pd.testing.assert_frame_equal(df_amortissement, reference_amortissement)
+    pd.testing.assert_series_equal(capital_restant_annuel, reference_capital)
+    pd.testing.assert_frame_equal(df_investissement, tab_investissement(params, reference_amortissement))
+
+
+def test_scenario_deja_calcule(appels):
+    simulation(PARAMS_REFERENCE)
+    appels.clear()
+    simulation(dict(reversed(list(PARAMS_REFERENCE.items()))))
+    assert not appels
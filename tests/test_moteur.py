@@ -0,0 +1,148 @@
+"""Moteur vectorisé comparé aux boucles de référence, mois par mois et année par année."""
+import itertools
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from scpi.lot import PRELEVEMENTS_SOCIAUX, TYPES_DIFFERE
+from scpi.moteur import COLONNES_AMORTISSEMENT, PARAMS_REFERENCE, tab_amortissement, tab_amortissement_annuel, tab_amortissement_reference, tab_investissement
+
+TOLERANCE = 1e-6
+DUREES_PRET = (0, 12, 13, 360)
+NB_ALEATOIRES = 200
+
+
+
+def tab_investissement_reference(params, df_amortissement):
+    # Boucle année par année d'origine du simulateur
+    resultats = []
+    deductible_cumule = 0
+    for annee in range(1, 51):
+        if annee == 1:
+            loyer_brut = params["montant_investissement"] * params["rendement_souhaite"] * (12 - params["delai_jouissance"]) / 12
+        else:
+            loyer_brut = params["montant_investissement"] * params["rendement_souhaite"] * (1 + params["taux_revalorisation"])**(annee - 1)
+        loyer_francais = loyer_brut * (1 - params["pourcentage_etranger"] / 100)
+        loyer_etranger = loyer_brut * (params["pourcentage_etranger"] / 100)
+
+        if annee <= params["duree_pret"] // 12:
+            mois = slice((annee - 1) * 12, annee * 12)
+            effort_annuel = df_amortissement["Mensualité avec assurance"][mois].sum() - loyer_brut
+            if annee == 1 and not params["frais_inclus"]:
+                effort_annuel += params["frais_courtage"]
+            if annee == 1:
+                debut_interets = params["duree_differe"] if params["type_differe"] == "Différé total" else 0
+                montant_deductible = df_amortissement["Assurance"][:12].sum() + df_amortissement["Intérêts"][debut_interets:12].sum() + params["frais_courtage"]
+            else:
+                montant_deductible = df_amortissement["Intérêts"][mois].sum() + df_amortissement["Assurance"][mois].sum()
+        else:
+            effort_annuel = -loyer_brut
+            montant_deductible = 0
+
+        imposable_francais = loyer_francais - montant_deductible * (1 - params["pourcentage_etranger"] / 100)
+        if imposable_francais < 0:
+            deductible_cumule += abs(imposable_francais)
+            impot_francais = 0
+        elif deductible_cumule >= imposable_francais:
+            deductible_cumule -= imposable_francais
+            impot_francais = 0
+        else:
+            impot_francais = (imposable_francais - deductible_cumule) * (params["taux_imposition"] + PRELEVEMENTS_SOCIAUX)
+            deductible_cumule = 0
+        impot_etranger = loyer_etranger * max(params["taux_imposition"], 0.20)
+        impot_total = impot_francais + impot_etranger
+
+        effort_net = effort_annuel + impot_total
+        resultats.append({
+            "Année": annee,
+            "Loyer Brut": loyer_brut,
+            "Loyer Français": loyer_francais,
+            "Loyer Étranger": loyer_etranger,
+            "Effort Annuel": effort_annuel,
+            "Montant Déductible": montant_deductible,
+            "Imposable Français": imposable_francais,
+            "Imposable Étranger": loyer_etranger,
+            "Impôt Français": impot_francais,
+            "Impôt Étranger": impot_etranger,
+            "Impôt Total": impot_total,
+            "Report Déductible": deductible_cumule,
+            "Effort Annuel Net": effort_net,
+            "Effort Mensuel Net": effort_net / 12,
+            "Valeur de Revente": params["montant_investissement"] * (1 - params["frais_souscription"]) * (1 + params["taux_revalorisation"])**annee,
+            "Loyer Net Français": loyer_francais - impot_francais,
+            "Loyer Net Étranger": loyer_etranger - impot_etranger,
+        })
+    return pd.DataFrame(resultats)
+
+
+def scenarios_limites():
+    # Trois modes de différé × prêts de 0, 12, 13 et 360 mois
+    for type_differe, duree_pret in itertools.product(TYPES_DIFFERE, DUREES_PRET):
+        yield {**PARAMS_REFERENCE, "type_differe": type_differe, "duree_pret": duree_pret,
+               "duree_differe": 0 if type_differe == TYPES_DIFFERE[0] else min(6, max(duree_pret - 1, 0))}
+
+
+def scenarios_aleatoires(nombre=NB_ALEATOIRES, graine=0):
+    alea = np.random.default_rng(graine)
+    for _ in range(nombre):
+        montant = float(alea.integers(10, 500) * 1000)
+        duree_pret = int(alea.integers(0, 31) * 12)
+        type_differe = TYPES_DIFFERE[alea.integers(len(TYPES_DIFFERE))]
+        yield {
+            **PARAMS_REFERENCE,
+            "montant_investissement": montant,
+            "apport": float(alea.uniform(0, montant / 2)),
+            "duree_pret": duree_pret,
+            "taux_interet": float(alea.uniform(0, 0.10)),
+            "taux_assurance": float(alea.uniform(0, 0.01)),
+            "type_differe": type_differe,
+            "duree_differe": 0 if type_differe == TYPES_DIFFERE[0] or duree_pret == 0 else int(alea.integers(0, min(13, duree_pret))),
+            "frais_courtage": float(alea.integers(0, 10_001)),
+            "frais_inclus": bool(alea.integers(2)),
+            "rendement_souhaite": float(alea.uniform(0.01, 0.10)),
+            "delai_jouissance": int(alea.integers(0, 13)),
+            "taux_revalorisation": float(alea.uniform(0, 0.05)),
+            "frais_souscription": float(alea.uniform(0, 0.20)),
+            "taux_imposition": float(alea.choice([0.0, 0.11, 0.30, 0.41, 0.45])),
+            "pourcentage_etranger": int(alea.integers(0, 101)),
+        }
+
+
+SCENARIOS = [*scenarios_limites(), *scenarios_aleatoires()]
+
+
+def identifiant(params):
+    return f"{params['type_differe']}-{params['duree_pret']}m-{params['duree_differe']}d"
+
+
+@pytest.fixture(params=SCENARIOS, ids=identifiant)
+def params(request):
+    return request.param
+
+
+def test_tab_amortissement(params):
+    df_amortissement, capital_restant_annuel = tab_amortissement(params)
+    reference, capital_reference = tab_amortissement_reference(params)
+    assert len(df_amortissement) == len(reference) == params["duree_pret"]
+    np.testing.assert_array_equal(df_amortissement["Mois"], reference["Mois"])
+    for colonne in COLONNES_AMORTISSEMENT:
+        np.testing.assert_allclose(df_amortissement[colonne].to_numpy(dtype=float), reference[colonne].to_numpy(dtype=float), rtol=0, atol=TOLERANCE, err_msg=colonne)
+    np.testing.assert_allclose(np.asarray(capital_restant_annuel, dtype=float), np.asarray(capital_reference, dtype=float), rtol=0, atol=TOLERANCE)
+
+
+def test_tab_amortissement_annuel(params):
+    reference, _ = tab_amortissement_reference(params)
+    annuel = tab_amortissement_annuel(tab_amortissement(params)[0])
+    attendu = reference.groupby(reference.index // 12)[list(COLONNES_AMORTISSEMENT)].sum()
+    attendu["Capital Restant"] = reference.groupby(reference.index // 12)["Capital Restant"].last()
+    assert list(annuel.index) == list(range(1, len(attendu) + 1))
+    np.testing.assert_allclose(annuel.to_numpy(dtype=float), attendu.to_numpy(dtype=float).reshape(annuel.shape), rtol=0, atol=TOLERANCE)
+
+
+def test_tab_investissement(params):
+    df_investissement = tab_investissement(params, tab_amortissement(params)[0])
+    reference = tab_investissement_reference(params, tab_amortissement_reference(params)[0])
+    assert list(df_investissement.columns) == list(reference.columns)
+    for colonne in reference.columns:
+        np.testing.assert_allclose(df_investissement[colonne], reference[colonne], rtol=0, atol=TOLERANCE, err_msg=colonne)
@@ -0,0 +1,76 @@
+"""Optimiseur de financement comparé à une recherche exhaustive au pas de 100 € sur un petit espace."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from scpi import optimiseur
+from scpi.lot import TYPES_DIFFERE, resume_lot
+from scpi.moteur import PARAMS_REFERENCE
+from scpi.solveur import CIBLES
+
+PARAMS = {**PARAMS_REFERENCE, "montant_investissement": 20000.0, "frais_courtage": 500.0, "taux_interet": 0.04}
+CONTRAINTES = [
+    ("rendement_net", None, None),
+    ("tri", None, None),
+    ("rendement_net", 60.0, None),
+    ("tri", 60.0, None),
+    ("tri", None, 12),
+    ("rendement_net", 80.0, 15),
+]
+
+
+@pytest.fixture(autouse=True)
+def petit_espace(monkeypatch):
+    monkeypatch.setattr(optimiseur, "DUREES_PRET", range(12, 121, 12))
+    monkeypatch.setattr(optimiseur, "DUREE_DIFFERE_MAX", 3)
+
+
+def classement_exhaustif(params, objectif, effort_max, sortie_max, k):
+    # Toutes les structures × tous les apports au pas de 100 €, sans grille ni élagage
+    structures = optimiseur.structures_financement(params)
+    apports = np.arange(0, params["montant_investissement"] + 1, optimiseur.PAS_APPORT, dtype=float)
+    indices = np.repeat(np.arange(len(structures)), len(apports))
+    points = structures.iloc[indices].reset_index(drop=True)
+    points["apport"] = np.tile(apports, len(structures))
+    resume = resume_lot({**params, **{colonne: points[colonne].to_numpy() for colonne in optimiseur.COLONNES_STRUCTURE}, "apport": points["apport"].to_numpy()})
+    points["score"] = optimiseur._scores(resume, CIBLES[objectif], effort_max, sortie_max)
+    points = points[np.isfinite(points["score"])].copy()
+    rien_emprunte = params["montant_investissement"] - points["apport"] + np.where(points["frais_inclus"], params["frais_courtage"], 0) <= 0
+    points.loc[rien_emprunte, ["type_differe", "duree_differe"]] = [TYPES_DIFFERE[0], 0]
+    return (points.sort_values(["score", "apport"], ascending=[False, True], kind="stable")
+            .drop_duplicates(list(optimiseur.COLONNES_STRUCTURE))
+            .head(k)
+            .reset_index(drop=True))
+
+
+@pytest.mark.parametrize("objectif, effort_max, sortie_max", CONTRAINTES)
+def test_classement_identique_a_la_recherche_exhaustive(objectif, effort_max, sortie_max):
+    resultat = optimiseur.optimiser_financement(PARAMS, objectif, effort_max=effort_max, sortie_max=sortie_max, k=5)
+    attendu = classement_exhaustif(PARAMS, objectif, effort_max, sortie_max, k=5)
+    classement = resultat["classement"]
+    assert len(classement) == len(attendu)
+    np.testing.assert_allclose(classement[CIBLES[objectif]], attendu["score"], rtol=0, atol=1e-9)
+    colonnes = [*optimiseur.COLONNES_STRUCTURE, "apport"]
+    pd.testing.assert_frame_equal(classement[colonnes], attendu[colonnes], check_dtype=False)
+    assert resultat["scenarios_evalues"] < resultat["combinaisons"]
+
+
+def test_structure_avec_un_seul_apport_faisable():
+    # Contrainte d'effort franchie entre deux points de grille : la structure ne doit pas être élaguée
+    exhaustif = classement_exhaustif(PARAMS, "tri", 60.0, None, k=len(optimiseur.structures_financement(PARAMS)))
+    resultat = optimiseur.optimiser_financement(PARAMS, "tri", effort_max=60.0, k=len(exhaustif))
+    colonnes = [*optimiseur.COLONNES_STRUCTURE, "apport"]
+    pd.testing.assert_frame_equal(resultat["classement"][colonnes], exhaustif[colonnes], check_dtype=False)
+
+
+def test_un_seul_financement_sans_emprunt():
+    # Apport = montant investi : les différés ne changent rien et n'occupent qu'une ligne par durée
+    classement = optimiseur.optimiser_financement(PARAMS, "rendement_net", k=50)["classement"]
+    sans_emprunt = classement[(classement["apport"] >= PARAMS["montant_investissement"]) & ~classement["frais_inclus"]]
+    assert not sans_emprunt.empty
+    assert (sans_emprunt["type_differe"] == TYPES_DIFFERE[0]).all()
+    assert not sans_emprunt.duplicated(list(optimiseur.COLONNES_STRUCTURE)).any()
+    equivalents = resume_lot({**PARAMS, "apport": PARAMS["montant_investissement"], "duree_pret": 120, "frais_inclus": False,
+                              "type_differe": np.array(TYPES_DIFFERE), "duree_differe": np.array([0, 3, 3])})
+    for colonne in equivalents.columns:
+        np.testing.assert_allclose(equivalents[colonne], equivalents[colonne].iloc[0], rtol=0, atol=1e-9, err_msg=colonne)
@@ -0,0 +1,49 @@
+"""Portefeuille multi-SCPI comparé aux simulations simples."""
+import numpy as np
+import pandas as pd
+
+from scpi.moteur import PARAMS_REFERENCE, simulation
+from scpi.portefeuille import simulation_portefeuille
+
+
+def ligne(params, poids=1.0):
+    return {
+        "poids": poids,
+        "rendement": params["rendement_souhaite"],
+        "delai_jouissance": params["delai_jouissance"],
+        "frais_souscription": params["frais_souscription"],
+        "taux_revalorisation": params["taux_revalorisation"],
+        "part_etranger": params["pourcentage_etranger"] / 100,
+        "taux_imposition_etranger": 0.20,
+    }
+
+
+def test_une_ligne_comme_simulation():
+    params = {**PARAMS_REFERENCE, "pourcentage_etranger": 40, "type_differe": "Différé total", "duree_differe": 6}
+    portefeuille = simulation_portefeuille(params, [ligne(params)])
+    for attendu, obtenu in zip(simulation(params), portefeuille):
+        if isinstance(attendu, pd.DataFrame):
+            pd.testing.assert_frame_equal(obtenu, attendu)
+        else:
+            pd.testing.assert_series_equal(obtenu, attendu)
+
+
+def test_deux_lignes_somme_des_simulations():
+    # Loyers imposables chaque année pour les deux lignes : l'impôt reste additif
+    params = {**PARAMS_REFERENCE, "taux_interet": 0.01, "rendement_souhaite": 0.08}
+    lignes = [
+        {**params, "montant_investissement": 60000, "pourcentage_etranger": 0, "taux_revalorisation": 0.01},
+        {**params, "montant_investissement": 40000, "pourcentage_etranger": 70, "taux_revalorisation": 0.02, "delai_jouissance": 3},
+    ]
+    separes = []
+    for params_ligne in lignes:
+        # Prêt, apport et frais répartis au prorata du montant investi
+        part = params_ligne["montant_investissement"] / params["montant_investissement"]
+        params_ligne = {**params_ligne, "apport": params["apport"] * part, "frais_courtage": params["frais_courtage"] * part}
+        df_investissement = simulation(params_ligne)[2]
+        assert (df_investissement["Imposable Français"] > 0).all()
+        separes.append(df_investissement)
+
+    _, _, df_portefeuille = simulation_portefeuille(params, [ligne(params_ligne, params_ligne["montant_investissement"]) for params_ligne in lignes])
+    colonnes = [colonne for colonne in df_portefeuille.columns if colonne != "Année"]
+    np.testing.assert_allclose(df_portefeuille[colonnes], separes[0][colonnes] + separes[1][colonnes], rtol=1e-9, atol=1e-6)
@@ -0,0 +1,31 @@
+"""TRI vectorisé comparé à ``numpy_financial.irr``."""
+import numpy as np
+import numpy_financial as npf
+import pytest
+
+from scpi.rentabilite import tri_lot
+
+
+def flux_aleatoires(nombre=500, graine=0):
+    # Apport puis efforts négatifs, revente positive en fin d'horizon : un seul changement de signe
+    alea = np.random.default_rng(graine)
+    flux = -alea.uniform(0, 5000, (nombre, 26))
+    flux[:, -1] = alea.uniform(0, 300_000, nombre)
+    return flux
+
+
+def test_tri_lot_comme_numpy_financial():
+    flux = flux_aleatoires()
+    attendu = np.array([npf.irr(ligne) for ligne in flux])
+    np.testing.assert_allclose(tri_lot(flux), attendu, rtol=1e-7, atol=1e-9)
+
+
+@pytest.mark.parametrize("flux", [[-100, 1e6], [-1, 1e5, 1e5], [100, -1e7]])
+def test_tri_au_dela_de_la_grille(flux):
+    tri = tri_lot([flux])[0]
+    assert tri > 10
+    assert tri == pytest.approx(npf.irr(flux), rel=1e-8)
+
+
+def test_tri_sans_changement_de_signe():
+    assert np.isnan(tri_lot([[-100, -50, -10], [0, 0, 0], [100, 50, 0]])).all()
@@ -0,0 +1,71 @@
+"""Résultats en colonnes : séries dérivées paresseuses comparées aux projections du moteur par lot."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from scpi import resultats as module_resultats
+from scpi.lot import capital_fin_annee, echeanciers_mutualises, normaliser_lot, projections_lot
+from scpi.moteur import PARAMS_REFERENCE
+from scpi.resultats import COLONNES_PROJECTIONS, DERIVEES, resultats_lot
+
+LOT = pd.DataFrame([
+    PARAMS_REFERENCE,
+    {**PARAMS_REFERENCE, "duree_pret": 0, "apport": 0},
+    {**PARAMS_REFERENCE, "pourcentage_etranger": 60, "type_differe": "Différé partiel", "duree_differe": 6},
+])
+
+
+@pytest.fixture
+def projections():
+    lot = normaliser_lot(LOT)
+    echeanciers = echeanciers_mutualises(lot)
+    projections = projections_lot(lot, echeanciers)
+    projections["Capital Restant"] = capital_fin_annee(echeanciers["Capital Restant"], lot["duree_pret"], projections["Loyer Brut"].shape[1])
+    projections["apport"] = lot["apport"]
+    return projections
+
+
+def derivees_attendues(p):
+    effort_cumule = p["Effort Annuel Net"].cumsum(axis=1)
+    cout_total = effort_cumule + p["Capital Restant"]
+    cout_total[:, 0] += p["apport"]
+    difference = p["Loyer Net Français"] - p["Loyer Net Étranger"]
+    return {
+        "Effort Net Cumulé": effort_cumule,
+        "Cout Total": cout_total,
+        "Difference": p["Valeur de Revente"] - cout_total,
+        "Différence": difference,
+        "Différence_Abs": np.abs(difference),
+        "Revenus Totaux": p["Loyer Net Français"] + p["Loyer Net Étranger"],
+    }
+
+
+def test_colonnes_et_derivees(projections):
+    resultats = resultats_lot(LOT)
+    for colonne in COLONNES_PROJECTIONS + ("Capital Restant",):
+        np.testing.assert_allclose(resultats[colonne], projections[colonne], err_msg=colonne)
+    attendues = derivees_attendues(projections)
+    assert set(attendues) == set(DERIVEES)
+    for nom, valeurs in attendues.items():
+        np.testing.assert_allclose(resultats[nom], valeurs, err_msg=nom)
+
+
+def test_derivees_calculees_a_la_demande(monkeypatch):
+    appels = []
+    for nom, calcul in DERIVEES.items():
+        monkeypatch.setitem(module_resultats.DERIVEES, nom, lambda resultats, nom=nom, calcul=calcul: appels.append(nom) or calcul(resultats))
+
+    resultats = resultats_lot(LOT)
+    assert appels == []
+    resultats.dataframe(0)
+    assert appels == []
+
+    resultats["Difference"]
+    resultats["Difference"]
+    assert sorted(appels) == sorted(["Difference", "Cout Total", "Effort Net Cumulé"])
+    assert "Revenus Totaux" in resultats and "Revenus Totaux" not in appels
+
+    appels.clear()
+    resultats.liberer_derivees()
+    resultats["Revenus Totaux"]
+    assert appels == ["Revenus Totaux"]
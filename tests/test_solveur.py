@@ -0,0 +1,30 @@
+"""Recherche d'objectif sur l'année de sortie neutre."""
+import pytest
+
+from scpi.moteur import PARAMS_REFERENCE
+from scpi.solveur import chercher_parametre
+
+
+def test_sortie_neutre_tenue_partout_taux_interet():
+    # La sortie recule quand le taux monte : le plus grand taux garantit encore la cible
+    solution = chercher_parametre(PARAMS_REFERENCE, "annee_sortie_neutre", 40, "taux_interet")
+    assert solution["valeur"] == pytest.approx(0.10)
+    assert solution["resultat"] <= 40
+
+
+def test_sortie_neutre_tenue_partout_rendement():
+    # La sortie avance quand le rendement monte : le plus petit rendement suffit
+    solution = chercher_parametre(PARAMS_REFERENCE, "annee_sortie_neutre", 40, "rendement_souhaite")
+    assert solution["valeur"] == pytest.approx(0.01)
+    assert solution["resultat"] <= 40
+
+
+def test_sortie_neutre_bascule():
+    solution = chercher_parametre(PARAMS_REFERENCE, "annee_sortie_neutre", 10, "taux_interet")
+    assert solution["resultat"] <= 10
+    assert 0.0 < solution["valeur"] < 0.10
+
+
+def test_sortie_neutre_hors_d_atteinte():
+    with pytest.raises(ValueError, match="hors d'atteinte"):
+        chercher_parametre(PARAMS_REFERENCE, "annee_sortie_neutre", 1, "taux_interet")
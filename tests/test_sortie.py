@@ -0,0 +1,143 @@
+"""Index de sortie mensuel comparé à un parcours mois par mois des tableaux de la simulation."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from scpi.lot import annee_sortie_neutre
+from scpi.moteur import PARAMS_REFERENCE, tab_amortissement, tab_investissement
+from scpi.sortie import IndexSortie, sorties_lot
+
+from tests.test_moteur import SCENARIOS, identifiant
+
+TOLERANCE = 1e-6
+SCENARIOS_SORTIE = SCENARIOS[:40]
+SEUILS = (0.0, -20000.0, 50000.0)
+
+
+def parcours_mensuel(params):
+    # Position nette de chaque mois 0..600, recalculée mois par mois sans sommes cumulées
+    df_amortissement, _ = tab_amortissement(params)
+    df_investissement = tab_investissement(params, df_amortissement)
+    mensualites = df_amortissement["Mensualité avec assurance"].to_numpy(dtype=float)
+    capital_restant = df_amortissement["Capital Restant"].to_numpy(dtype=float)
+    effort_annuel = df_investissement["Effort Annuel Net"].to_numpy(dtype=float)
+    revente_annuelle = df_investissement["Valeur de Revente"].to_numpy(dtype=float)
+    montant_pret = params["montant_investissement"] - params["apport"] + (params["frais_courtage"] if params["frais_inclus"] else 0)
+    valeur_initiale = params["montant_investissement"] * (1 - params["frais_souscription"])
+    annees_pret = params["duree_pret"] // 12
+
+    lignes = []
+    effort_cumule = 0.0
+    for mois in range(len(effort_annuel) * 12 + 1):
+        if mois > 0:
+            annee = (mois - 1) // 12 + 1
+            if annee <= annees_pret:
+                echeances_annee = mensualites[(annee - 1) * 12:annee * 12].sum()
+                effort_cumule += mensualites[mois - 1] + (effort_annuel[annee - 1] - echeances_annee) / 12
+            else:
+                effort_cumule += effort_annuel[annee - 1] / 12
+        if mois == 0:
+            capital = montant_pret
+        elif mois <= len(capital_restant):
+            capital = capital_restant[mois - 1]
+        else:
+            capital = 0.0
+        annee_ecoulee, reste = divmod(mois, 12)
+        debut = valeur_initiale if annee_ecoulee == 0 else revente_annuelle[annee_ecoulee - 1]
+        fin = revente_annuelle[annee_ecoulee] if annee_ecoulee < len(revente_annuelle) else debut
+        revente = debut + (fin - debut) * reste / 12
+        lignes.append({
+            "Mois": mois,
+            "Effort Net Cumulé": effort_cumule,
+            "Capital Restant": capital,
+            "Valeur de Revente": revente,
+            "Position Nette": revente - capital - params["apport"] - effort_cumule,
+        })
+    return pd.DataFrame(lignes), df_amortissement, df_investissement
+
+
+def premier_mois_parcours(parcours, seuil):
+    atteints = parcours.loc[(parcours["Mois"] >= 1) & (parcours["Position Nette"] >= seuil), "Mois"]
+    return float(atteints.iloc[0]) if len(atteints) else np.nan
+
+
+@pytest.fixture(params=SCENARIOS_SORTIE, ids=identifiant)
+def params(request):
+    return request.param
+
+
+def test_construire_et_position(params):
+    parcours, df_amortissement, df_investissement = parcours_mensuel(params)
+    index = IndexSortie.depuis_simulation(params, df_amortissement, df_investissement)
+    assert index.nb_mois == len(parcours) - 1
+    np.testing.assert_allclose(index.effort_cumule[0], parcours["Effort Net Cumulé"], rtol=0, atol=TOLERANCE)
+    np.testing.assert_allclose(index.capital_restant[0], parcours["Capital Restant"], rtol=0, atol=TOLERANCE)
+    np.testing.assert_allclose(index.valeur_revente[0], parcours["Valeur de Revente"], rtol=0, atol=TOLERANCE)
+    np.testing.assert_allclose(index.position(parcours["Mois"].to_numpy()), parcours["Position Nette"], rtol=0, atol=TOLERANCE)
+    mois = 17
+    detail = index.detail(mois)
+    for colonne, valeur in detail.items():
+        assert valeur == pytest.approx(parcours.loc[mois, colonne], abs=TOLERANCE), colonne
+
+
+def test_fins_annee_du_tableau_d_investissement(params):
+    # En fin d'année : effort cumulé et revente du tableau, apport déduit chaque année
+    _, df_amortissement, df_investissement = parcours_mensuel(params)
+    index = IndexSortie.depuis_simulation(params, df_amortissement, df_investissement)
+    fins = np.arange(1, len(df_investissement) + 1) * 12
+    effort_cumule = df_investissement["Effort Annuel Net"].cumsum().to_numpy()
+    np.testing.assert_allclose(index.effort_cumule[0, fins], effort_cumule, rtol=0, atol=TOLERANCE)
+    np.testing.assert_allclose(index.valeur_revente[0, fins], df_investissement["Valeur de Revente"], rtol=0, atol=TOLERANCE)
+    np.testing.assert_allclose(index.position(fins) + index.capital_restant[0, fins] + params["apport"] + effort_cumule,
+                               df_investissement["Valeur de Revente"], rtol=0, atol=TOLERANCE)
+
+
+@pytest.mark.parametrize("seuil", SEUILS)
+def test_premier_mois(params, seuil):
+    parcours, df_amortissement, df_investissement = parcours_mensuel(params)
+    index = IndexSortie.depuis_simulation(params, df_amortissement, df_investissement)
+    np.testing.assert_array_equal(index.premier_mois(seuil), [premier_mois_parcours(parcours, seuil)])
+
+
+def test_sans_pret():
+    # duree_pret = 0 : aucun capital dû après la souscription, effort réparti douzième par douzième
+    params = {**PARAMS_REFERENCE, "duree_pret": 0}
+    parcours, df_amortissement, df_investissement = parcours_mensuel(params)
+    index = IndexSortie.depuis_simulation(params, df_amortissement, df_investissement)
+    assert (index.capital_restant[0, 1:] == 0).all()
+    np.testing.assert_allclose(index.effort_cumule[0, :13], np.arange(13) * df_investissement["Effort Annuel Net"].iloc[0] / 12, rtol=0, atol=TOLERANCE)
+    np.testing.assert_allclose(index.position(parcours["Mois"].to_numpy()), parcours["Position Nette"], rtol=0, atol=TOLERANCE)
+
+
+def test_revente_interpolee_en_cours_d_annee():
+    params = {**PARAMS_REFERENCE, "taux_revalorisation": 0.03, "frais_souscription": 0.1}
+    _, df_amortissement, df_investissement = parcours_mensuel(params)
+    index = IndexSortie.depuis_simulation(params, df_amortissement, df_investissement)
+    initiale = params["montant_investissement"] * (1 - params["frais_souscription"])
+    revente = df_investissement["Valeur de Revente"].to_numpy()
+    assert index.valeur_revente[0, 0] == pytest.approx(initiale)
+    assert index.valeur_revente[0, 6] == pytest.approx((initiale + revente[0]) / 2)
+    assert index.valeur_revente[0, 12 * 4 + 3] == pytest.approx(revente[3] + (revente[4] - revente[3]) / 4)
+
+
+@pytest.mark.parametrize("taille_bloc", (7, 2048))
+def test_sorties_lot(taille_bloc):
+    scenarios = SCENARIOS_SORTIE
+    params = {colonne: np.array([scenario[colonne] for scenario in scenarios]) for colonne in PARAMS_REFERENCE}
+    mois = (0, 1, 13, 120, 600)
+    sorties = sorties_lot(params, mois=mois, taille_bloc=taille_bloc)
+    assert list(sorties.columns) == ["Mois Sortie Neutre", *(f"Position Mois {m}" for m in mois)]
+    for ligne, scenario in enumerate(scenarios):
+        parcours, _, _ = parcours_mensuel(scenario)
+        np.testing.assert_array_equal(sorties.loc[ligne, "Mois Sortie Neutre"], premier_mois_parcours(parcours, 0.0))
+        for m in mois:
+            assert sorties.loc[ligne, f"Position Mois {m}"] == pytest.approx(parcours.loc[m, "Position Nette"], abs=TOLERANCE)
+
+
+def test_annee_sortie_neutre_apport_en_premiere_annee():
+    # L'année de sortie neutre annuelle ne compte l'apport qu'en première année
+    zeros = np.zeros((1, 3))
+    revente = np.array([[50.0, 80.0, 150.0]])
+    np.testing.assert_array_equal(annee_sortie_neutre(np.array([100.0]), zeros, zeros, revente), [2])
+    np.testing.assert_array_equal(annee_sortie_neutre(np.array([100.0]), zeros, zeros, revente * 0.5), [2])
+    np.testing.assert_array_equal(annee_sortie_neutre(np.array([100.0]), zeros, zeros, -revente), [np.nan])
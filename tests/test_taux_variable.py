@@ -0,0 +1,30 @@
+"""Moteur à taux variable comparé au moteur à taux fixe sur des trajectoires constantes."""
+import numpy as np
+import pytest
+
+from scpi.lot import echeanciers_lot, normaliser_lot
+from scpi.moteur import PARAMS_REFERENCE
+from scpi.taux_variable import echeanciers_taux_variable
+from tests.test_moteur import SCENARIOS, identifiant
+
+TOLERANCE = 1e-6
+
+
+def assert_echeanciers_egaux(variable, fixe):
+    assert set(variable) == set(fixe)
+    for colonne in fixe:
+        np.testing.assert_allclose(variable[colonne], fixe[colonne], rtol=0, atol=TOLERANCE, err_msg=colonne)
+
+
+@pytest.mark.parametrize("params", SCENARIOS[:60], ids=identifiant)
+def test_taux_constant_comme_taux_fixe(params):
+    lot = normaliser_lot(params)
+    taux = np.full(max(int(params["duree_pret"]), 1), params["taux_interet"])
+    assert_echeanciers_egaux(echeanciers_taux_variable(lot, taux), echeanciers_lot(lot))
+
+
+def test_taux_plafonne():
+    params = {**PARAMS_REFERENCE, "type_differe": "Différé partiel", "duree_differe": 6}
+    plafond = 0.03
+    variable = echeanciers_taux_variable(normaliser_lot(params), np.full(int(params["duree_pret"]), 0.08), taux_max=plafond)
+    assert_echeanciers_egaux(variable, echeanciers_lot(normaliser_lot({**params, "taux_interet": plafond})))